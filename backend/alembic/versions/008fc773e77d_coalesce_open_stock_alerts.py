@@ -0,0 +1,123 @@
+"""Coalesce open stock alerts
+
+Revision ID: 008fc773e77d
+Revises: f581f353d3d0
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008fc773e77d'
+down_revision: Union[str, None] = 'f581f353d3d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+OPEN_STATUSES = ('pending', 'in-progress')
+OPEN_ALERT_PREDICATE = "status IN ('pending', 'in-progress') AND alert_kind IS NOT NULL"
+
+# alert_kind -> description prefixes written by the stock paths before alerts were keyed
+ALERT_PREFIXES = {
+    'reorder_point': ('Reorder point reached for product ',),
+    'insufficient_stock': ('Low stock for product ', 'Insufficient stock for product '),
+}
+PRODUCT_ID = re.compile(r'\(ID: (\d+)\)')
+
+# Rows deleted per statement when collapsing duplicates.
+BATCH_SIZE = 10000
+
+events = sa.table(
+    'process_events',
+    sa.column('id', sa.Integer),
+    sa.column('event_type', sa.String),
+    sa.column('description', sa.Text),
+    sa.column('status', sa.String),
+    sa.column('product_id', sa.Integer),
+    sa.column('alert_kind', sa.String),
+    sa.column('occurrences', sa.Integer),
+)
+
+
+def _collapse_open_alerts() -> None:
+    """Key open stock alerts by product and kind, keeping the newest per key.
+
+    The kept alert records how many open alerts it stands for in
+    ``occurrences``; the older duplicates are deleted.
+    """
+    bind = op.get_bind()
+    product_ids = {row[0] for row in bind.execute(sa.text('SELECT id FROM products'))}
+    prefixes = [prefix for kind_prefixes in ALERT_PREFIXES.values() for prefix in kind_prefixes]
+    rows = bind.execute(
+        sa.select(events.c.id, events.c.description)
+        .where(
+            events.c.event_type == 'alert',
+            events.c.status.in_(OPEN_STATUSES),
+            sa.or_(*(events.c.description.like(prefix + '%') for prefix in prefixes)),
+        )
+        .order_by(events.c.id)
+    )
+
+    groups = {}
+    for event_id, description in rows:
+        kind = next(kind for kind, kind_prefixes in ALERT_PREFIXES.items() if description.startswith(kind_prefixes))
+        match = PRODUCT_ID.search(description)
+        if match is None or int(match.group(1)) not in product_ids:
+            continue
+        groups.setdefault((int(match.group(1)), kind), []).append(event_id)
+
+    if not groups:
+        return
+    bind.execute(
+        events.update()
+        .where(events.c.id == sa.bindparam('b_id'))
+        .values(product_id=sa.bindparam('b_product_id'), alert_kind=sa.bindparam('b_kind'), occurrences=sa.bindparam('b_occurrences')),
+        [
+            {'b_id': ids[-1], 'b_product_id': product_id, 'b_kind': kind, 'b_occurrences': len(ids)}
+            for (product_id, kind), ids in groups.items()
+        ],
+    )
+    duplicates = [event_id for ids in groups.values() for event_id in ids[:-1]]
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        bind.execute(events.delete().where(events.c.id.in_(duplicates[start:start + BATCH_SIZE])))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('process_events', sa.Column('product_id', sa.Integer(), nullable=True))
+    op.add_column('process_events', sa.Column('alert_kind', sa.String(), nullable=True))
+    op.add_column('process_events', sa.Column('occurrences', sa.Integer(), nullable=True, server_default='1'))
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_foreign_key('fk_process_events_product_id', 'process_events', 'products', ['product_id'], ['id'])
+
+    _collapse_open_alerts()
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ux_process_events_open_alert',
+            'process_events',
+            ['product_id', 'alert_kind'],
+            unique=True,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+            postgresql_where=sa.text(OPEN_ALERT_PREDICATE),
+            sqlite_where=sa.text(OPEN_ALERT_PREDICATE),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Collapsed duplicate alerts are not restored.
+    with op.get_context().autocommit_block():
+        op.drop_index('ux_process_events_open_alert', table_name='process_events', if_exists=True, postgresql_concurrently=True)
+    with op.batch_alter_table('process_events') as batch_op:
+        if op.get_bind().dialect.name == 'postgresql':
+            batch_op.drop_constraint('fk_process_events_product_id', type_='foreignkey')
+        batch_op.drop_column('occurrences')
+        batch_op.drop_column('alert_kind')
+        batch_op.drop_column('product_id')
@@ -0,0 +1,50 @@
+"""Add product search indexes
+
+Revision ID: 2123b410b00c
+Revises: bcbd53649cde
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2123b410b00c'
+down_revision: Union[str, None] = 'bcbd53649cde'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, column or expression, operator class). Kept in step with the
+# Index() declarations on Product in models.py.
+INDEXES = [
+    ("ix_products_sku_trgm", "sku", "gin_trgm_ops"),
+    ("ix_products_name_trgm", "name", "gin_trgm_ops"),
+    ("ix_products_description_trgm", "description", "gin_trgm_ops"),
+    ("ix_products_search_document", "to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))", None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Search falls back to in-process matching elsewhere; only PostgreSQL
+    # has trigram and full-text indexes.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, expression, opclass in INDEXES:
+            target = f"{expression} {opclass}" if opclass else f"({expression})"
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON products USING gin ({target})")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        for name, expression, opclass in reversed(INDEXES):
+            op.drop_index(name, table_name="products", if_exists=True, postgresql_concurrently=True)
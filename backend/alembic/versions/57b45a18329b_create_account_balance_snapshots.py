@@ -0,0 +1,43 @@
+"""Create account_balance_snapshots
+
+Revision ID: 57b45a18329b
+Revises: 5f8e6ca43a3b
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '57b45a18329b'
+down_revision: Union[str, None] = '5f8e6ca43a3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_all may already have made the table. With no snapshots, as-of
+    # balances fall back to the live balance, so nothing needs backfilling.
+    if 'account_balance_snapshots' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'account_balance_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=True),
+        sa.Column('snapshot_date', sa.DateTime(), nullable=True),
+        sa.Column('balance', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('account_id', 'snapshot_date', name='uq_account_balance_snapshots_account_date'),
+    )
+    op.create_index('ix_account_balance_snapshots_id', 'account_balance_snapshots', ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('account_balance_snapshots')
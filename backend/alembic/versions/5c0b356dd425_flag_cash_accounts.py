@@ -0,0 +1,36 @@
+"""Flag cash accounts
+
+Revision ID: 5c0b356dd425
+Revises: 57b45a18329b
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0b356dd425'
+down_revision: Union[str, None] = '57b45a18329b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('accounts', sa.Column('is_cash', sa.Boolean(), nullable=True, server_default=sa.false()))
+    # The cash-flow report used to pick asset accounts whose name contains
+    # "cash"; flag those so the report keeps covering the same accounts.
+    op.execute(
+        "UPDATE accounts SET is_cash = TRUE "
+        "WHERE type = 'asset' AND lower(name) LIKE '%cash%'"
+    )
+    op.create_index('ix_accounts_is_cash', 'accounts', ['is_cash'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_accounts_is_cash', table_name='accounts')
+    op.drop_column('accounts', 'is_cash')
@@ -0,0 +1,81 @@
+"""Add report filter indexes
+
+Revision ID: 5f8e6ca43a3b
+Revises: cb9b6bd3b8e8
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f8e6ca43a3b'
+down_revision: Union[str, None] = 'cb9b6bd3b8e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, partial index predicate or None). Kept in step with
+# the Index() declarations in models.py, which create_all uses for new
+# databases; existing databases pick them up here.
+INDEXES = [
+    # keyset pagination on the list endpoints
+    ("ix_transactions_transaction_date_id", "transactions", ["transaction_date", "id"], None),
+    ("ix_orders_order_date_id", "orders", ["order_date", "id"], None),
+    ("ix_inventory_movements_movement_date_id", "inventory_movements", ["movement_date", "id"], None),
+    ("ix_process_events_created_at_id", "process_events", ["created_at", "id"], None),
+
+    # finance reports and transaction filters
+    ("ix_transactions_account_id_transaction_date", "transactions", ["account_id", "transaction_date"], None),
+    ("ix_transactions_type_transaction_date", "transactions", ["type", "transaction_date"], None),
+    ("ix_transactions_project_id", "transactions", ["project_id"], None),
+
+    # sales reports and the dashboard's active order count
+    ("ix_orders_customer_id_order_date", "orders", ["customer_id", "order_date"], None),
+    ("ix_orders_status_order_date", "orders", ["status", "order_date"], None),
+    ("ix_orders_active_order_date", "orders", ["order_date"], "status <> 'cancelled'"),
+    ("ix_order_items_order_id", "order_items", ["order_id"], None),
+    ("ix_order_items_product_id", "order_items", ["product_id"], None),
+
+    # stock movement and low-stock reports
+    ("ix_inventory_movements_product_id_movement_date", "inventory_movements", ["product_id", "movement_date"], None),
+    ("ix_inventory_movements_movement_type_movement_date", "inventory_movements", ["movement_type", "movement_date"], None),
+    ("ix_inventory_movements_out_product_id_movement_date", "inventory_movements", ["product_id", "movement_date"], "movement_type = 'out'"),
+
+    # process monitoring: open events and alerts
+    ("ix_process_events_status_created_at", "process_events", ["status", "created_at"], None),
+    ("ix_process_events_open_event_type_severity", "process_events", ["event_type", "severity"], "status IN ('pending', 'in-progress')"),
+
+    # project tasks and resource allocation
+    ("ix_tasks_project_id", "tasks", ["project_id"], None),
+    ("ix_tasks_status_assigned_to", "tasks", ["status", "assigned_to"], None),
+    ("ix_tasks_assigned_to_status", "tasks", ["assigned_to", "status"], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; building
+    # concurrently keeps the tables writable while the indexes build.
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            predicate = sa.text(where) if where else None
+            op.create_index(
+                name,
+                table,
+                columns,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=predicate,
+                sqlite_where=predicate,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
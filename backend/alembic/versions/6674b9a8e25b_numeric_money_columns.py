@@ -0,0 +1,130 @@
+"""Store money columns as numeric
+
+Revision ID: 6674b9a8e25b
+Revises: 5c0b356dd425
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6674b9a8e25b'
+down_revision: Union[str, None] = '5c0b356dd425'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONEY = "NUMERIC(18, 2)"
+UNIT_PRICE = "NUMERIC(18, 4)"
+
+# table -> {column: target type}
+MONEY_COLUMNS = {
+    "accounts": {"balance": MONEY},
+    "account_balance_snapshots": {"balance": MONEY},
+    "transactions": {"amount": MONEY},
+    "invoices": {"amount": MONEY, "tax_amount": MONEY, "total_amount": MONEY},
+    "customers": {"credit_limit": MONEY},
+    "orders": {"total_amount": MONEY},
+    "order_items": {"unit_price": UNIT_PRICE, "discount": MONEY, "total_price": MONEY},
+    "products": {"unit_price": UNIT_PRICE},
+    "purchase_orders": {"total_amount": MONEY},
+    "purchase_order_items": {"unit_price": UNIT_PRICE, "total_price": MONEY},
+    "projects": {"budget": MONEY},
+    "sales_daily_rollup": {"revenue": MONEY},
+}
+
+# Rows converted per UPDATE; each batch commits on its own so no single
+# statement holds row locks on more than this many rows.
+BATCH_SIZE = 10000
+
+
+def _convert_table(table: str, columns: dict) -> None:
+    """Retype ``columns`` of ``table`` without one long table rewrite.
+
+    ``ALTER COLUMN ... TYPE`` rewrites the whole table under an ACCESS
+    EXCLUSIVE lock. Instead each column gets a shadow column, kept in sync
+    for concurrent writes by a trigger and backfilled in id-range batches
+    that commit individually; the final swap (drop old, rename shadow) only
+    touches the catalog and holds its lock for a moment. The shadow takes
+    over the column's default and NOT NULL; the latter is proven by a
+    ``NOT VALID`` check validated alongside writes, so ``SET NOT NULL``
+    needs no scan under the exclusive lock.
+    """
+    bind = op.get_bind()
+    shadows = {column: f"{column}__numeric" for column in columns}
+    function = f"{table}_money_sync"
+    existing = {column["name"]: column for column in sa.inspect(bind).get_columns(table)}
+    not_null = [column for column in columns if not existing[column]["nullable"]]
+
+    with op.get_context().autocommit_block():
+        for column, target in columns.items():
+            op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {shadows[column]} {target}")
+        assignments = "; ".join(
+            f"NEW.{shadows[column]} := NEW.{column}::{target}" for column, target in columns.items()
+        )
+        op.execute(
+            f"CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$ "
+            f"BEGIN {assignments}; RETURN NEW; END $$ LANGUAGE plpgsql"
+        )
+        op.execute(f"DROP TRIGGER IF EXISTS {function} ON {table}")
+        op.execute(
+            f"CREATE TRIGGER {function} BEFORE INSERT OR UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {function}()"
+        )
+
+        max_id = bind.execute(sa.text(f"SELECT max(id) FROM {table}")).scalar() or 0
+        set_clause = ", ".join(
+            f"{shadows[column]} = {column}::{target}" for column, target in columns.items()
+        )
+        for low in range(0, max_id, BATCH_SIZE):
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {set_clause} WHERE id > :low AND id <= :high"),
+                {"low": low, "high": low + BATCH_SIZE},
+            )
+
+        for column in not_null:
+            op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {shadows[column]}_not_null")
+            op.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {shadows[column]}_not_null "
+                f"CHECK ({shadows[column]} IS NOT NULL) NOT VALID"
+            )
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {shadows[column]}_not_null")
+
+    op.execute(f"DROP TRIGGER {function} ON {table}")
+    op.execute(f"DROP FUNCTION {function}()")
+    for column, target in columns.items():
+        default = existing[column]["default"]
+        if default is not None:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {shadows[column]} SET DEFAULT ({default})::{target}")
+        if column in not_null:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {shadows[column]} SET NOT NULL")
+            op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {shadows[column]}_not_null")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+        op.execute(f"ALTER TABLE {table} RENAME COLUMN {shadows[column]} TO {column}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite has no column types to change; SQLAlchemy's Numeric handles
+    # the Decimal conversion there.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    for table, columns in MONEY_COLUMNS.items():
+        if table in existing:
+            _convert_table(table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    for table, columns in MONEY_COLUMNS.items():
+        if table in existing:
+            for column in columns:
+                op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE double precision")
@@ -0,0 +1,58 @@
+"""Add replenishment columns and indexes
+
+Revision ID: 90203f2c41d2
+Revises: 008fc773e77d
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '90203f2c41d2'
+down_revision: Union[str, None] = '008fc773e77d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, partial index predicate or None)
+INDEXES = [
+    ("ix_products_preferred_supplier_id", "products", ["preferred_supplier_id"], None),
+    ("ix_products_below_reorder_level", "products", ["preferred_supplier_id"], "stock_quantity <= reorder_level"),
+    ("ix_purchase_orders_status", "purchase_orders", ["status"], None),
+    ("ix_purchase_order_items_product_id", "purchase_order_items", ["product_id"], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('preferred_supplier_id', sa.Integer(), nullable=True))
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_foreign_key('fk_products_preferred_supplier_id', 'products', 'suppliers', ['preferred_supplier_id'], ['id'])
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            predicate = sa.text(where) if where else None
+            op.create_index(
+                name,
+                table,
+                columns,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=predicate,
+                sqlite_where=predicate,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+    with op.batch_alter_table('products') as batch_op:
+        if op.get_bind().dialect.name == 'postgresql':
+            batch_op.drop_constraint('fk_products_preferred_supplier_id', type_='foreignkey')
+        batch_op.drop_column('preferred_supplier_id')
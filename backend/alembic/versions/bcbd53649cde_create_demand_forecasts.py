@@ -0,0 +1,48 @@
+"""Create demand_forecasts
+
+Revision ID: bcbd53649cde
+Revises: d4173327a011
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bcbd53649cde'
+down_revision: Union[str, None] = 'd4173327a011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_all may already have made the table. It fills on the first
+    # ``python forecasting.py`` run; until then the low-stock report and
+    # replenishment use their non-forecast defaults.
+    if 'demand_forecasts' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'demand_forecasts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('model', sa.String(), nullable=True),
+        sa.Column('daily_demand', sa.Float(), nullable=True),
+        sa.Column('horizon_days', sa.Integer(), nullable=True),
+        sa.Column('horizon_demand', sa.Float(), nullable=True),
+        sa.Column('backtest_error', sa.Float(), nullable=True),
+        sa.Column('history_days', sa.Integer(), nullable=True),
+        sa.Column('generated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('product_id'),
+    )
+    op.create_index('ix_demand_forecasts_id', 'demand_forecasts', ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('demand_forecasts')
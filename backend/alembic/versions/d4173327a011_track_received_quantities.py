@@ -0,0 +1,54 @@
+"""Track received quantities and receipts on purchase orders
+
+Revision ID: d4173327a011
+Revises: 90203f2c41d2
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4173327a011'
+down_revision: Union[str, None] = '90203f2c41d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('purchase_order_items', sa.Column('received_quantity', sa.Integer(), nullable=True, server_default='0'))
+    # Orders received before partial receipts existed were received in full.
+    op.execute(
+        "UPDATE purchase_order_items SET received_quantity = quantity "
+        "WHERE purchase_order_id IN (SELECT id FROM purchase_orders WHERE status = 'received')"
+    )
+
+    # Applied receipts, keyed by the client's receipt id: the unique
+    # constraint is what makes a resent receipt a no-op. create_all may
+    # already have made the table.
+    if 'purchase_order_receipts' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'purchase_order_receipts',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('purchase_order_id', sa.Integer(), nullable=True),
+            sa.Column('receipt_key', sa.String(), nullable=True),
+            sa.Column('received_at', sa.DateTime(), nullable=True),
+            sa.Column('lines_received', sa.Integer(), nullable=True),
+            sa.Column('units_received', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['purchase_order_id'], ['purchase_orders.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('purchase_order_id', 'receipt_key', name='uq_purchase_order_receipts_po_key'),
+        )
+        op.create_index('ix_purchase_order_receipts_id', 'purchase_order_receipts', ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('purchase_order_receipts')
+    with op.batch_alter_table('purchase_order_items') as batch_op:
+        batch_op.drop_column('received_quantity')
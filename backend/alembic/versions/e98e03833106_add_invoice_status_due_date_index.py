@@ -0,0 +1,37 @@
+"""Add invoice status/due date index
+
+Revision ID: e98e03833106
+Revises: 6674b9a8e25b
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e98e03833106'
+down_revision: Union[str, None] = '6674b9a8e25b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Serves the AR aging report and the job that marks sent invoices overdue.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_invoices_status_due_date',
+            'invoices',
+            ['status', 'due_date'],
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_invoices_status_due_date', table_name='invoices', if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,49 @@
+"""Create stock_ledger
+
+Revision ID: f581f353d3d0
+Revises: e98e03833106
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f581f353d3d0'
+down_revision: Union[str, None] = 'e98e03833106'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_all may already have made the table. Entries for movements
+    # posted before the ledger existed are backfilled with
+    # ``python stock.py --chunk-size 1000``, which commits per chunk of
+    # products and is safe to rerun.
+    if 'stock_ledger' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'stock_ledger',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('movement_id', sa.Integer(), nullable=True),
+        sa.Column('entry_date', sa.DateTime(), nullable=True),
+        sa.Column('quantity_change', sa.Integer(), nullable=True),
+        sa.Column('balance_after', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.ForeignKeyConstraint(['movement_id'], ['inventory_movements.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('movement_id'),
+    )
+    op.create_index('ix_stock_ledger_id', 'stock_ledger', ['id'])
+    op.create_index('ix_stock_ledger_product_id_entry_date_id', 'stock_ledger', ['product_id', 'entry_date', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stock_ledger')
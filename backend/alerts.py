@@ -0,0 +1,74 @@
+"""Coalesced stock alerts.
+
+Stock writes raise alerts keyed by ``(product_id, alert_kind)``. While an
+alert for a key is open (``pending`` or ``in-progress``) further raises
+update it in place: its description, severity and order move to the latest
+occurrence and ``occurrences`` counts how often it fired. Once the alert is
+resolved the next raise opens a new one. ``ux_process_events_open_alert``,
+a unique index over open keyed alerts, backs the upsert.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+
+OPEN_STATUSES = ("pending", "in-progress")
+OPEN_ALERT_PREDICATE = "status IN ('pending', 'in-progress') AND alert_kind IS NOT NULL"
+
+REORDER_POINT = "reorder_point"
+INSUFFICIENT_STOCK = "insufficient_stock"
+ALERT_KINDS = (REORDER_POINT, INSUFFICIENT_STOCK)
+
+def raise_alerts(db: Session, alerts: Iterable[Dict]) -> None:
+    """Open or refresh one alert per ``(product_id, alert_kind)`` in one upsert.
+
+    Each alert is a dict with ``product_id``, ``alert_kind``,
+    ``description`` and ``severity``, and optionally ``order_id``. Repeats
+    within ``alerts`` collapse before reaching the database, the last one
+    winning. The caller commits.
+    """
+    coalesced: Dict[Tuple[int, str], Dict] = {}
+    for alert in alerts:
+        key = (alert["product_id"], alert["alert_kind"])
+        occurrences = coalesced[key]["occurrences"] + 1 if key in coalesced else 1
+        coalesced[key] = {
+            "product_id": alert["product_id"],
+            "alert_kind": alert["alert_kind"],
+            "description": alert["description"],
+            "severity": alert["severity"],
+            "order_id": alert.get("order_id"),
+            "occurrences": occurrences,
+        }
+    if not coalesced:
+        return
+
+    now = datetime.now()
+    rows = [
+        dict(row, event_type="alert", status="pending", created_at=now, updated_at=now)
+        for row in coalesced.values()
+    ]
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(models.ProcessEvent)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["product_id", "alert_kind"],
+        index_where=models.ProcessEvent.status.in_(OPEN_STATUSES) & models.ProcessEvent.alert_kind.isnot(None),
+        set_={
+            "description": stmt.excluded.description,
+            "severity": stmt.excluded.severity,
+            "order_id": stmt.excluded.order_id,
+            "occurrences": models.ProcessEvent.occurrences + stmt.excluded.occurrences,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt, rows)
+
+def reorder_point_alert(product: models.Product, stock_quantity: int) -> Dict:
+    return {
+        "product_id": product.id,
+        "alert_kind": REORDER_POINT,
+        "description": f"Reorder point reached for product {product.name} (ID: {product.id}). Current stock: {stock_quantity}, Reorder level: {product.reorder_level}",
+        "severity": "medium",
+    }
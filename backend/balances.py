@@ -0,0 +1,196 @@
+"""Account balances as of a point in time.
+
+``Account.balance`` is the live running balance: credits add to it and
+debits subtract from it. ``account_balance_snapshots`` records that
+balance per account at period closes, so a historical balance is the
+nearest snapshot at or before the requested moment plus the transactions
+dated between the two, a single range aggregate on
+``(account_id, transaction_date)``. Accounts without an earlier snapshot
+fall back to the live balance minus everything dated after the requested
+moment.
+
+Snapshots are written by ``POST /api/finance/balance-snapshots`` at period
+close, or on a schedule with::
+
+    python balances.py --as-of 2024-12-31T23:59:59
+"""
+import argparse
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, bindparam, case, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+import models
+import reporting
+
+def signed_amount(transaction_type: str, amount: Any) -> Decimal:
+    """Effect of one transaction on its account's balance."""
+    if transaction_type == "credit":
+        return reporting.money(amount)
+    if transaction_type == "debit":
+        return -reporting.money(amount)
+    return Decimal(0)
+
+def apply_balance_deltas(db: Session, deltas: Dict[int, Decimal]) -> None:
+    """Add each ``account_id -> delta`` to ``Account.balance`` in one executemany.
+
+    The increment happens in SQL (``balance = balance + :delta``), so
+    concurrent postings to the same account serialize on its row lock
+    instead of overwriting each other, and accounts are updated in
+    ascending id order so multi-account postings cannot deadlock.
+    """
+    params = [
+        {"b_account_id": account_id, "b_delta": delta}
+        for account_id, delta in sorted(deltas.items())
+        if delta and account_id is not None
+    ]
+    if not params:
+        return
+    accounts = models.Account.__table__
+    stmt = (
+        update(accounts)
+        .where(accounts.c.id == bindparam("b_account_id"))
+        .values(balance=accounts.c.balance + bindparam("b_delta"))
+    )
+    db.execute(stmt, params)
+
+    # Loaded Account instances now hold stale balances; reload on next access.
+    for param in params:
+        account = db.identity_map.get(identity_key(models.Account, param["b_account_id"]))
+        if account is not None:
+            db.expire(account, ["balance"])
+
+def _signed_amount_column() -> Any:
+    transaction = models.Transaction
+    return case(
+        (transaction.type == "credit", transaction.amount),
+        (transaction.type == "debit", -transaction.amount),
+        else_=0,
+    )
+
+def _net_change(account_id: Any, after: Any, until: Any = None) -> Any:
+    """Correlated sum of signed amounts dated in ``(after, until]``."""
+    transaction = models.Transaction
+    criteria = [transaction.account_id == account_id, transaction.transaction_date > after]
+    if until is not None:
+        criteria.append(transaction.transaction_date <= until)
+    return (
+        select(func.coalesce(func.sum(_signed_amount_column()), 0))
+        .where(*criteria)
+        .scalar_subquery()
+    )
+
+def balances_as_of(db: Session, as_of: datetime, account_types: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """``{account_id, account_name, account_type, balance}`` for each account as of ``as_of``."""
+    account, snapshot = models.Account, models.AccountBalanceSnapshot
+    latest = (
+        select(snapshot.account_id, func.max(snapshot.snapshot_date).label("snapshot_date"))
+        .where(snapshot.snapshot_date <= as_of)
+        .group_by(snapshot.account_id)
+        .subquery()
+    )
+    balance = case(
+        (
+            snapshot.id.isnot(None),
+            snapshot.balance + _net_change(account.id, latest.c.snapshot_date, as_of),
+        ),
+        else_=account.balance - _net_change(account.id, as_of),
+    )
+    query = (
+        db.query(
+            account.id.label("account_id"),
+            account.name.label("account_name"),
+            account.type.label("account_type"),
+            balance.label("balance"),
+        )
+        .outerjoin(latest, latest.c.account_id == account.id)
+        .outerjoin(snapshot, and_(snapshot.account_id == account.id, snapshot.snapshot_date == latest.c.snapshot_date))
+    )
+    if account_types is not None:
+        query = query.filter(account.type.in_(list(account_types)))
+    rows = [dict(row._mapping) for row in query.order_by(account.id).all()]
+    for row in rows:
+        row["balance"] = reporting.money(row["balance"])
+    return rows
+
+def take_snapshots(db: Session, as_of: datetime, account_ids: Optional[Iterable[int]] = None) -> int:
+    """Record every account's balance as of ``as_of``, replacing snapshots already taken then.
+
+    The caller commits. Returns the number of snapshots written.
+    """
+    ids = None if account_ids is None else list(account_ids)
+    rows = [
+        {"account_id": row["account_id"], "snapshot_date": as_of, "balance": row["balance"], "created_at": datetime.now()}
+        for row in balances_as_of(db, as_of)
+        if ids is None or row["account_id"] in ids
+    ]
+    snapshot = models.AccountBalanceSnapshot
+    stale = delete(snapshot).where(snapshot.snapshot_date == as_of)
+    if ids is not None:
+        stale = stale.where(snapshot.account_id.in_(ids))
+    db.execute(stale)
+    if rows:
+        db.execute(insert(snapshot), rows)
+    return len(rows)
+
+def adjust_snapshots(db: Session, account_id: int, transaction_date: datetime, delta: Decimal) -> None:
+    """Carry a transaction posted, changed or removed after the fact into later snapshots."""
+    if not delta or account_id is None or transaction_date is None:
+        return
+    snapshot = models.AccountBalanceSnapshot
+    db.execute(
+        update(snapshot)
+        .where(snapshot.account_id == account_id, snapshot.snapshot_date >= transaction_date)
+        .values(balance=snapshot.balance + delta)
+    )
+
+def adjust_snapshots_many(db: Session, adjustments: Dict[Any, Decimal]) -> None:
+    """``adjust_snapshots`` for many ``(account_id, transaction_date) -> delta`` at once.
+
+    Lines dated after the most recent snapshot cannot affect any snapshot,
+    so the usual case of posting current-period entries costs one query.
+    """
+    snapshot = models.AccountBalanceSnapshot
+    latest = db.query(func.max(snapshot.snapshot_date)).scalar()
+    if latest is None:
+        return
+    params = [
+        {"b_account_id": account_id, "b_date": transaction_date, "b_delta": delta}
+        for (account_id, transaction_date), delta in sorted(adjustments.items())
+        if delta and transaction_date is not None and transaction_date <= latest
+    ]
+    if not params:
+        return
+    table = snapshot.__table__
+    db.execute(
+        update(table)
+        .where(table.c.account_id == bindparam("b_account_id"), table.c.snapshot_date >= bindparam("b_date"))
+        .values(balance=table.c.balance + bindparam("b_delta")),
+        params,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot every account balance as of a moment (default: now).")
+    parser.add_argument("--as-of", type=datetime.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    from database import SessionLocal, engine
+
+    models.AccountBalanceSnapshot.__table__.create(bind=engine, checkfirst=True)
+    session = SessionLocal()
+    try:
+        as_of = args.as_of or datetime.now()
+        written = take_snapshots(session, as_of)
+        session.commit()
+        print(f"Wrote {written} balance snapshots as of {as_of.isoformat()}.")
+    except Exception as exc:
+        session.rollback()
+        print("Error while writing balance snapshots:", exc)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
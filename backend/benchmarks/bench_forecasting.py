@@ -0,0 +1,76 @@
+"""Catalog size vs latency for demand forecasting.
+
+Times ``forecasting.fit`` on synthetic products x 730-day demand matrices,
+fitted ``CHUNK_SIZE`` products at a time as a forecast run does, up to
+100k products (two years of daily data each). A full ``forecasting.run``,
+from the grouped movement query to the stored forecasts, is timed
+separately on a seeded movement table.
+"""
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import forecasting
+import models
+from benchmarks.common import bulk_insert, make_session, print_table, timed
+
+DAYS = 730
+HORIZON = 30
+SIZES = [10000, 100000]
+RUN_PRODUCTS = 2000
+DEMAND_DAYS = 0.3  # share of days a product sells on
+
+def synthetic_demand(products, rng):
+    weekly = rng.uniform(0.5, 1.5, size=(products, 7))
+    rate = rng.gamma(2.0, 2.0, size=(products, 1)) * weekly[:, np.arange(DAYS) % 7]
+    sold = rng.random((products, DAYS)) < DEMAND_DAYS
+    return (rng.poisson(rate / DEMAND_DAYS) * sold).astype(np.float32)
+
+def fit_all(history):
+    for low in range(0, history.shape[0], forecasting.CHUNK_SIZE):
+        forecasting.fit(history[low:low + forecasting.CHUNK_SIZE], HORIZON)
+
+def seed_movements(db, products, seed=42):
+    rng = random.Random(seed)
+    end = datetime(2025, 1, 1)
+    bulk_insert(db, models.Product, (
+        {"id": i, "sku": f"SKU-{i:06d}", "name": f"Product {i}", "unit_price": 1.0, "stock_quantity": 100}
+        for i in range(1, products + 1)
+    ))
+    bulk_insert(db, models.InventoryMovement, (
+        {
+            "product_id": product_id,
+            "quantity": -rng.randint(1, 10),
+            "movement_type": "out",
+            "movement_date": end - timedelta(days=day, hours=rng.randint(1, 23)),
+        }
+        for product_id in range(1, products + 1)
+        for day in range(DAYS)
+        if rng.random() < DEMAND_DAYS
+    ))
+    return end
+
+def main():
+    rng = np.random.default_rng(42)
+    rows = []
+    for products in SIZES:
+        history = synthetic_demand(products, rng)
+        seconds = timed(lambda: fit_all(history), repeat=3)
+        rows.append([products, DAYS, f"{history.nbytes / 2**20:.0f}", f"{seconds:.3f}"])
+    print_table("forecasting.fit (s)", ["products", "days", "matrix MB", "fit"], rows)
+
+    db = make_session(["products", "inventory_movements", "demand_forecasts"])
+    as_of = seed_movements(db, RUN_PRODUCTS)
+    movements = db.query(models.InventoryMovement).count()
+    summary = {}
+
+    def run():
+        summary.update(forecasting.run(db, DAYS, HORIZON, as_of))
+        db.commit()
+    seconds = timed(run, repeat=1)
+    db.close()
+    print_table("forecasting.run (s)", ["products", "movements", "forecasts", "run"], [[RUN_PRODUCTS, movements, summary["products_forecast"], f"{seconds:.3f}"]])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Account and transaction counts vs latency for the income statement.
+
+Compares the previous implementation (load every matching transaction,
+then rescan the list once per account) with the grouped aggregate in
+``reporting.income_statement_lines``. The legacy version is skipped once
+accounts x transactions gets large enough to take minutes.
+"""
+import random
+from datetime import datetime, timedelta
+
+import models
+import reporting
+from benchmarks.common import bulk_insert, make_session, print_table, timed
+
+SIZES = [(100, 10000), (1000, 100000), (5000, 1000000), (5000, 3000000)]
+LEGACY_LIMIT = 10 ** 8  # accounts x transactions
+START, END = datetime(2024, 1, 1), datetime(2024, 12, 31, 23, 59, 59)
+ACCOUNT_TYPES = ["revenue", "expense", "asset", "liability"]
+
+def seed_ledger(db, accounts, transactions, seed=42):
+    rng = random.Random(seed)
+    bulk_insert(db, models.Account, (
+        {"id": i, "account_code": f"ACC-{i:06d}", "name": f"Account {i}", "type": ACCOUNT_TYPES[i % 4], "balance": 0.0}
+        for i in range(1, accounts + 1)
+    ))
+    bulk_insert(db, models.Transaction, (
+        {
+            "id": i,
+            "transaction_date": START + timedelta(seconds=rng.randint(0, 2 * 365 * 86400)),
+            "amount": round(rng.uniform(1, 1000), 2),
+            "type": rng.choice(["credit", "debit"]),
+            "account_id": rng.randint(1, accounts),
+        }
+        for i in range(1, transactions + 1)
+    ))
+
+def legacy_income_statement(db):
+    def breakdown(account_type, transaction_type):
+        accounts = db.query(models.Account).filter(models.Account.type == account_type).all()
+        transactions = db.query(models.Transaction).filter(
+            models.Transaction.account_id.in_([account.id for account in accounts]),
+            models.Transaction.transaction_date >= START,
+            models.Transaction.transaction_date <= END,
+            models.Transaction.type == transaction_type,
+        ).all()
+        return [sum(t.amount for t in transactions if t.account_id == account.id) for account in accounts]
+
+    return breakdown("revenue", "credit"), breakdown("expense", "debit")
+
+def main():
+    rows = []
+    for accounts, transactions in SIZES:
+        db = make_session(["accounts", "transactions"])
+        seed_ledger(db, accounts, transactions)
+
+        legacy = "-"
+        if accounts * transactions <= LEGACY_LIMIT:
+            legacy = f"{timed(lambda: legacy_income_statement(db), repeat=1):.3f}"
+            db.expunge_all()
+        aggregated = timed(lambda: reporting.income_statement_lines(db, START, END), repeat=3)
+        rows.append([accounts, transactions, legacy, f"{aggregated:.3f}"])
+        db.close()
+
+    print_table("income statement (s)", ["accounts", "transactions", "legacy", "aggregate"], rows)
+
+if __name__ == "__main__":
+    main()
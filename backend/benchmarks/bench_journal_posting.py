@@ -0,0 +1,72 @@
+"""Lines per second for per-call transaction posting vs batch journal entries.
+
+Posts the same balanced set of lines through ``create_transaction`` one
+call (and one commit) at a time, and through ``post_journal_entry`` as a
+single batch. Per-call posting is skipped for the largest batch.
+"""
+import asyncio
+import random
+import time
+from datetime import datetime
+
+import models
+import schemas
+from benchmarks.common import bulk_insert, make_session, print_table
+from services import finance_service
+
+LINE_COUNTS = [1000, 10000, 50000]
+PER_CALL_LIMIT = 10000
+ACCOUNTS = 200
+POSTED_AT = datetime(2024, 6, 30, 23, 0)
+
+def make_lines(count, seed=42):
+    """Pairs of equal debit and credit lines on random accounts."""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count // 2):
+        amount = round(rng.uniform(1, 1000), 2)
+        lines.append(schemas.JournalLine(account_id=rng.randint(1, ACCOUNTS), type="debit", amount=amount))
+        lines.append(schemas.JournalLine(account_id=rng.randint(1, ACCOUNTS), type="credit", amount=amount))
+    return lines
+
+def fresh_ledger():
+    db = make_session(["accounts", "account_balance_snapshots", "transactions"])
+    bulk_insert(db, models.Account, (
+        {"id": i, "account_code": f"ACC-{i:04d}", "name": f"Account {i}", "type": "asset", "balance": 0.0}
+        for i in range(1, ACCOUNTS + 1)
+    ))
+    return db
+
+def post_per_call(db, lines):
+    for line in lines:
+        transaction = schemas.TransactionCreate(
+            transaction_date=POSTED_AT,
+            amount=line.amount,
+            description="Month-end close",
+            type=line.type,
+            account_id=line.account_id,
+        )
+        asyncio.run(finance_service.create_transaction(transaction, db=db))
+
+def post_batch(db, lines):
+    entry = schemas.JournalEntryCreate(transaction_date=POSTED_AT, description="Month-end close", lines=lines)
+    asyncio.run(finance_service.post_journal_entry(entry, db=db))
+
+def lines_per_second(post, lines):
+    db = fresh_ledger()
+    started = time.perf_counter()
+    post(db, lines)
+    elapsed = time.perf_counter() - started
+    db.close()
+    return f"{len(lines) / elapsed:,.0f}"
+
+def main():
+    rows = []
+    for count in LINE_COUNTS:
+        lines = make_lines(count)
+        per_call = lines_per_second(post_per_call, lines) if count <= PER_CALL_LIMIT else "-"
+        rows.append([count, per_call, lines_per_second(post_batch, lines)])
+    print_table("journal posting (lines/s)", ["lines", "per call", "batch"], rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Low-stock product counts vs latency for the low-stock report.
+
+Compares the previous implementation (one ``InventoryMovement`` query per
+low-stock product, summed in Python) with the single grouped query in
+``reporting.low_stock_items``. Every fixture has 10k products below their
+reorder level among the catalog.
+"""
+import random
+from datetime import datetime, timedelta
+
+import models
+import reporting
+from benchmarks.common import bulk_insert, make_session, print_table, timed
+
+LOW_STOCK = 10000
+SIZES = [(20000, 100000), (50000, 500000), (250000, 2000000)]  # (products, movements)
+NOW = datetime(2024, 12, 31)
+SINCE = NOW - timedelta(days=30)
+
+def seed_inventory(db, products, movements, seed=42):
+    rng = random.Random(seed)
+    low = set(rng.sample(range(1, products + 1), LOW_STOCK))
+    bulk_insert(db, models.Product, (
+        {
+            "id": i,
+            "sku": f"SKU-{i:06d}",
+            "name": f"Product {i}",
+            "unit_price": 10.0,
+            "stock_quantity": rng.randint(0, 20) if i in low else rng.randint(100, 1000),
+            "reorder_level": 50,
+            "reorder_quantity": 200,
+        }
+        for i in range(1, products + 1)
+    ))
+    bulk_insert(db, models.InventoryMovement, (
+        {
+            "id": i,
+            "product_id": rng.randint(1, products),
+            "quantity": rng.randint(1, 20),
+            "movement_type": rng.choice(["in", "out", "out", "adjustment"]),
+            "movement_date": NOW - timedelta(seconds=rng.randint(0, 180 * 86400)),
+        }
+        for i in range(1, movements + 1)
+    ))
+
+def legacy_low_stock(db):
+    products = db.query(models.Product).filter(
+        models.Product.stock_quantity <= models.Product.reorder_level
+    ).all()
+    result = []
+    for product in products:
+        outgoing = db.query(models.InventoryMovement).filter(
+            models.InventoryMovement.product_id == product.id,
+            models.InventoryMovement.movement_type == "out",
+            models.InventoryMovement.movement_date >= SINCE,
+        ).all()
+        result.append((product.id, sum(movement.quantity for movement in outgoing)))
+    return result
+
+def main():
+    rows = []
+    for products, movements in SIZES:
+        db = make_session(["products", "inventory_movements"])
+        seed_inventory(db, products, movements)
+
+        legacy = timed(lambda: legacy_low_stock(db), repeat=1)
+        db.expunge_all()
+        grouped = timed(lambda: reporting.low_stock_items(db, SINCE), repeat=3)
+        rows.append([products, movements, LOW_STOCK, f"{legacy:.3f}", f"{grouped:.3f}"])
+        db.close()
+
+    print_table("low-stock report (s)", ["products", "movements", "low stock", "legacy", "grouped"], rows)
+
+if __name__ == "__main__":
+    main()
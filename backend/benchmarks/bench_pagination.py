@@ -0,0 +1,67 @@
+"""Page depth vs latency for offset and keyset pagination.
+
+Seeds ``inventory_movements`` and times fetching page 1 and a deep page of
+the movement list (ordered by ``movement_date, id``) with ``OFFSET`` and
+with a keyset cursor. The cursor for the deep page is taken from the last
+row of the page before it during setup, as a client walking the list would
+have received it.
+"""
+import random
+from datetime import datetime, timedelta
+
+import models
+import pagination
+from benchmarks.common import bulk_insert, make_session, print_table, timed
+
+MOVEMENTS = 500000
+PAGE_SIZE = 50
+PAGES = [1, 100, 10000]
+
+def seed_movements(db, movements, products=2000, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    bulk_insert(db, models.Product, (
+        {"id": i, "sku": f"SKU-{i:06d}", "name": f"Product {i}", "unit_price": 1.0, "stock_quantity": 0}
+        for i in range(1, products + 1)
+    ))
+    bulk_insert(db, models.InventoryMovement, (
+        {
+            "id": i,
+            "product_id": rng.randint(1, products),
+            "quantity": rng.randint(-10, 10) or 1,
+            "movement_type": rng.choice(["in", "out", "adjustment"]),
+            "movement_date": start + timedelta(seconds=rng.randint(0, 365 * 86400 - 1)),
+        }
+        for i in range(1, movements + 1)
+    ))
+
+def main():
+    db = make_session(["products", "inventory_movements"])
+    seed_movements(db, MOVEMENTS)
+
+    movement = models.InventoryMovement
+    ordered = lambda: db.query(movement).order_by(movement.movement_date, movement.id)
+
+    rows = []
+    for page in PAGES:
+        offset = (page - 1) * PAGE_SIZE
+        cursor = ""
+        if offset:
+            previous = ordered().offset(offset - 1).limit(1).one()
+            cursor = pagination.encode_cursor([previous.movement_date, previous.id])
+
+        offset_time = timed(lambda: ordered().offset(offset).limit(PAGE_SIZE).all())
+        keyset_time = timed(lambda: pagination.paginate(
+            db.query(movement), movement.id, limit=PAGE_SIZE, cursor=cursor, sort_column=movement.movement_date,
+        ))
+        rows.append([page, f"{offset_time * 1000:.2f}", f"{keyset_time * 1000:.2f}"])
+        db.expunge_all()
+
+    print_table(
+        f"inventory movement list, {MOVEMENTS} rows, {PAGE_SIZE} per page (ms)",
+        ["page", "offset", "cursor"],
+        rows,
+    )
+
+if __name__ == "__main__":
+    main()
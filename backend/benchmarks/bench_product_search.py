@@ -0,0 +1,78 @@
+"""Catalog size vs latency for product search.
+
+Seeds catalogs of generated product names and descriptions and times
+``product_search.search`` over a mix of lookups a sales rep makes: an
+exact SKU, a SKU prefix, a partial name, one and two description words,
+and a miss. Reports p50 and p95 per catalog size against
+``P95_TARGET_MS``, which applies to PostgreSQL with the search indexes;
+the in-process SQLite fallback scans the table and is not expected to
+meet it at 500k products.
+"""
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+import models
+import product_search
+from benchmarks.common import BENCH_DATABASE_URL, bulk_insert, make_session, print_table
+
+SIZES = [50000, 500000]
+QUERIES = ["SKU-004217", "SKU-0042", "cordl", "drill", "steel hammer", "zzzz"]
+ROUNDS = 20
+LIMIT = 20
+P95_TARGET_MS = 50
+
+ADJECTIVES = ["Cordless", "Heavy duty", "Compact", "Steel", "Titanium", "Industrial", "Precision", "Folding"]
+NOUNS = ["drill", "hammer", "saw", "wrench", "clamp", "sander", "grinder", "level", "ladder", "vise"]
+DETAILS = ["with case", "two batteries", "rubber grip", "fine teeth", "magnetic tip", "quick release", "spare blades"]
+
+def seed_catalog(db, products, seed=42):
+    rng = random.Random(seed)
+    bulk_insert(db, models.Product, (
+        {
+            "id": i,
+            "sku": f"SKU-{i:06d}",
+            "name": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+            "description": f"{rng.choice(NOUNS).capitalize()} {rng.choice(DETAILS)}, {rng.choice(DETAILS)}",
+            "category": rng.choice(NOUNS),
+            "unit_price": round(rng.uniform(1, 500), 2),
+        }
+        for i in range(1, products + 1)
+    ))
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def main():
+    rows = []
+    for products in SIZES:
+        db = make_session(["suppliers", "products"])
+        seed_catalog(db, products)
+        if BENCH_DATABASE_URL.startswith("postgresql"):
+            db.execute(text("ANALYZE products"))
+            db.commit()
+
+        samples = []
+        for _ in range(ROUNDS):
+            for q in QUERIES:
+                started = time.perf_counter()
+                product_search.search(db, q, LIMIT)
+                samples.append((time.perf_counter() - started) * 1000)
+                db.rollback()
+        p95 = percentile(samples, 0.95)
+        rows.append([
+            products,
+            len(samples),
+            f"{statistics.median(samples):.1f}",
+            f"{p95:.1f}",
+            "yes" if p95 <= P95_TARGET_MS else "no",
+        ])
+        db.close()
+
+    print_table("product search latency (ms)", ["products", "queries", "p50", "p95", f"p95 <= {P95_TARGET_MS}"], rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Catalog size vs latency for a replenishment run.
+
+Seeds the catalog with a share of products below their reorder level and
+times ``replenishment.run`` twice: the first run drafts purchase orders for
+every such product, the second finds them all covered by those drafts.
+"""
+import random
+
+import models
+import replenishment
+from benchmarks.common import bulk_insert, make_session, print_table, timed
+
+SIZES = [20000, 200000]
+BELOW_THRESHOLD = 0.05
+SUPPLIERS = 200
+
+def seed_catalog(db, products, seed=42):
+    rng = random.Random(seed)
+    bulk_insert(db, models.Supplier, (
+        {"id": i, "name": f"Supplier {i}"} for i in range(1, SUPPLIERS + 1)
+    ))
+    bulk_insert(db, models.Product, (
+        {
+            "id": i,
+            "sku": f"SKU-{i:06d}",
+            "name": f"Product {i}",
+            "unit_price": round(rng.uniform(1, 500), 2),
+            "stock_quantity": rng.randint(0, 49) if rng.random() < BELOW_THRESHOLD else rng.randint(50, 1000),
+            "reorder_level": 50,
+            "reorder_quantity": 200,
+            "lead_time_days": rng.randint(3, 30),
+            "preferred_supplier_id": rng.randint(1, SUPPLIERS),
+        }
+        for i in range(1, products + 1)
+    ))
+
+def main():
+    rows = []
+    for products in SIZES:
+        db = make_session(["suppliers", "products", "purchase_orders", "purchase_order_items"])
+        seed_catalog(db, products)
+
+        summary = {}
+        def first_run():
+            summary.update(replenishment.run(db))
+            db.commit()
+        first = timed(first_run, repeat=1)
+        second = timed(lambda: replenishment.run(db), repeat=1)
+        db.rollback()
+        rows.append([products, summary["items_created"], summary["purchase_orders_created"], f"{first:.3f}", f"{second:.3f}"])
+        db.close()
+
+    print_table("replenishment run (s)", ["products", "items", "purchase orders", "first run", "repeat run"], rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Row count vs latency for the sales-by-customer/product reports.
+
+Compares the previous per-row Python grouping (with its per-key lookups)
+against the set-based aggregates in ``reporting``, both over raw orders and
+over the ``sales_daily_rollup`` table.
+"""
+from datetime import datetime
+
+import models
+import reporting
+import sales_rollup
+from benchmarks.common import SALES_TABLES, make_session, print_table, seed_sales, timed
+
+ORDER_COUNTS = [1000, 10000, 50000]
+START, END = datetime(2024, 1, 1), datetime(2024, 12, 31, 23, 59, 59)
+
+def legacy_sales_by_product(db):
+    order_items = db.query(models.OrderItem).join(models.Order).filter(*reporting.sales_criteria(START, END)).all()
+    product_sales = {}
+    for item in order_items:
+        if item.product_id not in product_sales:
+            product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
+            product_sales[item.product_id] = {"product_name": product.name, "quantity_sold": 0, "total_sales": 0}
+        product_sales[item.product_id]["quantity_sold"] += item.quantity
+        product_sales[item.product_id]["total_sales"] += item.total_price
+    return list(product_sales.values())
+
+def legacy_sales_by_customer(db):
+    orders = db.query(models.Order).filter(*reporting.sales_criteria(START, END)).all()
+    customer_sales = {}
+    for order in orders:
+        if order.customer_id not in customer_sales:
+            customer = db.query(models.Customer).filter(models.Customer.id == order.customer_id).first()
+            customer_sales[order.customer_id] = {"customer_name": customer.name, "order_count": 0, "total_sales": 0}
+        customer_sales[order.customer_id]["order_count"] += 1
+        customer_sales[order.customer_id]["total_sales"] += order.total_amount
+    return list(customer_sales.values())
+
+def main():
+    rows = []
+    for order_count in ORDER_COUNTS:
+        db = make_session(SALES_TABLES + ["sales_daily_rollup"])
+        seed_sales(db, orders=order_count)
+        sales_rollup.rebuild(db)
+        item_count = db.query(models.OrderItem).count()
+        rows.append([
+            order_count,
+            item_count,
+            f"{timed(lambda: legacy_sales_by_customer(db), repeat=3) * 1000:.1f}",
+            f"{timed(lambda: reporting.sales_by_customer(db, START, END, 'raw')) * 1000:.1f}",
+            f"{timed(lambda: reporting.sales_by_customer(db, START, END)) * 1000:.1f}",
+            f"{timed(lambda: legacy_sales_by_product(db), repeat=3) * 1000:.1f}",
+            f"{timed(lambda: reporting.sales_by_product(db, START, END, 'raw')) * 1000:.1f}",
+            f"{timed(lambda: reporting.sales_by_product(db, START, END)) * 1000:.1f}",
+        ])
+        db.expunge_all()
+        db.close()
+    print_table(
+        "Sales reports: latency in ms",
+        [
+            "orders", "items",
+            "by_customer legacy", "by_customer sql", "by_customer rollup",
+            "by_product legacy", "by_product sql", "by_product rollup",
+        ],
+        rows,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Helpers shared by the benchmark scripts.
+
+Benchmarks run from the ``backend`` directory, e.g.::
+
+    python -m benchmarks.bench_sales_reports
+
+They use an in-memory SQLite database unless ``BENCH_DATABASE_URL`` points
+at a PostgreSQL instance, which is what the numbers should be quoted from.
+"""
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+import models
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite://")
+
+SALES_TABLES = ["customers", "products", "orders", "order_items"]
+
+def make_session(tables: Sequence[str]) -> Session:
+    """Create a session on a freshly (re)created set of tables."""
+    if BENCH_DATABASE_URL.startswith("sqlite"):
+        engine = create_engine(
+            BENCH_DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    else:
+        engine = create_engine(BENCH_DATABASE_URL)
+    table_objs = [Base.metadata.tables[name] for name in tables]
+    Base.metadata.drop_all(bind=engine, tables=table_objs)
+    Base.metadata.create_all(bind=engine, tables=table_objs)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+def bulk_insert(db: Session, model: Any, rows: Iterable[Dict[str, Any]], chunk_size: int = 10000) -> None:
+    chunk: List[Dict[str, Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            db.execute(insert(model), chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(model), chunk)
+    db.commit()
+
+def timed(fn: Callable[[], Any], repeat: int = 5) -> float:
+    """Median wall-clock seconds over ``repeat`` runs."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def print_table(title: str, header: Sequence[str], rows: Sequence[Sequence[Any]]) -> None:
+    print(f"\n{title} ({BENCH_DATABASE_URL.split(':')[0]})")
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(header)]
+    print("  ".join(str(h).rjust(w) for h, w in zip(header, widths)))
+    for row in rows:
+        print("  ".join(str(v).rjust(w) for v, w in zip(row, widths)))
+
+def seed_sales(
+    db: Session,
+    orders: int,
+    items_per_order: int = 3,
+    customers: int = 500,
+    products: int = 2000,
+    days: int = 365,
+    seed: int = 42,
+) -> None:
+    """Seed customers, products, orders and order items with bulk inserts."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+
+    bulk_insert(db, models.Customer, (
+        {"id": i, "name": f"Customer {i}", "credit_limit": 0.0}
+        for i in range(1, customers + 1)
+    ))
+    bulk_insert(db, models.Product, (
+        {
+            "id": i,
+            "sku": f"SKU-{i:06d}",
+            "name": f"Product {i}",
+            "category": f"Category {i % 20}",
+            "unit_price": round(rng.uniform(1, 500), 2),
+            "stock_quantity": rng.randint(0, 1000),
+            "reorder_level": 50,
+            "reorder_quantity": 200,
+            "lead_time_days": 7,
+        }
+        for i in range(1, products + 1)
+    ))
+
+    order_rows = []
+    item_rows = []
+    item_id = 1
+    for order_id in range(1, orders + 1):
+        total = 0.0
+        for _ in range(items_per_order):
+            quantity = rng.randint(1, 10)
+            unit_price = round(rng.uniform(1, 500), 2)
+            item_rows.append({
+                "id": item_id,
+                "order_id": order_id,
+                "product_id": rng.randint(1, products),
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "discount": 0.0,
+                "total_price": quantity * unit_price,
+            })
+            total += quantity * unit_price
+            item_id += 1
+        order_rows.append({
+            "id": order_id,
+            "order_number": f"ORD-{order_id:08d}",
+            "customer_id": rng.randint(1, customers),
+            "order_date": start + timedelta(seconds=rng.randint(0, days * 86400 - 1)),
+            "status": "cancelled" if rng.random() < 0.05 else "delivered",
+            "total_amount": total,
+        })
+    bulk_insert(db, models.Order, order_rows)
+    bulk_insert(db, models.OrderItem, item_rows)
@@ -0,0 +1,174 @@
+"""Demand forecasts from the daily outbound quantity of every product.
+
+A run pulls the ``out`` movements of a block of products as one grouped
+query and lays them out as a products x days NumPy matrix. Three simple
+models are fitted to all rows at once:
+
+* ``moving_average``: mean daily demand over the last ``MOVING_AVERAGE_WINDOW`` days;
+* ``exponential_smoothing``: simple exponential smoothing, computed as one
+  matrix-vector product with the smoothing weights;
+* ``seasonal_naive``: the last ``SEASON_DAYS`` days repeated over the horizon.
+
+Each model is first backtested by forecasting the last ``horizon_days`` of
+history from the days before them; a product keeps the model with the
+smallest absolute error, refitted on its full history. The results replace
+the ``demand_forecasts`` table, which the low-stock report and the
+replenishment planner read. Products are processed ``CHUNK_SIZE`` at a time
+so the matrix stays a bounded size however large the catalog is. Run it
+nightly with::
+
+    python forecasting.py --history-days 730 --horizon-days 30
+"""
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from sqlalchemy import Date, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+import models
+
+FORECAST_MODELS = ["moving_average", "exponential_smoothing", "seasonal_naive"]
+MOVING_AVERAGE_WINDOW = 28
+SMOOTHING_ALPHA = 0.3
+SEASON_DAYS = 7
+
+# Products per matrix; 20000 products x 730 days of float32 is about 58 MB.
+CHUNK_SIZE = 20000
+
+def moving_average(history: np.ndarray, horizon: int, window: int = MOVING_AVERAGE_WINDOW) -> np.ndarray:
+    """Demand over the next ``horizon`` days at each row's recent daily mean."""
+    return history[:, -window:].mean(axis=1) * horizon
+
+def exponential_smoothing(history: np.ndarray, horizon: int, alpha: float = SMOOTHING_ALPHA) -> np.ndarray:
+    """Demand over the next ``horizon`` days at each row's smoothed level.
+
+    The level after day ``t`` is ``alpha * y[t] + (1 - alpha) * level``,
+    started from the first day, which unrolls to a fixed weight per day.
+    """
+    days = history.shape[1]
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (days - 1)
+    return (history @ weights.astype(history.dtype)) * horizon
+
+def seasonal_naive(history: np.ndarray, horizon: int, season: int = SEASON_DAYS) -> np.ndarray:
+    """Demand over the next ``horizon`` days repeating each row's last season."""
+    last_season = history[:, -season:]
+    full, partial = divmod(horizon, season)
+    return last_season.sum(axis=1) * full + last_season[:, :partial].sum(axis=1)
+
+_FITTERS = {
+    "moving_average": moving_average,
+    "exponential_smoothing": exponential_smoothing,
+    "seasonal_naive": seasonal_naive,
+}
+
+def fit(history: np.ndarray, horizon: int) -> Dict[str, np.ndarray]:
+    """Pick and apply the best model for every row of a products x days matrix.
+
+    Returns ``model`` (index into ``FORECAST_MODELS``), ``horizon_demand``
+    and ``backtest_error`` arrays with one entry per row.
+    """
+    if history.shape[1] <= horizon:
+        raise ValueError("history must be longer than the forecast horizon")
+    train, actual = history[:, :-horizon], history[:, -horizon:].sum(axis=1)
+    errors = np.stack([np.abs(_FITTERS[name](train, horizon) - actual) for name in FORECAST_MODELS], axis=1)
+    best = errors.argmin(axis=1)
+    forecasts = np.stack([_FITTERS[name](history, horizon) for name in FORECAST_MODELS], axis=1)
+    rows = np.arange(history.shape[0])
+    return {
+        "model": best,
+        "horizon_demand": forecasts[rows, best],
+        "backtest_error": errors[rows, best],
+    }
+
+def daily_outflow(db: Session, start: date, days: int, min_product_id: int, max_product_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Outbound quantity per product and day as ``(product_ids, matrix)``.
+
+    Only products in ``[min_product_id, max_product_id]`` with outflow in
+    the ``days`` days from ``start`` get a row; column ``d`` is ``start + d``.
+    """
+    movement = models.InventoryMovement
+    day = func.date(movement.movement_date, type_=Date)
+    end = start + timedelta(days=days)
+    rows = db.execute(
+        select(movement.product_id, day, func.sum(func.abs(movement.quantity)))
+        .where(
+            movement.movement_type == "out",
+            movement.product_id.between(min_product_id, max_product_id),
+            movement.movement_date >= datetime.combine(start, datetime.min.time()),
+            movement.movement_date < datetime.combine(end, datetime.min.time()),
+        )
+        .group_by(movement.product_id, day)
+    ).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.zeros((0, days), dtype=np.float32)
+
+    product_column, day_column, quantity_column = zip(*rows)
+    product_ids, product_index = np.unique(np.array(product_column, dtype=np.int64), return_inverse=True)
+    day_index = (np.array(day_column, dtype="datetime64[D]") - np.datetime64(start, "D")).astype(np.int64)
+    matrix = np.zeros((len(product_ids), days), dtype=np.float32)
+    matrix[product_index, day_index] = np.array(quantity_column, dtype=np.float32)
+    return product_ids, matrix
+
+def run(db: Session, history_days: int = 730, horizon_days: int = 30, as_of: datetime = None) -> Dict[str, Any]:
+    """Refit every product's forecast from the ``history_days`` before ``as_of``'s day.
+
+    The history ends at the start of ``as_of``'s day so a partial day does
+    not read as low demand. Replaces all stored forecasts; the caller commits.
+    """
+    as_of = as_of or datetime.now()
+    start = as_of.date() - timedelta(days=history_days)
+    low, high = db.query(func.min(models.Product.id), func.max(models.Product.id)).one()
+
+    db.execute(delete(models.DemandForecast))
+    forecasts = 0
+    model_counts = dict.fromkeys(FORECAST_MODELS, 0)
+    if low is not None:
+        for chunk_low in range(low, high + 1, CHUNK_SIZE):
+            product_ids, history = daily_outflow(db, start, history_days, chunk_low, chunk_low + CHUNK_SIZE - 1)
+            if not len(product_ids):
+                continue
+            result = fit(history, horizon_days)
+            db.execute(insert(models.DemandForecast), [
+                {
+                    "product_id": int(product_id),
+                    "model": FORECAST_MODELS[model],
+                    "daily_demand": float(demand) / horizon_days,
+                    "horizon_days": horizon_days,
+                    "horizon_demand": float(demand),
+                    "backtest_error": float(error),
+                    "history_days": history_days,
+                    "generated_at": as_of,
+                }
+                for product_id, model, demand, error in zip(
+                    product_ids, result["model"], result["horizon_demand"], result["backtest_error"]
+                )
+            ])
+            forecasts += len(product_ids)
+            for model, count in zip(*np.unique(result["model"], return_counts=True)):
+                model_counts[FORECAST_MODELS[model]] += int(count)
+    return {"products_forecast": forecasts, "models": model_counts, "generated_at": as_of}
+
+def main():
+    parser = argparse.ArgumentParser(description="Refit the demand forecast of every product.")
+    parser.add_argument("--history-days", type=int, default=730, help="days of outbound history to fit")
+    parser.add_argument("--horizon-days", type=int, default=30, help="days ahead to forecast")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        summary = run(session, args.history_days, args.horizon_days)
+        session.commit()
+        print(f"Forecast {summary['products_forecast']} products: {summary['models']}")
+    except Exception as exc:
+        session.rollback()
+        print("Error during the forecast run:", exc)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Explain the report queries and flag sequential scans.
+
+Every report endpoint is called against the target database while the
+SELECT statements it issues are captured; each statement is then run
+through ``EXPLAIN`` (``EXPLAIN QUERY PLAN`` on SQLite) and any full table
+scan of a table with at least ``--min-rows`` rows is reported, e.g.::
+
+    python index_advisor.py --database-url postgresql+psycopg://... --min-rows 1000
+
+Exits with status 1 when a scan is flagged, so it can gate a CI job run
+against a seeded database.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import re
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from services import (
+    dashboard_service,
+    finance_service,
+    inventory_service,
+    process_service,
+    project_service,
+    sales_service,
+)
+
+# (report name, endpoint function, keyword arguments given the date range).
+REPORTS: List[Tuple[str, Callable, Callable[[datetime, datetime], Dict[str, Any]]]] = [
+    ("finance: income statement", finance_service.get_income_statement, lambda start, end: {"start_date": start, "end_date": end}),
+    ("finance: balance sheet", finance_service.get_balance_sheet, lambda start, end: {"date": end}),
+    ("finance: AR aging", finance_service.get_ar_aging, lambda start, end: {"as_of": end}),
+    ("finance: cash flow", finance_service.get_cash_flow, lambda start, end: {"start_date": start, "end_date": end}),
+    ("sales: by customer", sales_service.get_sales_by_customer, lambda start, end: {"start_date": start, "end_date": end}),
+    ("sales: by customer (raw)", sales_service.get_sales_by_customer, lambda start, end: {"start_date": start, "end_date": end, "source": "raw"}),
+    ("sales: by product", sales_service.get_sales_by_product, lambda start, end: {"start_date": start, "end_date": end}),
+    ("sales: by product (raw)", sales_service.get_sales_by_product, lambda start, end: {"start_date": start, "end_date": end, "source": "raw"}),
+    ("sales: trend", sales_service.get_sales_trend, lambda start, end: {"start_date": start, "end_date": end}),
+    ("sales: trend (raw)", sales_service.get_sales_trend, lambda start, end: {"start_date": start, "end_date": end, "source": "raw"}),
+    ("inventory: valuation", inventory_service.get_inventory_valuation, lambda start, end: {}),
+    ("inventory: stock movements", inventory_service.get_stock_movements, lambda start, end: {"start_date": start, "end_date": end}),
+    ("inventory: low stock", inventory_service.get_low_stock_report, lambda start, end: {}),
+    ("process: active alerts", process_service.get_active_alerts, lambda start, end: {}),
+    ("process: performance", process_service.get_process_performance, lambda start, end: {"start_date": start, "end_date": end}),
+    ("projects: resource allocation", project_service.get_resource_allocation, lambda start, end: {}),
+    ("dashboard: summary", dashboard_service.get_dashboard_summary, lambda start, end: {}),
+]
+
+def capture_queries(db: Session, fn: Callable, kwargs: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """Call a report endpoint and return the SELECT statements it executed."""
+    captured: List[Tuple[str, Any]] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = fn(db=db, **kwargs)
+        if inspect.isawaitable(result):
+            asyncio.run(result)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        db.rollback()
+    return captured
+
+# "SCAN orders" is a full table scan; "SCAN orders USING INDEX ..." and
+# "SEARCH orders ..." are index access paths.
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+def _postgres_scans(plan: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"], plan.get("Filter", "")
+    for child in plan.get("Plans", []):
+        yield from _postgres_scans(child)
+
+def sequential_scans(db: Session, statement: str, parameters: Any) -> List[Tuple[str, str]]:
+    """``(table, detail)`` for each full table scan in the statement's plan."""
+    connection = db.connection()
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        matches = (_SQLITE_SCAN.match(row[-1]) for row in rows)
+        return [(match.group(1), match.group(0)) for match in matches if match]
+
+    plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return list(_postgres_scans(plan[0]["Plan"]))
+
+def _freeze(parameters: Any) -> Any:
+    """Hashable form of DBAPI parameters so repeated statements are explained once."""
+    if isinstance(parameters, dict):
+        return tuple(sorted(parameters.items()))
+    if isinstance(parameters, list):
+        return tuple(parameters)
+    return parameters
+
+def advise(db: Session, start_date: datetime, end_date: datetime, min_rows: int = 1000) -> int:
+    """Print the flagged scans per report and return how many were flagged."""
+    row_counts: Dict[str, int] = {}
+    flagged = 0
+    for name, fn, make_kwargs in REPORTS:
+        try:
+            queries = capture_queries(db, fn, make_kwargs(start_date, end_date))
+        except Exception as exc:
+            db.rollback()
+            print(f"{name}: skipped ({exc})")
+            continue
+
+        findings = []
+        seen = set()
+        for statement, parameters in queries:
+            if (statement, _freeze(parameters)) in seen:
+                continue
+            seen.add((statement, _freeze(parameters)))
+            for table, detail in sequential_scans(db, statement, parameters):
+                if table not in row_counts:
+                    row_counts[table] = db.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar()
+                if row_counts[table] >= min_rows:
+                    findings.append((table, detail, statement))
+
+        print(f"{name}: {len(queries)} queries, {len(findings)} sequential scans")
+        for table, detail, statement in findings:
+            print(f"  SEQ SCAN {table} ({row_counts[table]} rows) {detail}".rstrip())
+            print("    " + " ".join(statement.split())[:200])
+        flagged += len(findings)
+        db.rollback()
+    return flagged
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Flag sequential scans in the report queries.")
+    parser.add_argument("--database-url", default=None, help="defaults to database.DATABASE_URL")
+    parser.add_argument("--days", type=int, default=365, help="report window ending today")
+    parser.add_argument("--min-rows", type=int, default=1000, help="ignore scans of smaller tables")
+    args = parser.parse_args(argv)
+
+    if args.database_url is None:
+        from database import DATABASE_URL
+        args.database_url = DATABASE_URL
+
+    engine = create_engine(args.database_url)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    # Whole days, so the sales reports take their default rollup path.
+    today = datetime.now().date()
+    try:
+        flagged = advise(
+            session,
+            datetime.combine(today - timedelta(days=args.days), time.min),
+            datetime.combine(today, time.max),
+            args.min_rows,
+        )
+    finally:
+        session.close()
+    print(f"\n{flagged} sequential scans flagged.")
+    return 1 if flagged else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
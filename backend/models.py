@@ -1,12 +1,17 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text, Enum, Table, ARRAY
+from sqlalchemy import DDL, event, Boolean, Column, ForeignKey, Integer, String, Float, Numeric, Date, DateTime, Text, Enum, Table, ARRAY, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from sqlalchemy.dialects.postgresql import JSONB
 import enum
 from database import Base
 import bcrypt
 from datetime import datetime
 
+# Money is stored as exact decimals: amounts and balances to the cent, unit
+# prices to four places. Values come back as decimal.Decimal.
+Money = Numeric(18, 2)
+UnitPrice = Numeric(18, 4)
+
 # User and Authentication Models
 class UserRole(enum.Enum):
     ADMIN = "admin"
@@ -43,18 +48,40 @@ class Account(Base):
     account_code = Column(String, unique=True, index=True)
     name = Column(String)
     type = Column(String)  # asset, liability, equity, revenue, expense
-    balance = Column(Float, default=0.0)
+    balance = Column(Money, default=0)
+    is_cash = Column(Boolean, default=False, index=True)  # counted by the cash-flow report
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
     transactions = relationship("Transaction", back_populates="account")
+    balance_snapshots = relationship("AccountBalanceSnapshot", back_populates="account")
+
+class AccountBalanceSnapshot(Base):
+    __tablename__ = "account_balance_snapshots"
+    __table_args__ = (
+        UniqueConstraint("account_id", "snapshot_date", name="uq_account_balance_snapshots_account_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"))
+    snapshot_date = Column(DateTime)  # balance includes transactions dated up to and including this moment
+    balance = Column(Money)
+    created_at = Column(DateTime, default=func.now())
+
+    account = relationship("Account", back_populates="balance_snapshots")
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_transaction_date_id", "transaction_date", "id"),  # keyset pagination
+        Index("ix_transactions_account_id_transaction_date", "account_id", "transaction_date"),
+        Index("ix_transactions_type_transaction_date", "type", "transaction_date"),
+        Index("ix_transactions_project_id", "project_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     transaction_date = Column(DateTime, default=func.now())
-    amount = Column(Float)
+    amount = Column(Money)
     description = Column(String)
     type = Column(String)  # debit, credit
     account_id = Column(Integer, ForeignKey("accounts.id"))
@@ -69,14 +96,17 @@ class Transaction(Base):
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        Index("ix_invoices_status_due_date", "status", "due_date"),  # AR aging, overdue job
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     invoice_number = Column(String, unique=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id"))
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=True)
-    amount = Column(Float)
-    tax_amount = Column(Float)
-    total_amount = Column(Float)
+    amount = Column(Money)
+    tax_amount = Column(Money)
+    total_amount = Column(Money)
     issue_date = Column(DateTime, default=func.now())
     due_date = Column(DateTime)
     status = Column(String)  # draft, sent, paid, overdue
@@ -96,7 +126,7 @@ class Customer(Base):
     email = Column(String)
     phone = Column(String)
     address = Column(String)
-    credit_limit = Column(Float, default=0.0)
+    credit_limit = Column(Money, default=0)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
@@ -113,6 +143,16 @@ class OrderStatus(enum.Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_order_date_id", "order_date", "id"),  # keyset pagination
+        Index("ix_orders_customer_id_order_date", "customer_id", "order_date"),
+        Index("ix_orders_status_order_date", "status", "order_date"),
+        Index(
+            "ix_orders_active_order_date", "order_date",
+            postgresql_where=text("status <> 'cancelled'"),
+            sqlite_where=text("status <> 'cancelled'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     order_number = Column(String, unique=True, index=True)
@@ -121,7 +161,7 @@ class Order(Base):
     required_date = Column(DateTime)
     shipped_date = Column(DateTime, nullable=True)
     status = Column(String)
-    total_amount = Column(Float)
+    total_amount = Column(Money)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
@@ -134,14 +174,18 @@ class Order(Base):
 
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (
+        Index("ix_order_items_order_id", "order_id"),
+        Index("ix_order_items_product_id", "product_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id"))
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer)
-    unit_price = Column(Float)
-    discount = Column(Float, default=0.0)
-    total_price = Column(Float)
+    unit_price = Column(UnitPrice)
+    discount = Column(Money, default=0)
+    total_price = Column(Money)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
@@ -149,19 +193,37 @@ class OrderItem(Base):
     product = relationship("Product", back_populates="order_items")
 
 # Inventory and Supply Chain Models
+# Full-text document of a product for catalog search; the GIN index below
+# and product_search.py must use this exact expression.
+PRODUCT_SEARCH_DOCUMENT = "to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index(  # replenishment runs and low-stock counts touch only products below threshold
+            "ix_products_below_reorder_level", "preferred_supplier_id",
+            postgresql_where=text("stock_quantity <= reorder_level"),
+            sqlite_where=text("stock_quantity <= reorder_level"),
+        ),
+        # catalog search: trigram indexes serve substring (ILIKE) matches and
+        # similarity ranking, the full-text index serves word matches
+        Index("ix_products_sku_trgm", "sku", postgresql_using="gin", postgresql_ops={"sku": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_products_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_products_description_trgm", "description", postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_products_search_document", text(PRODUCT_SEARCH_DOCUMENT), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     sku = Column(String, unique=True, index=True)
     name = Column(String, index=True)
     description = Column(Text)
     category = Column(String)
-    unit_price = Column(Float)
+    unit_price = Column(UnitPrice)
     stock_quantity = Column(Integer, default=0)
     reorder_level = Column(Integer, default=0)
     reorder_quantity = Column(Integer, default=0)
     lead_time_days = Column(Integer, default=0)
+    preferred_supplier_id = Column(Integer, ForeignKey("suppliers.id"), nullable=True, index=True)  # replenishment drafts POs to it
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
@@ -170,8 +232,25 @@ class Product(Base):
     bom_items = relationship("BOMItem", foreign_keys="BOMItem.product_id", back_populates="product")
     bom_parents = relationship("BOMItem", foreign_keys="BOMItem.parent_product_id", back_populates="parent_product")
 
+# The trigram indexes need pg_trgm; create_all enables it on PostgreSQL.
+event.listen(
+    Product.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
 class InventoryMovement(Base):
     __tablename__ = "inventory_movements"
+    __table_args__ = (
+        Index("ix_inventory_movements_movement_date_id", "movement_date", "id"),  # keyset pagination
+        Index("ix_inventory_movements_product_id_movement_date", "product_id", "movement_date"),
+        Index("ix_inventory_movements_movement_type_movement_date", "movement_type", "movement_date"),
+        Index(
+            "ix_inventory_movements_out_product_id_movement_date", "product_id", "movement_date",
+            postgresql_where=text("movement_type = 'out'"),
+            sqlite_where=text("movement_type = 'out'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
@@ -184,6 +263,33 @@ class InventoryMovement(Base):
 
     product = relationship("Product", back_populates="inventory_movements")
 
+class StockLedgerEntry(Base):
+    __tablename__ = "stock_ledger"
+    __table_args__ = (
+        Index("ix_stock_ledger_product_id_entry_date_id", "product_id", "entry_date", "id"),  # stock as of
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    movement_id = Column(Integer, ForeignKey("inventory_movements.id"), unique=True)
+    entry_date = Column(DateTime)  # the movement's date
+    quantity_change = Column(Integer)  # signed effect on stock_quantity
+    balance_after = Column(Integer)  # stock_quantity once this movement was applied
+    created_at = Column(DateTime, default=func.now())
+
+class DemandForecast(Base):
+    __tablename__ = "demand_forecasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), unique=True, nullable=False)
+    model = Column(String)  # moving_average, exponential_smoothing, seasonal_naive
+    daily_demand = Column(Float)  # average units per day over the horizon
+    horizon_days = Column(Integer)
+    horizon_demand = Column(Float)
+    backtest_error = Column(Float)  # absolute error forecasting the last horizon of history
+    history_days = Column(Integer)
+    generated_at = Column(DateTime)
+
 class Supplier(Base):
     __tablename__ = "suppliers"
 
@@ -200,14 +306,17 @@ class Supplier(Base):
 
 class PurchaseOrder(Base):
     __tablename__ = "purchase_orders"
+    __table_args__ = (
+        Index("ix_purchase_orders_status", "status"),  # open orders for replenishment
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     po_number = Column(String, unique=True, index=True)
     supplier_id = Column(Integer, ForeignKey("suppliers.id"))
     order_date = Column(DateTime, default=func.now())
     expected_delivery_date = Column(DateTime)
-    status = Column(String)  # draft, sent, received, cancelled
-    total_amount = Column(Float)
+    status = Column(String)  # draft, sent, partially_received, received, cancelled
+    total_amount = Column(Money)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
@@ -217,19 +326,37 @@ class PurchaseOrder(Base):
 
 class PurchaseOrderItem(Base):
     __tablename__ = "purchase_order_items"
+    __table_args__ = (
+        Index("ix_purchase_order_items_product_id", "product_id"),  # quantity on order per product
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     purchase_order_id = Column(Integer, ForeignKey("purchase_orders.id"))
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer)
-    unit_price = Column(Float)
-    total_price = Column(Float)
+    received_quantity = Column(Integer, default=0)
+    unit_price = Column(UnitPrice)
+    total_price = Column(Money)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
     purchase_order = relationship("PurchaseOrder", back_populates="po_items")
     product = relationship("Product")
 
+class PurchaseOrderReceipt(Base):
+    __tablename__ = "purchase_order_receipts"
+    __table_args__ = (
+        UniqueConstraint("purchase_order_id", "receipt_key", name="uq_purchase_order_receipts_po_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    purchase_order_id = Column(Integer, ForeignKey("purchase_orders.id"))
+    receipt_key = Column(String)  # sent by the receiving client; a resent receipt is applied once
+    received_at = Column(DateTime)
+    lines_received = Column(Integer)
+    units_received = Column(Integer)
+    created_at = Column(DateTime, default=func.now())
+
 class Shipment(Base):
     __tablename__ = "shipments"
 
@@ -249,6 +376,21 @@ class Shipment(Base):
 # Business Process Controls Models
 class ProcessEvent(Base):
     __tablename__ = "process_events"
+    __table_args__ = (
+        Index("ix_process_events_created_at_id", "created_at", "id"),  # keyset pagination
+        Index("ix_process_events_status_created_at", "status", "created_at"),
+        Index(
+            "ix_process_events_open_event_type_severity", "event_type", "severity",
+            postgresql_where=text("status IN ('pending', 'in-progress')"),
+            sqlite_where=text("status IN ('pending', 'in-progress')"),
+        ),
+        Index(  # one open alert per product and kind; see alerts.py
+            "ux_process_events_open_alert", "product_id", "alert_kind",
+            unique=True,
+            postgresql_where=text("status IN ('pending', 'in-progress') AND alert_kind IS NOT NULL"),
+            sqlite_where=text("status IN ('pending', 'in-progress') AND alert_kind IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     event_type = Column(String)  # alert, notification, approval, etc.
@@ -259,6 +401,9 @@ class ProcessEvent(Base):
     purchase_order_id = Column(Integer, ForeignKey("purchase_orders.id"), nullable=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
     shipment_id = Column(Integer, ForeignKey("shipments.id"), nullable=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=True)
+    alert_kind = Column(String, nullable=True)  # reorder_point, insufficient_stock; coalescing key with product_id
+    occurrences = Column(Integer, default=1)  # times a coalesced alert fired while open
     created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime, default=func.now())
@@ -296,7 +441,7 @@ class Project(Base):
     customer_id = Column(Integer, ForeignKey("customers.id"), nullable=True)
     start_date = Column(DateTime)
     end_date = Column(DateTime)
-    budget = Column(Float)
+    budget = Column(Money)
     status = Column(String)  # planning, active, on-hold, completed
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -308,6 +453,11 @@ class Project(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_project_id", "project_id"),
+        Index("ix_tasks_status_assigned_to", "status", "assigned_to"),
+        Index("ix_tasks_assigned_to_status", "assigned_to", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"))
@@ -369,6 +519,22 @@ class Report(Base):
 
     creator = relationship("User")
 
+class SalesDailyRollup(Base):
+    __tablename__ = "sales_daily_rollup"
+    __table_args__ = (
+        UniqueConstraint("rollup_date", "customer_id", "product_id", "status_class", name="uq_sales_daily_rollup_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    rollup_date = Column(Date, index=True)
+    customer_id = Column(Integer, index=True)
+    product_id = Column(Integer, index=True)  # 0 holds whole-order totals
+    status_class = Column(String)  # active, cancelled
+    revenue = Column(Money, default=0)
+    quantity = Column(Integer, default=0)
+    order_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 class Dashboard(Base):
     __tablename__ = "dashboards"
 
@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Union
+
+from fastapi import HTTPException
+from sqlalchemy import Date, DateTime, Numeric, tuple_
+from sqlalchemy.orm import Query
+
+# Shared pagination for the list endpoints. Offset mode (``skip``/``limit``)
+# stays the default. Passing ``cursor`` switches to keyset mode, which
+# orders by ``(sort_column, id)`` and seeks past the last row of the
+# previous page, so page 10,000 costs the same index seek as page 1. An
+# empty ``cursor`` requests the first page; every page returns the opaque
+# ``next_cursor`` for the one after it, or ``None`` on the last page.
+# ``sort_column`` may also be a labelled SQL expression selected by the
+# query, such as a computed value, in which case rows are read by label.
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _decode_value(column: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    column_type = column.property.columns[0].type if hasattr(column, "property") else column.type
+    if isinstance(column_type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column_type, Date):
+        return date.fromisoformat(value)
+    if isinstance(column_type, Numeric):
+        return Decimal(value)
+    return value
+
+def encode_cursor(values: List[Any]) -> str:
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, columns: List[Any]) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor does not match this listing")
+        return [_decode_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(
+    query: Query,
+    id_column: Any,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort_column: Any = None,
+    descending: bool = False,
+) -> Union[List[Any], Dict[str, Any]]:
+    """Apply offset or keyset pagination to ``query``.
+
+    Returns the plain list of rows in offset mode, or
+    ``{"items": [...], "next_cursor": ...}`` in cursor mode. ``descending``
+    walks the keyset from the largest ``(sort_column, id)`` down.
+    """
+    if cursor is None:
+        return query.offset(skip).limit(limit).all()
+
+    columns = [id_column] if sort_column is None else [sort_column, id_column]
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        if len(columns) == 1:
+            seek = id_column < values[0] if descending else id_column > values[0]
+        elif descending:
+            seek = tuple_(*columns) < tuple_(*values)
+        else:
+            seek = tuple_(*columns) > tuple_(*values)
+        query = query.filter(seek)
+
+    order = [column.desc() for column in columns] if descending else columns
+    rows = query.order_by(*order).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+    return {"items": rows, "next_cursor": next_cursor}
@@ -0,0 +1,113 @@
+"""Ranked product catalog search by partial name, SKU or description.
+
+On PostgreSQL a product matches when the query is a substring of its SKU,
+name or description (``ILIKE``, served by the ``pg_trgm`` GIN indexes) or
+when its name and description contain every word of the query (full-text,
+served by the ``ix_products_search_document`` index, so "drills" finds
+"drill"). Matches are ranked by::
+
+    greatest(similarity(sku, q), similarity(name, q)) + ts_rank(document, query)
+
+with an exact SKU match always first. Other databases (the SQLite test
+suite) get the same matching and ranking computed in process: substring
+and per-word ``LIKE`` filters select the candidates, a Python port of the
+``pg_trgm`` similarity ranks them, and a word-coverage term stands in for
+``ts_rank``. The fallback does no stemming, so "drills" does not find
+"drill" there.
+"""
+import re
+from typing import Any, List, Set, Tuple
+
+from sqlalchemy import and_, func, literal_column, or_
+from sqlalchemy.orm import Session
+
+import models
+
+# Weight of the word-coverage term in the in-process ranking, about what
+# ts_rank gives a document matching every query word once.
+WORD_MATCH_WEIGHT = 0.1
+
+_WORD = re.compile(r"[^\W_]+")
+
+def trigrams(value: str) -> Set[str]:
+    """The trigrams ``pg_trgm`` extracts: per lowercased word, padded with two spaces before and one after."""
+    grams = set()
+    for word in _WORD.findall((value or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def similarity(left: str, right: str) -> float:
+    """``pg_trgm``'s ``similarity``: shared trigrams over all trigrams of both strings."""
+    return _trigram_similarity(trigrams(left), trigrams(right))
+
+def _trigram_similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def _like_pattern(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def search(db: Session, q: str, limit: int = 20) -> List[Tuple[models.Product, float]]:
+    """The ``limit`` best matches for ``q`` as ``(product, score)``, best first."""
+    q = q.strip()
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_postgresql(db, q, limit)
+    return _search_in_process(db, q, limit)
+
+def _search_postgresql(db: Session, q: str, limit: int) -> List[Tuple[models.Product, float]]:
+    product = models.Product
+    pattern = _like_pattern(q)
+    document = literal_column(models.PRODUCT_SEARCH_DOCUMENT)
+    query = func.plainto_tsquery(literal_column("'english'"), q)
+    score = (
+        func.greatest(func.similarity(product.sku, q), func.similarity(product.name, q))
+        + func.ts_rank(document, query)
+    ).label("score")
+    rows = (
+        db.query(product, score)
+        .filter(or_(
+            product.sku.ilike(pattern, escape="\\"),
+            product.name.ilike(pattern, escape="\\"),
+            product.description.ilike(pattern, escape="\\"),
+            document.op("@@")(query),
+        ))
+        .order_by((func.lower(product.sku) == q.lower()).desc(), score.desc(), product.id)
+        .limit(limit)
+        .all()
+    )
+    return [(row[0], float(row.score)) for row in rows]
+
+def _search_in_process(db: Session, q: str, limit: int) -> List[Tuple[models.Product, float]]:
+    product = models.Product
+    pattern = _like_pattern(q.lower())
+    words = _WORD.findall(q.lower())
+    name, description = func.lower(func.coalesce(product.name, "")), func.lower(func.coalesce(product.description, ""))
+    criteria = [
+        func.lower(product.sku).like(pattern, escape="\\"),
+        name.like(pattern, escape="\\"),
+        description.like(pattern, escape="\\"),
+    ]
+    if words:
+        criteria.append(and_(*(
+            or_(name.like(_like_pattern(word), escape="\\"), description.like(_like_pattern(word), escape="\\"))
+            for word in words
+        )))
+    candidates = db.query(product.id, product.sku, product.name, product.description).filter(or_(*criteria)).all()
+
+    query_trigrams = trigrams(q)
+    ranked: List[Tuple[Any, ...]] = []
+    for product_id, sku, product_name, product_description in candidates:
+        document = f"{product_name or ''} {product_description or ''}".lower()
+        coverage = sum(1 for word in words if word in document)
+        score = max(_trigram_similarity(trigrams(sku), query_trigrams), _trigram_similarity(trigrams(product_name), query_trigrams))
+        if words:
+            score += WORD_MATCH_WEIGHT * coverage / len(words)
+        ranked.append(((sku or "").lower() != q.lower(), -score, product_id, score))
+    ranked.sort()
+    top = ranked[:limit]
+
+    products = {p.id: p for p in db.query(product).filter(product.id.in_([row[2] for row in top]))}
+    return [(products[product_id], score) for _, _, product_id, score in top]
@@ -0,0 +1,112 @@
+"""Accounts receivable: aging and overdue marking.
+
+Open invoices are those ``sent`` or ``overdue``. Both the aging report and
+the overdue job filter on ``(status, due_date)``, which
+``ix_invoices_status_due_date`` serves. Run the overdue job from a
+scheduler with::
+
+    python receivables.py
+"""
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from sqlalchemy import and_, case, func, update
+from sqlalchemy.orm import Session
+
+import models
+import reporting
+
+OPEN_STATUSES = ("sent", "overdue")
+
+# (field, lower bound in days past due, upper bound); "current" is not yet due.
+AGING_BUCKETS = [
+    ("current", None, 0),
+    ("days_1_30", 0, 30),
+    ("days_31_60", 30, 60),
+    ("days_61_90", 60, 90),
+    ("days_over_90", 90, None),
+]
+
+def _bucket_condition(as_of: datetime, lower: Any, upper: Any) -> Any:
+    """Compare ``due_date`` with precomputed cut-offs so the column stays index-friendly."""
+    due_date = models.Invoice.due_date
+    conditions = []
+    if lower is not None:
+        conditions.append(due_date < as_of - timedelta(days=lower))
+    if upper is not None:
+        conditions.append(due_date >= as_of - timedelta(days=upper))
+    if lower is None:
+        # Invoices without a due date are treated as current.
+        return due_date.is_(None) | and_(*conditions)
+    return and_(*conditions)
+
+def aging(db: Session, as_of: datetime) -> Dict[str, Any]:
+    """Open invoice balances per customer, bucketed by days past due, in one grouped query."""
+    invoice = models.Invoice
+    measures = {
+        field: func.coalesce(func.sum(case((_bucket_condition(as_of, lower, upper), invoice.total_amount), else_=0)), 0)
+        for field, lower, upper in AGING_BUCKETS
+    }
+    measures["total"] = func.coalesce(func.sum(invoice.total_amount), 0)
+    measures["invoice_count"] = func.count(invoice.id)
+
+    rows = reporting.aggregate(
+        db,
+        keys={
+            "customer_id": invoice.customer_id,
+            "customer_name": func.coalesce(models.Customer.name, "Unknown"),
+        },
+        measures=measures,
+        criteria=[invoice.status.in_(OPEN_STATUSES)],
+        select_from=invoice,
+        outerjoins=[(models.Customer, models.Customer.id == invoice.customer_id)],
+    )
+
+    fields = [field for field, _, _ in AGING_BUCKETS] + ["total"]
+    totals: Dict[str, Any] = {field: reporting.money(0) for field in fields}
+    totals["invoice_count"] = 0
+    for row in rows:
+        for field in fields:
+            row[field] = reporting.money(row[field])
+            totals[field] += row[field]
+        row["invoice_count"] = int(row["invoice_count"])
+        totals["invoice_count"] += row["invoice_count"]
+    return {"customers": rows, "totals": totals}
+
+def mark_overdue(db: Session, as_of: datetime) -> int:
+    """Flip every ``sent`` invoice due before ``as_of`` to ``overdue`` in one UPDATE.
+
+    Only invoices still ``sent`` are touched, so repeated runs pick up just
+    the ones that fell due since the last run. The caller commits.
+    """
+    invoice = models.Invoice
+    result = db.execute(
+        update(invoice)
+        .where(invoice.status == "sent", invoice.due_date < as_of)
+        .values(status="overdue", updated_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def main():
+    parser = argparse.ArgumentParser(description="Mark sent invoices past their due date as overdue.")
+    parser.add_argument("--as-of", type=datetime.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        as_of = args.as_of or datetime.now()
+        marked = mark_overdue(session, as_of)
+        session.commit()
+        print(f"Marked {marked} invoices overdue as of {as_of.isoformat()}.")
+    except Exception as exc:
+        session.rollback()
+        print("Error while marking overdue invoices:", exc)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Replenishment planning: draft purchase orders for products below their reorder level.
+
+A run reads every product whose stock plus the quantity still due on open
+(``draft``, ``sent`` or ``partially_received``) purchase orders is at or below ``reorder_level``,
+in one query that the partial ``ix_products_below_reorder_level`` index
+limits to below-threshold rows. Products are grouped by their preferred
+supplier and each group becomes one draft purchase order, written with
+executemany inserts. Because open orders count towards a product's
+position, repeated runs only draft what earlier runs have not covered.
+Order quantities also cover the lead-time demand of the product's stored
+forecast (see ``forecasting.py``).
+Run it on a schedule with::
+
+    python replenishment.py
+"""
+import argparse
+import math
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+import models
+import reporting
+
+OPEN_PO_STATUSES = ("draft", "sent", "partially_received")
+
+def _on_order(product: Any) -> Any:
+    """Quantity of ``product`` still due on open purchase orders, as a correlated subquery."""
+    item, po = models.PurchaseOrderItem, models.PurchaseOrder
+    return (
+        select(func.coalesce(func.sum(item.quantity - func.coalesce(item.received_quantity, 0)), 0))
+        .join(po, po.id == item.purchase_order_id)
+        .where(item.product_id == product.id, po.status.in_(OPEN_PO_STATUSES))
+        .scalar_subquery()
+    )
+
+def order_quantity(stock_quantity: int, on_order: int, reorder_level: int, reorder_quantity: int, lead_time_demand: int = 0) -> int:
+    """Units to order: ``reorder_quantity``, or more if that would still leave the product at its reorder level.
+
+    When the forecast demand over the supplier's lead time exceeds the
+    reorder level, the order covers that demand instead.
+    """
+    shortfall = max(reorder_level, lead_time_demand) - (stock_quantity + on_order) + 1
+    return max(reorder_quantity or 0, shortfall)
+
+def plan(db: Session) -> List[Dict[str, Any]]:
+    """Products needing replenishment, with the quantity to order, ordered by supplier."""
+    product = models.Product
+    on_order = _on_order(product)
+    rows = (
+        db.query(
+            product.id.label("product_id"),
+            product.preferred_supplier_id.label("supplier_id"),
+            func.coalesce(product.stock_quantity, 0).label("stock_quantity"),
+            on_order.label("on_order"),
+            func.coalesce(product.reorder_level, 0).label("reorder_level"),
+            func.coalesce(product.reorder_quantity, 0).label("reorder_quantity"),
+            func.coalesce(product.lead_time_days, 0).label("lead_time_days"),
+            product.unit_price,
+            func.coalesce(models.DemandForecast.daily_demand, 0).label("daily_demand"),
+        )
+        .outerjoin(models.DemandForecast, models.DemandForecast.product_id == product.id)
+        .filter(
+            product.stock_quantity <= product.reorder_level,
+            product.preferred_supplier_id.isnot(None),
+            func.coalesce(product.stock_quantity, 0) + on_order <= func.coalesce(product.reorder_level, 0),
+        )
+        .order_by(product.preferred_supplier_id, product.id)
+        .all()
+    )
+    lines = []
+    for row in rows:
+        line = dict(row._mapping)
+        lead_time_demand = math.ceil(line.pop("daily_demand") * line["lead_time_days"])
+        line["quantity"] = order_quantity(line["stock_quantity"], int(line["on_order"]), line["reorder_level"], line["reorder_quantity"], lead_time_demand)
+        line["unit_price"] = reporting.money(line["unit_price"])
+        lines.append(line)
+    return lines
+
+def run(db: Session, now: datetime = None) -> Dict[str, Any]:
+    """Draft one purchase order per supplier for everything ``plan`` returns.
+
+    The caller commits. Returns a summary of the drafted orders.
+    """
+    now = now or datetime.now()
+    groups: Dict[int, List[Dict[str, Any]]] = {}
+    for line in plan(db):
+        groups.setdefault(line["supplier_id"], []).append(line)
+    if not groups:
+        return {"purchase_orders_created": 0, "items_created": 0, "purchase_orders": []}
+
+    stamp = now.strftime("%Y%m%d%H%M%S%f")
+    orders = []
+    for supplier_id, lines in groups.items():
+        orders.append({
+            "po_number": f"PO-AUTO-{stamp}-{supplier_id}",
+            "supplier_id": supplier_id,
+            "order_date": now,
+            "expected_delivery_date": now + timedelta(days=max(line["lead_time_days"] for line in lines)),
+            "status": "draft",
+            "total_amount": sum((line["quantity"] * line["unit_price"] for line in lines), Decimal(0)),
+            "created_at": now,
+            "updated_at": now,
+        })
+    po_ids = db.execute(
+        insert(models.PurchaseOrder).returning(models.PurchaseOrder.id, sort_by_parameter_order=True),
+        orders
+    ).scalars().all()
+    db.execute(insert(models.PurchaseOrderItem), [
+        {
+            "purchase_order_id": po_id,
+            "product_id": line["product_id"],
+            "quantity": line["quantity"],
+            "unit_price": line["unit_price"],
+            "total_price": line["quantity"] * line["unit_price"],
+            "created_at": now,
+            "updated_at": now,
+        }
+        for po_id, lines in zip(po_ids, groups.values())
+        for line in lines
+    ])
+    return {
+        "purchase_orders_created": len(po_ids),
+        "items_created": sum(len(lines) for lines in groups.values()),
+        "purchase_orders": [
+            {
+                "id": po_id,
+                "po_number": order["po_number"],
+                "supplier_id": order["supplier_id"],
+                "item_count": len(lines),
+                "total_amount": order["total_amount"],
+            }
+            for po_id, order, lines in zip(po_ids, orders, groups.values())
+        ],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Draft purchase orders for products below their reorder level.")
+    parser.parse_args()
+
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        summary = run(session)
+        session.commit()
+        print(f"Drafted {summary['purchase_orders_created']} purchase orders with {summary['items_created']} items.")
+    except Exception as exc:
+        session.rollback()
+        print("Error during the replenishment run:", exc)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
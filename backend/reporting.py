@@ -0,0 +1,560 @@
+from typing import Any, Dict, List, Sequence, Tuple
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from sqlalchemy import Integer, and_, case, cast, func, literal_column, or_, select
+from sqlalchemy.orm import Session
+
+import models
+
+# Shared aggregation helpers for the reporting endpoints. Reports describe
+# what to group by and what to measure; the grouping, summing and counting
+# happen in the database so a report costs one round trip regardless of how
+# many rows fall inside the requested range.
+
+def money(value: Any) -> Decimal:
+    """Coerce an aggregated amount to ``Decimal``; SQLite can hand back floats or ints."""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value or 0))
+
+def aggregate(
+    db: Session,
+    keys: Dict[str, Any],
+    measures: Dict[str, Any],
+    criteria: Sequence[Any] = (),
+    select_from: Any = None,
+    joins: Sequence[Tuple[Any, Any]] = (),
+    outerjoins: Sequence[Tuple[Any, Any]] = (),
+) -> List[Dict[str, Any]]:
+    """Run a single GROUP BY query and return one dict per group.
+
+    ``keys`` and ``measures`` map output field names to SQL expressions.
+    Rows are ordered by the key expressions so output is deterministic.
+    """
+    columns = [expr.label(name) for name, expr in keys.items()]
+    columns += [expr.label(name) for name, expr in measures.items()]
+
+    query = db.query(*columns)
+    if select_from is not None:
+        query = query.select_from(select_from)
+    for target, onclause in joins:
+        query = query.join(target, onclause)
+    for target, onclause in outerjoins:
+        query = query.outerjoin(target, onclause)
+
+    group_exprs = list(keys.values())
+    query = query.filter(*criteria).group_by(*group_exprs).order_by(*group_exprs)
+    return [dict(row._mapping) for row in query.all()]
+
+def stock_value() -> Any:
+    """``stock_quantity * unit_price`` per product, counting missing values as zero."""
+    product = models.Product
+    return func.coalesce(product.stock_quantity, 0) * func.coalesce(product.unit_price, 0)
+
+def inventory_valuation_by_category(db: Session, category: str = None) -> List[Dict[str, Any]]:
+    """Stock value summed per product category in one grouped query."""
+    product = models.Product
+    criteria = [product.category == category] if category is not None else []
+    rows = aggregate(
+        db,
+        keys={"category": func.coalesce(product.category, "Uncategorized")},
+        measures={
+            "product_count": func.count(product.id),
+            "stock_quantity": func.coalesce(func.sum(product.stock_quantity), 0),
+            "total_value": func.coalesce(func.sum(stock_value()), 0),
+        },
+        criteria=criteria,
+        select_from=product,
+    )
+    for row in rows:
+        row["stock_quantity"] = int(row["stock_quantity"])
+        row["total_value"] = money(row["total_value"])
+    return rows
+
+def low_stock_items(db: Session, since: datetime) -> List[Dict[str, Any]]:
+    """Products at or below their reorder level with their outflow since ``since``.
+
+    The outflow is one grouped aggregate over ``out`` movements, outer
+    joined to the low-stock products, so the report is a single query
+    however many products are low. Each row also carries the product's
+    stored demand forecast, if it has one.
+    """
+    product = models.Product
+    movement = models.InventoryMovement
+    forecast = models.DemandForecast
+    outflow = (
+        select(movement.product_id, func.sum(func.abs(movement.quantity)).label("quantity"))
+        .where(movement.movement_type == "out", movement.movement_date >= since)
+        .group_by(movement.product_id)
+        .subquery()
+    )
+    query = (
+        db.query(
+            product.id.label("product_id"),
+            product.name.label("product_name"),
+            product.sku,
+            product.stock_quantity,
+            product.reorder_level,
+            product.reorder_quantity,
+            func.coalesce(outflow.c.quantity, 0).label("outgoing_quantity"),
+            forecast.daily_demand.label("forecast_daily_demand"),
+            forecast.model.label("forecast_model"),
+        )
+        .outerjoin(outflow, outflow.c.product_id == product.id)
+        .outerjoin(forecast, forecast.product_id == product.id)
+        .filter(product.stock_quantity <= product.reorder_level)
+        .order_by(product.id)
+    )
+    return [dict(row._mapping) for row in query.all()]
+
+# Stock levels are rebuilt from the movement ledger with window functions,
+# the way ``stock.movement_delta`` applies movements: ``in`` adds, ``out``
+# subtracts (orders record it negative, the movement endpoint positive)
+# and ``adjustment`` sets the absolute level. Stock that
+# predates the first movement (a product created with a quantity) is worked
+# back from the product's earliest ``stock_ledger`` entry, whose balance was
+# recorded when the movement was posted. Without a ledger entry ahead of the
+# first adjustment it is current stock minus the net change of all
+# movements, which is only knowable for products that were never adjusted;
+# for the rest, levels before the first adjustment start from zero.
+
+def stock_levels(product_criteria: Sequence[Any] = ()) -> Any:
+    """Subquery of movements with the stock ``level`` after each one.
+
+    Also carries ``baseline`` (the level before the product's first
+    movement) and ``next_date`` (the date of the product's next movement,
+    NULL on the last), which lets callers find the last movement before
+    any cut-off without another pass.
+    """
+    movement = models.InventoryMovement
+    product = models.Product
+    entry = models.StockLedgerEntry
+    in_order = {"partition_by": movement.product_id, "order_by": (movement.movement_date, movement.id)}
+    whole_product = {"partition_by": movement.product_id}
+    is_adjustment = case((movement.movement_type == "adjustment", 1), else_=0)
+    has_entry = case((entry.id.isnot(None), 1), else_=0)
+    net_change = case(
+        (movement.movement_type == "in", movement.quantity),
+        (movement.movement_type == "out", -func.abs(movement.quantity)),
+        else_=0,
+    )
+    # On the product's first movement with a ledger entry, and only when no
+    # adjustment comes before it: the entry's opening balance less the net
+    # change of the movements before it.
+    ledger_baseline = case(
+        (and_(
+            entry.id.isnot(None),
+            func.sum(has_entry).over(**in_order) == 1,
+            func.sum(is_adjustment).over(**in_order) - is_adjustment == 0,
+        ), entry.balance_after - entry.quantity_change - (func.sum(net_change).over(**in_order) - net_change)),
+        else_=None,
+    )
+    ledger = (
+        select(
+            movement.id,
+            movement.product_id,
+            movement.movement_date,
+            movement.movement_type,
+            movement.quantity,
+            movement.reference,
+            func.sum(is_adjustment).over(**in_order).label("resets"),
+            case(
+                (func.sum(is_adjustment).over(**whole_product) == 0,
+                 func.coalesce(product.stock_quantity, 0) - func.sum(net_change).over(**whole_product)),
+                else_=0,
+            ).label("baseline"),
+            ledger_baseline.label("ledger_baseline"),
+            func.lead(movement.movement_date).over(**in_order).label("next_date"),
+        )
+        .join(product, product.id == movement.product_id)
+        .outerjoin(entry, entry.movement_id == movement.id)
+        .where(*product_criteria)
+        .subquery()
+    )
+    step = case(
+        (ledger.c.movement_type == "adjustment", ledger.c.quantity),
+        (ledger.c.movement_type == "in", ledger.c.quantity),
+        (ledger.c.movement_type == "out", -func.abs(ledger.c.quantity)),
+        else_=0,
+    )
+    baseline = func.coalesce(func.max(ledger.c.ledger_baseline).over(partition_by=ledger.c.product_id), ledger.c.baseline)
+    level = func.sum(step).over(
+        partition_by=(ledger.c.product_id, ledger.c.resets),
+        order_by=(ledger.c.movement_date, ledger.c.id),
+    ) + case((ledger.c.resets == 0, baseline), else_=0)
+    return select(
+        ledger.c.id,
+        ledger.c.product_id,
+        ledger.c.movement_date,
+        ledger.c.movement_type,
+        ledger.c.quantity,
+        ledger.c.reference,
+        level.label("level"),
+        baseline.label("baseline"),
+        ledger.c.next_date,
+    ).subquery()
+
+def moved_products(start_date: datetime, end_date: datetime, product_id: int = None) -> List[Any]:
+    """Criteria limiting ``stock_levels`` to products with movements in the range."""
+    movement = models.InventoryMovement
+    moved = select(movement.product_id).where(
+        movement.movement_date >= start_date,
+        movement.movement_date <= end_date,
+    ).correlate(None)
+    criteria = [movement.product_id.in_(moved)]
+    if product_id:
+        criteria.append(movement.product_id == product_id)
+    return criteria
+
+def stock_movement_summary(db: Session, start_date: datetime, end_date: datetime, product_id: int = None) -> List[Dict[str, Any]]:
+    """Opening and closing stock plus in/out/adjustment totals per product, in one query."""
+    levels = stock_levels(moved_products(start_date, end_date, product_id))
+    in_range = and_(levels.c.movement_date >= start_date, levels.c.movement_date <= end_date)
+    before_start = and_(
+        levels.c.movement_date < start_date,
+        or_(levels.c.next_date.is_(None), levels.c.next_date >= start_date),
+    )
+    last_in_range = and_(in_range, or_(levels.c.next_date.is_(None), levels.c.next_date > end_date))
+
+    def moved(movement_type):
+        return func.sum(case((and_(in_range, levels.c.movement_type == movement_type), func.abs(levels.c.quantity)), else_=0))
+
+    rows = aggregate(
+        db,
+        keys={
+            "product_id": levels.c.product_id,
+            "product_name": func.coalesce(models.Product.name, "Unknown"),
+        },
+        measures={
+            "opening_level": func.sum(case((before_start, levels.c.level), else_=0)),
+            "has_opening": func.sum(case((before_start, 1), else_=0)),
+            "baseline": func.max(levels.c.baseline),
+            "in_quantity": moved("in"),
+            "out_quantity": moved("out"),
+            "adjustment_quantity": moved("adjustment"),
+            "movement_count": func.sum(case((in_range, 1), else_=0)),
+            "ending_stock": func.sum(case((last_in_range, levels.c.level), else_=0)),
+        },
+        select_from=levels,
+        outerjoins=[(models.Product, models.Product.id == levels.c.product_id)],
+    )
+    for row in rows:
+        opening_level, has_opening, baseline = row.pop("opening_level"), row.pop("has_opening"), row.pop("baseline")
+        row["starting_stock"] = int(opening_level if has_opening else baseline)
+        for field in ("in_quantity", "out_quantity", "adjustment_quantity", "movement_count", "ending_stock"):
+            row[field] = int(row[field])
+    return rows
+
+# Sales reports read the incrementally maintained ``sales_daily_rollup``
+# when the range covers whole days, from midnight on the first day to the
+# last second of the last one. The rollup cannot split a day, so any other
+# bounds rescan orders (``source="raw"``, also kept for validation); an
+# explicit ``source="rollup"`` widens the bounds to whole days.
+SALES_SOURCES = ("rollup", "raw")
+
+def whole_days(start_date: datetime, end_date: datetime) -> bool:
+    """Whether the range starts at midnight and ends on a day's last second."""
+    return start_date.time() == time.min and end_date.time() >= time(23, 59, 59)
+
+def sales_source(start_date: datetime, end_date: datetime, source: str = None) -> str:
+    """The source a sales report reads: ``source`` if given, else the rollup for whole-day ranges."""
+    if source is not None:
+        return source
+    return "rollup" if whole_days(start_date, end_date) else "raw"
+
+def sales_criteria(start_date: datetime, end_date: datetime) -> List[Any]:
+    """Filters shared by every raw sales report: the date window, minus cancellations."""
+    return [
+        models.Order.order_date >= start_date,
+        models.Order.order_date <= end_date,
+        models.Order.status != "cancelled",
+    ]
+
+def rollup_criteria(start_date: datetime, end_date: datetime, order_totals: bool, include_cancelled: bool = False) -> List[Any]:
+    rollup = models.SalesDailyRollup
+    criteria = [
+        rollup.rollup_date >= start_date.date(),
+        rollup.rollup_date <= end_date.date(),
+        rollup.product_id == 0 if order_totals else rollup.product_id != 0,
+    ]
+    if not include_cancelled:
+        criteria.append(rollup.status_class == "active")
+    return criteria
+
+def sales_by_customer(db: Session, start_date: datetime, end_date: datetime, source: str = None) -> List[Dict[str, Any]]:
+    if sales_source(start_date, end_date, source) == "raw":
+        customer_id = models.Order.customer_id
+        measures = {
+            "order_count": func.count(models.Order.id),
+            "total_sales": func.coalesce(func.sum(models.Order.total_amount), 0),
+        }
+        criteria = sales_criteria(start_date, end_date)
+        select_from = models.Order
+    else:
+        rollup = models.SalesDailyRollup
+        customer_id = rollup.customer_id
+        measures = {
+            "order_count": func.coalesce(func.sum(rollup.order_count), 0),
+            "total_sales": func.coalesce(func.sum(rollup.revenue), 0),
+        }
+        criteria = rollup_criteria(start_date, end_date, order_totals=True) + [rollup.order_count != 0]
+        select_from = rollup
+
+    rows = aggregate(
+        db,
+        keys={
+            "customer_id": customer_id,
+            "customer_name": func.coalesce(models.Customer.name, "Unknown"),
+        },
+        measures=measures,
+        criteria=criteria,
+        select_from=select_from,
+        outerjoins=[(models.Customer, models.Customer.id == customer_id)],
+    )
+    for row in rows:
+        row["order_count"] = int(row["order_count"])
+        row["total_sales"] = money(row["total_sales"])
+    return rows
+
+def sales_by_product(db: Session, start_date: datetime, end_date: datetime, source: str = None) -> List[Dict[str, Any]]:
+    if sales_source(start_date, end_date, source) == "raw":
+        product_id = models.OrderItem.product_id
+        measures = {
+            "quantity_sold": func.coalesce(func.sum(models.OrderItem.quantity), 0),
+            "total_sales": func.coalesce(func.sum(models.OrderItem.total_price), 0),
+        }
+        criteria = sales_criteria(start_date, end_date)
+        select_from = models.OrderItem
+        joins = [(models.Order, models.Order.id == models.OrderItem.order_id)]
+    else:
+        rollup = models.SalesDailyRollup
+        product_id = rollup.product_id
+        measures = {
+            "quantity_sold": func.coalesce(func.sum(rollup.quantity), 0),
+            "total_sales": func.coalesce(func.sum(rollup.revenue), 0),
+        }
+        criteria = rollup_criteria(start_date, end_date, order_totals=False) + [rollup.order_count != 0]
+        select_from = rollup
+        joins = []
+
+    rows = aggregate(
+        db,
+        keys={
+            "product_id": product_id,
+            "product_name": func.coalesce(models.Product.name, "Unknown"),
+        },
+        measures=measures,
+        criteria=criteria,
+        select_from=select_from,
+        joins=joins,
+        outerjoins=[(models.Product, models.Product.id == product_id)],
+    )
+    for row in rows:
+        row["quantity_sold"] = int(row["quantity_sold"])
+        row["total_sales"] = money(row["total_sales"])
+    return rows
+
+# Financial statements. Revenue accounts count their credits and expense
+# accounts their debits; the transaction filters sit in the join condition
+# so accounts without activity in the period still get a zero line.
+def income_statement_lines(db: Session, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+    """One ``{account_id, account_name, account_type, amount}`` row per revenue/expense account."""
+    account, transaction = models.Account, models.Transaction
+    rows = aggregate(
+        db,
+        keys={
+            "account_id": account.id,
+            "account_name": account.name,
+            "account_type": account.type,
+        },
+        measures={"amount": func.coalesce(func.sum(transaction.amount), 0)},
+        criteria=[account.type.in_(["revenue", "expense"])],
+        select_from=account,
+        outerjoins=[(
+            transaction,
+            and_(
+                transaction.account_id == account.id,
+                transaction.transaction_date >= start_date,
+                transaction.transaction_date <= end_date,
+                or_(
+                    and_(account.type == "revenue", transaction.type == "credit"),
+                    and_(account.type == "expense", transaction.type == "debit"),
+                ),
+            ),
+        )],
+    )
+    for row in rows:
+        row["amount"] = money(row["amount"])
+    return rows
+
+def cash_flow_totals(db: Session, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+    """Inflows, outflows and transaction count across the accounts flagged ``is_cash``."""
+    transaction = models.Transaction
+    row = aggregate(
+        db,
+        keys={},
+        measures={
+            "cash_inflows": func.coalesce(func.sum(case((transaction.type == "credit", transaction.amount), else_=0)), 0),
+            "cash_outflows": func.coalesce(func.sum(case((transaction.type == "debit", transaction.amount), else_=0)), 0),
+            "transaction_count": func.count(transaction.id),
+        },
+        criteria=cash_transaction_criteria(start_date, end_date),
+        select_from=transaction,
+        joins=[(models.Account, models.Account.id == transaction.account_id)],
+    )[0]
+    return {
+        "cash_inflows": money(row["cash_inflows"]),
+        "cash_outflows": money(row["cash_outflows"]),
+        "transaction_count": int(row["transaction_count"]),
+    }
+
+def cash_transaction_criteria(start_date: datetime, end_date: datetime) -> List[Any]:
+    """Filters for transactions on cash accounts in the window; join ``Account`` first."""
+    return [
+        models.Account.is_cash.is_(True),
+        models.Transaction.transaction_date >= start_date,
+        models.Transaction.transaction_date <= end_date,
+    ]
+
+# Time bucketing. Periods are truncated in SQL (date_trunc on PostgreSQL,
+# date()/strftime() modifiers on SQLite) so a trend costs one row per
+# period; empty periods are filled in afterwards from the requested range.
+TREND_INTERVALS = ("day", "week", "month", "quarter", "year")
+
+def normalize_interval(interval: str) -> str:
+    """Unknown intervals fall back to monthly buckets."""
+    return interval if interval in TREND_INTERVALS else "month"
+
+def date_bucket(db: Session, column: Any, interval: str) -> Any:
+    """SQL expression truncating ``column`` to the start of its period."""
+    interval = normalize_interval(interval)
+    if db.get_bind().dialect.name != "sqlite":
+        # The interval comes from TREND_INTERVALS, so inlining it is safe and
+        # keeps the SELECT and GROUP BY expressions textually identical.
+        return func.date_trunc(literal_column(f"'{interval}'"), column)
+
+    if interval == "day":
+        return func.date(column)
+    if interval == "week":
+        return func.date(column, "-6 days", "weekday 1")
+    if interval == "month":
+        return func.date(column, "start of month")
+    if interval == "quarter":
+        first_month = (cast(func.strftime("%m", column), Integer) - 1) // 3 * 3 + 1
+        return func.printf("%s-%02d-01", func.strftime("%Y", column), first_month)
+    return func.date(column, "start of year")
+
+def bucket_start(value: date, interval: str) -> date:
+    """Python mirror of ``date_bucket`` used to enumerate the requested range."""
+    if isinstance(value, datetime):
+        value = value.date()
+    interval = normalize_interval(interval)
+    if interval == "day":
+        return value
+    if interval == "week":
+        return value - timedelta(days=value.weekday())
+    if interval == "month":
+        return value.replace(day=1)
+    if interval == "quarter":
+        return value.replace(month=(value.month - 1) // 3 * 3 + 1, day=1)
+    return value.replace(month=1, day=1)
+
+def next_bucket(start: date, interval: str) -> date:
+    interval = normalize_interval(interval)
+    if interval == "day":
+        return start + timedelta(days=1)
+    if interval == "week":
+        return start + timedelta(weeks=1)
+    if interval == "year":
+        return start.replace(year=start.year + 1)
+    months = 3 if interval == "quarter" else 1
+    month_index = start.month - 1 + months
+    return start.replace(year=start.year + month_index // 12, month=month_index % 12 + 1)
+
+def period_label(start: date, interval: str) -> str:
+    interval = normalize_interval(interval)
+    if interval == "day":
+        return start.strftime("%Y-%m-%d")
+    if interval == "week":
+        iso_year, iso_week, _ = start.isocalendar()
+        return f"{iso_year}-W{iso_week}"
+    if interval == "month":
+        return start.strftime("%Y-%m")
+    if interval == "quarter":
+        return f"{start.year}-Q{(start.month - 1) // 3 + 1}"
+    return str(start.year)
+
+def _as_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def time_series(
+    db: Session,
+    column: Any,
+    interval: str,
+    start_date: datetime,
+    end_date: datetime,
+    measures: Dict[str, Any],
+    criteria: Sequence[Any] = (),
+    select_from: Any = None,
+    label: str = "period",
+) -> List[Dict[str, Any]]:
+    """Aggregate ``measures`` per period, one row per period in the range.
+
+    Periods without data are returned with zeroed measures, in
+    chronological order.
+    """
+    rows = aggregate(
+        db,
+        keys={"bucket": date_bucket(db, column, interval)},
+        measures=measures,
+        criteria=criteria,
+        select_from=select_from,
+    )
+    by_start = {_as_date(row.pop("bucket")): row for row in rows}
+
+    series = []
+    current = bucket_start(start_date, interval)
+    last = bucket_start(end_date, interval)
+    while current <= last:
+        values = by_start.get(current) or {name: 0 for name in measures}
+        series.append({label: period_label(current, interval), **values})
+        current = next_bucket(current, interval)
+    return series
+
+def sales_trend(
+    db: Session,
+    start_date: datetime,
+    end_date: datetime,
+    interval: str = "month",
+    source: str = None,
+    include_cancelled: bool = False,
+    label: str = "period",
+) -> List[Dict[str, Any]]:
+    if sales_source(start_date, end_date, source) == "raw":
+        column = models.Order.order_date
+        measures = {
+            "order_count": func.count(models.Order.id),
+            "total_sales": func.coalesce(func.sum(models.Order.total_amount), 0),
+        }
+        criteria = sales_criteria(start_date, end_date)
+        if include_cancelled:
+            criteria = criteria[:2]
+    else:
+        rollup = models.SalesDailyRollup
+        column = rollup.rollup_date
+        measures = {
+            "order_count": func.coalesce(func.sum(rollup.order_count), 0),
+            "total_sales": func.coalesce(func.sum(rollup.revenue), 0),
+        }
+        criteria = rollup_criteria(start_date, end_date, order_totals=True, include_cancelled=include_cancelled)
+
+    series = time_series(db, column, interval, start_date, end_date, measures=measures, criteria=criteria, label=label)
+    for row in series:
+        row["order_count"] = int(row["order_count"])
+        row["total_sales"] = money(row["total_sales"])
+    return series
@@ -0,0 +1,238 @@
+"""Maintenance of the ``sales_daily_rollup`` table.
+
+Each row holds revenue, quantity and order count for one
+(date, customer, product, status class). Rows with ``product_id`` set to
+``ORDER_TOTAL`` carry whole-order figures (``Order.total_amount`` and one
+count per order) for the customer and trend reports; the other rows carry
+line-item figures per product.
+
+The order write paths call ``record_orders`` and ``record_status_change``
+inside their own transaction. Rebuild from history with::
+
+    python sales_rollup.py --chunk-size 5000
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+import reporting
+
+ORDER_TOTAL = 0
+UPSERT_BATCH_SIZE = 1000
+
+RollupKey = Tuple[date, int, int, str]
+
+def status_class(status: str) -> str:
+    return "cancelled" if status == "cancelled" else "active"
+
+def _rollup_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.now().date()
+
+def _add(totals: Dict[RollupKey, List[Any]], key: RollupKey, revenue: Decimal, quantity: int, order_count: int) -> None:
+    bucket = totals[key]
+    bucket[0] += revenue
+    bucket[1] += quantity
+    bucket[2] += order_count
+
+def _merge(totals: Dict[RollupKey, List[Any]], contributions: Dict[RollupKey, List[Any]]) -> None:
+    for key, (revenue, quantity, order_count) in contributions.items():
+        _add(totals, key, revenue, quantity, order_count)
+
+def _order_contributions(order: Any, lines: Iterable[Tuple[int, int, Decimal]], sign: int, cls: str) -> Dict[RollupKey, List[Any]]:
+    """Rollup deltas for one order given its ``(product_id, quantity, total_price)`` lines."""
+    totals: Dict[RollupKey, List[Any]] = defaultdict(lambda: [Decimal(0), 0, 0])
+    day = _rollup_date(order.order_date)
+    customer_id = order.customer_id or 0
+
+    per_product: Dict[int, List[Any]] = defaultdict(lambda: [Decimal(0), 0])
+    for product_id, quantity, total_price in lines:
+        per_product[product_id][0] += reporting.money(total_price)
+        per_product[product_id][1] += quantity or 0
+
+    order_quantity = 0
+    for product_id, (revenue, quantity) in per_product.items():
+        _add(totals, (day, customer_id, product_id, cls), sign * revenue, sign * quantity, sign)
+        order_quantity += quantity
+    _add(totals, (day, customer_id, ORDER_TOTAL, cls), sign * reporting.money(order.total_amount), sign * order_quantity, sign)
+    return totals
+
+def _upsert(db: Session, totals: Dict[RollupKey, List[Any]]) -> None:
+    """Add ``totals`` onto the rollup with one INSERT ... ON CONFLICT per batch.
+
+    Dialects without ON CONFLICT fall back to ``_update_then_insert``.
+    """
+    if not totals:
+        return
+    table = models.SalesDailyRollup.__table__
+    rows = [
+        {
+            "rollup_date": day,
+            "customer_id": customer_id,
+            "product_id": product_id,
+            "status_class": cls,
+            "revenue": revenue,
+            "quantity": int(quantity),
+            "order_count": int(order_count),
+            "updated_at": datetime.now(),
+        }
+        for (day, customer_id, product_id, cls), (revenue, quantity, order_count) in totals.items()
+    ]
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        _update_then_insert(db, rows)
+        return
+
+    for offset in range(0, len(rows), UPSERT_BATCH_SIZE):
+        stmt = insert(table).values(rows[offset:offset + UPSERT_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["rollup_date", "customer_id", "product_id", "status_class"],
+            set_={
+                "revenue": table.c.revenue + stmt.excluded.revenue,
+                "quantity": table.c.quantity + stmt.excluded.quantity,
+                "order_count": table.c.order_count + stmt.excluded.order_count,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.execute(stmt)
+
+def _update_then_insert(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Portable upsert: add onto each existing row, insert the rows no UPDATE matched.
+
+    Two writers inserting the same new key race here; the loser hits the
+    unique constraint and its transaction fails rather than double counting.
+    """
+    table = models.SalesDailyRollup.__table__
+    missing = []
+    for row in rows:
+        result = db.execute(
+            update(table)
+            .where(
+                table.c.rollup_date == row["rollup_date"],
+                table.c.customer_id == row["customer_id"],
+                table.c.product_id == row["product_id"],
+                table.c.status_class == row["status_class"],
+            )
+            .values(
+                revenue=table.c.revenue + row["revenue"],
+                quantity=table.c.quantity + row["quantity"],
+                order_count=table.c.order_count + row["order_count"],
+                updated_at=row["updated_at"],
+            )
+        )
+        if result.rowcount == 0:
+            missing.append(row)
+    if missing:
+        db.execute(table.insert(), missing)
+
+def _order_lines(db: Session, order_id: int) -> List[Tuple[int, int, Decimal]]:
+    return [
+        (row.product_id, row.quantity, row.total_price)
+        for row in db.query(
+            models.OrderItem.product_id,
+            models.OrderItem.quantity,
+            models.OrderItem.total_price,
+        ).filter(models.OrderItem.order_id == order_id)
+    ]
+
+def record_orders(db: Session, orders: Iterable[Tuple[Any, Iterable[Tuple[int, int, Decimal]]]]) -> None:
+    """Add newly created ``(order, lines)`` pairs to the rollup in one upsert."""
+    totals: Dict[RollupKey, List[Any]] = defaultdict(lambda: [Decimal(0), 0, 0])
+    for order, lines in orders:
+        _merge(totals, _order_contributions(order, lines, 1, status_class(order.status)))
+    _upsert(db, totals)
+
+def record_order(db: Session, order: Any, lines: Iterable[Tuple[int, int, Decimal]]) -> None:
+    """Add a newly created order to the rollup."""
+    record_orders(db, [(order, lines)])
+
+def record_status_change(db: Session, order: Any, old_status: str, new_status: str) -> None:
+    """Move an order between status classes, e.g. reverse it on cancellation."""
+    old_class, new_class = status_class(old_status), status_class(new_status)
+    if old_class == new_class:
+        return
+    lines = _order_lines(db, order.id)
+    totals = _order_contributions(order, lines, -1, old_class)
+    _merge(totals, _order_contributions(order, lines, 1, new_class))
+    _upsert(db, totals)
+
+def rebuild(db: Session, chunk_size: int = 5000) -> int:
+    """Recompute the rollup from ``orders``/``order_items`` in id-ordered chunks.
+
+    Only one chunk of orders is held in memory at a time; partial totals
+    from each chunk are merged into the table by the upsert. Returns the
+    number of orders processed.
+    """
+    db.execute(delete(models.SalesDailyRollup))
+    processed = 0
+    last_id = 0
+    while True:
+        orders = (
+            db.query(
+                models.Order.id,
+                models.Order.order_date,
+                models.Order.customer_id,
+                models.Order.status,
+                models.Order.total_amount,
+            )
+            .filter(models.Order.id > last_id)
+            .order_by(models.Order.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not orders:
+            break
+        lines_by_order: Dict[int, List[Tuple[int, int, Decimal]]] = defaultdict(list)
+        for item in db.query(
+            models.OrderItem.order_id,
+            models.OrderItem.product_id,
+            models.OrderItem.quantity,
+            models.OrderItem.total_price,
+        ).filter(models.OrderItem.order_id >= orders[0].id, models.OrderItem.order_id <= orders[-1].id):
+            lines_by_order[item.order_id].append((item.product_id, item.quantity, item.total_price))
+
+        totals: Dict[RollupKey, List[Any]] = defaultdict(lambda: [Decimal(0), 0, 0])
+        for order in orders:
+            _merge(totals, _order_contributions(order, lines_by_order.get(order.id, ()), 1, status_class(order.status)))
+        _upsert(db, totals)
+        db.commit()
+
+        processed += len(orders)
+        last_id = orders[-1].id
+    db.commit()
+    return processed
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the sales_daily_rollup table from order history.")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    from database import SessionLocal, engine, Base
+
+    Base.metadata.create_all(bind=engine, tables=[models.SalesDailyRollup.__table__])
+    session = SessionLocal()
+    try:
+        processed = rebuild(session, chunk_size=args.chunk_size)
+        print(f"Rebuilt sales rollup from {processed} orders.")
+    except Exception as exc:
+        session.rollback()
+        print("Error while rebuilding sales rollup:", exc)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
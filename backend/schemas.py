@@ -1,6 +1,12 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, PlainSerializer
+from typing import List, Optional, Dict, Any, Generic, TypeVar
+from typing_extensions import Annotated
 from datetime import datetime
+from decimal import Decimal
+
+# Monetary values are exact Decimals in the application and plain JSON
+# numbers on the wire.
+Money = Annotated[Decimal, PlainSerializer(float, return_type=float, when_used="json")]
 
 # Base schemas for common fields
 class TimestampMixin(BaseModel):
@@ -29,7 +35,8 @@ class AccountBase(BaseModel):
     account_code: str
     name: str
     type: str
-    balance: float = 0.0
+    balance: Money = Decimal(0)
+    is_cash: bool = False
 
 class AccountCreate(AccountBase):
     pass
@@ -42,7 +49,7 @@ class Account(AccountBase, TimestampMixin):
 
 class TransactionBase(BaseModel):
     transaction_date: datetime
-    amount: float
+    amount: Money
     description: str
     type: str
     account_id: int
@@ -54,13 +61,33 @@ class TransactionCreate(TransactionBase):
 
 class TransactionUpdate(BaseModel):
     transaction_date: Optional[datetime] = None
-    amount: Optional[float] = None
+    amount: Optional[Money] = None
     description: Optional[str] = None
     type: Optional[str] = None
     account_id: Optional[int] = None
     order_id: Optional[int] = None
     project_id: Optional[int] = None
 
+class JournalLine(BaseModel):
+    account_id: int
+    type: str  # debit, credit
+    amount: Money
+    description: Optional[str] = None  # defaults to the entry description
+    order_id: Optional[int] = None
+    project_id: Optional[int] = None
+
+class JournalEntryCreate(BaseModel):
+    transaction_date: datetime
+    description: str
+    lines: List[JournalLine]
+
+class JournalEntryResult(BaseModel):
+    transaction_date: datetime
+    lines_posted: int
+    accounts_updated: int
+    total_debits: Money
+    total_credits: Money
+
 class StatusUpdate(BaseModel):
     status: str
     progress: Optional[int] = None
@@ -75,9 +102,9 @@ class InvoiceBase(BaseModel):
     invoice_number: str
     customer_id: int
     order_id: Optional[int] = None
-    amount: float
-    tax_amount: float
-    total_amount: float
+    amount: Money
+    tax_amount: Money
+    total_amount: Money
     issue_date: datetime
     due_date: datetime
     status: str
@@ -98,7 +125,7 @@ class CustomerBase(BaseModel):
     email: str
     phone: str
     address: str
-    credit_limit: float = 0.0
+    credit_limit: Money = Decimal(0)
 
 class CustomerCreate(CustomerBase):
     pass
@@ -109,7 +136,7 @@ class CustomerUpdate(BaseModel):
     email: Optional[str] = None
     phone: Optional[str] = None
     address: Optional[str] = None
-    credit_limit: Optional[float] = None
+    credit_limit: Optional[Money] = None
 
 class Customer(CustomerBase, TimestampMixin):
     id: int
@@ -120,9 +147,9 @@ class Customer(CustomerBase, TimestampMixin):
 class OrderItemBase(BaseModel):
     product_id: int
     quantity: int
-    unit_price: float
-    discount: float = 0.0
-    total_price: float
+    unit_price: Money
+    discount: Money = Decimal(0)
+    total_price: Money
 
 class OrderItemCreate(OrderItemBase):
     pass
@@ -141,7 +168,7 @@ class OrderBase(BaseModel):
     required_date: datetime
     shipped_date: Optional[datetime] = None
     status: str
-    total_amount: float
+    total_amount: Money
 
 class OrderCreate(OrderBase):
     items: List[OrderItemCreate]
@@ -159,11 +186,12 @@ class ProductBase(BaseModel):
     name: str
     description: str
     category: str
-    unit_price: float
+    unit_price: Money
     stock_quantity: int = 0
     reorder_level: int = 0
     reorder_quantity: int = 0
     lead_time_days: int = 0
+    preferred_supplier_id: Optional[int] = None
 
 class ProductCreate(ProductBase):
     pass
@@ -173,11 +201,12 @@ class ProductUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     category: Optional[str] = None
-    unit_price: Optional[float] = None
+    unit_price: Optional[Money] = None
     stock_quantity: Optional[int] = None
     reorder_level: Optional[int] = None
     reorder_quantity: Optional[int] = None
     lead_time_days: Optional[int] = None
+    preferred_supplier_id: Optional[int] = None
 
 class Product(ProductBase, TimestampMixin):
     id: int
@@ -185,6 +214,10 @@ class Product(ProductBase, TimestampMixin):
     class Config:
         orm_mode = True
 
+class ProductSearchResult(BaseModel):
+    score: float
+    product: Product
+
 class InventoryMovementBase(BaseModel):
     product_id: int
     quantity: int
@@ -220,8 +253,8 @@ class Supplier(SupplierBase, TimestampMixin):
 class PurchaseOrderItemBase(BaseModel):
     product_id: int
     quantity: int
-    unit_price: float
-    total_price: float
+    unit_price: Money
+    total_price: Money
 
 class PurchaseOrderItemCreate(PurchaseOrderItemBase):
     pass
@@ -229,6 +262,7 @@ class PurchaseOrderItemCreate(PurchaseOrderItemBase):
 class PurchaseOrderItem(PurchaseOrderItemBase, TimestampMixin):
     id: int
     purchase_order_id: int
+    received_quantity: Optional[int] = 0
     
     class Config:
         orm_mode = True
@@ -239,7 +273,7 @@ class PurchaseOrderBase(BaseModel):
     order_date: datetime
     expected_delivery_date: datetime
     status: str
-    total_amount: float
+    total_amount: Money
 
 class PurchaseOrderCreate(PurchaseOrderBase):
     items: List[PurchaseOrderItemCreate]
@@ -251,6 +285,37 @@ class PurchaseOrder(PurchaseOrderBase, TimestampMixin):
     class Config:
         orm_mode = True
 
+class ReceiptLine(BaseModel):
+    item_id: int  # purchase order item
+    quantity: int
+
+class PurchaseOrderReceiptCreate(BaseModel):
+    receipt_id: str  # idempotency key; resending the same receipt applies it once
+    received_at: Optional[datetime] = None
+    lines: List[ReceiptLine]
+
+class PurchaseOrderReceiptResult(BaseModel):
+    receipt_id: str
+    purchase_order_id: int
+    status: str
+    received_at: datetime
+    lines_received: int
+    units_received: int
+    duplicate: bool = False
+
+class DemandForecast(BaseModel):
+    product_id: int
+    model: str
+    daily_demand: float
+    horizon_days: int
+    horizon_demand: float
+    backtest_error: float
+    history_days: int
+    generated_at: datetime
+
+    class Config:
+        orm_mode = True
+
 class ShipmentBase(BaseModel):
     shipment_number: str
     order_id: int
@@ -287,6 +352,9 @@ class ProcessEventCreate(ProcessEventBase):
 
 class ProcessEvent(ProcessEventBase, TimestampMixin):
     id: int
+    product_id: Optional[int] = None
+    alert_kind: Optional[str] = None
+    occurrences: Optional[int] = None
     
     class Config:
         orm_mode = True
@@ -335,7 +403,7 @@ class ProjectBase(BaseModel):
     customer_id: Optional[int] = None
     start_date: datetime
     end_date: datetime
-    budget: float
+    budget: Money
     status: str
 
 class ProjectCreate(ProjectBase):
@@ -348,7 +416,7 @@ class ProjectUpdate(BaseModel):
     customer_id: Optional[int] = None
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
-    budget: Optional[float] = None
+    budget: Optional[Money] = None
     status: Optional[str] = None
 
 class Project(ProjectBase, TimestampMixin):
@@ -505,6 +573,14 @@ class StandardResponse(BaseModel):
     message: str
     data: Optional[Any] = None
 
+T = TypeVar("T")
+
+class CursorPage(BaseModel, Generic[T]):
+    """A page of a list endpoint in cursor mode."""
+
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 # Dashboard schemas
 class DashboardNotification(BaseModel):
     id: int
@@ -512,11 +588,17 @@ class DashboardNotification(BaseModel):
     date: datetime
 
 
+class SalesTrendPoint(BaseModel):
+    month: str
+    order_count: int
+    total_sales: Money
+
+
 class DashboardSummary(BaseModel):
     """Aggregated metrics returned by the dashboard service."""
 
-    financial_kpis: Dict[str, float]
+    financial_kpis: Dict[str, Money]
     active_orders: int
     low_stock_items: int
-    sales_trend: List[Dict[str, Any]]
+    sales_trend: List[SalesTrendPoint]
     notifications: List[Dict[str, Any]]
@@ -158,16 +158,16 @@ def seed_accounts(session):
         return
 
     accounts_data = [
-        ("1000", "Cash", "asset"),
-        ("2000", "Accounts Payable", "liability"),
-        ("3000", "Equity", "equity"),
-        ("4000", "Sales Revenue", "revenue"),
-        ("5000", "Cost of Goods Sold", "expense"),
+        ("1000", "Cash", "asset", True),
+        ("2000", "Accounts Payable", "liability", False),
+        ("3000", "Equity", "equity", False),
+        ("4000", "Sales Revenue", "revenue", False),
+        ("5000", "Cost of Goods Sold", "expense", False),
     ]
 
     accounts = [
-        Account(account_code=code, name=name, type=typ, balance=0.0)
-        for code, name, typ in accounts_data
+        Account(account_code=code, name=name, type=typ, balance=0.0, is_cash=is_cash)
+        for code, name, typ, is_cash in accounts_data
     ]
     session.add_all(accounts)
     print(f"Seeded {len(accounts)} accounts.")
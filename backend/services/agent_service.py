@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from database import get_db
 import models
 import schemas
+import pagination
 
 router = APIRouter()
 
@@ -22,9 +23,9 @@ async def create_agent_config(agent_config: schemas.AgentConfigCreate, db: Sessi
     db.refresh(db_agent_config)
     return db_agent_config
 
-@router.get("/agents", response_model=List[schemas.AgentConfig])
-async def get_agent_configs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    agent_configs = db.query(models.AgentConfig).offset(skip).limit(limit).all()
+@router.get("/agents", response_model=Union[List[schemas.AgentConfig], schemas.CursorPage[schemas.AgentConfig]])
+async def get_agent_configs(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    agent_configs = pagination.paginate(db.query(models.AgentConfig), models.AgentConfig.id, skip, limit, cursor)
     return agent_configs
 
 @router.get("/agents/{agent_config_id}", response_model=schemas.AgentConfig)
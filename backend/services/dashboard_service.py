@@ -1,6 +1,4 @@
-from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from datetime import datetime, time, timedelta
 
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
@@ -9,6 +7,7 @@ from sqlalchemy import func
 from database import get_db
 import models
 import schemas
+import reporting
 
 router = APIRouter()
 
@@ -36,17 +35,19 @@ def get_dashboard_summary(db: Session = Depends(get_db)) -> schemas.DashboardSum
     # Low stock items
     low_stock_items = db.query(models.Product).filter(models.Product.stock_quantity <= models.Product.reorder_level).count()
 
-    # Sales trend for last 6 months
-    start_date = datetime.utcnow() - timedelta(days=180)
-    orders = db.query(models.Order).filter(models.Order.order_date >= start_date).all()
-    trend_map: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"month": "", "total_sales": 0.0, "order_count": 0})
-    for order in orders:
-        key = order.order_date.strftime("%Y-%m")
-        bucket = trend_map[key]
-        bucket["month"] = key
-        bucket["total_sales"] += order.total_amount
-        bucket["order_count"] += 1
-    sales_trend = [trend_map[k] for k in sorted(trend_map.keys())]
+    # Sales trend for last 6 months, bucketed by month in SQL; whole days,
+    # so it reads the sales rollup
+    today = datetime.utcnow().date()
+    start_date = datetime.combine(today - timedelta(days=180), time.min)
+    end_date = datetime.combine(today, time.max)
+    sales_trend = reporting.sales_trend(
+        db,
+        start_date,
+        end_date,
+        interval="month",
+        include_cancelled=True,
+        label="month",
+    )
 
     # Recent notifications (process events)
     events = (
@@ -1,11 +1,19 @@
+from collections import defaultdict
+from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime, timedelta
 
 from database import get_db
+import balances
 import models
 import schemas
+import pagination
+import receivables
+import reporting
+import streaming
 
 router = APIRouter()
 
@@ -18,9 +26,9 @@ async def create_account(account: schemas.AccountCreate, db: Session = Depends(g
     db.refresh(db_account)
     return db_account
 
-@router.get("/accounts", response_model=List[schemas.Account])
-async def get_accounts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    accounts = db.query(models.Account).offset(skip).limit(limit).all()
+@router.get("/accounts", response_model=Union[List[schemas.Account], schemas.CursorPage[schemas.Account]])
+async def get_accounts(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    accounts = pagination.paginate(db.query(models.Account), models.Account.id, skip, limit, cursor)
     return accounts
 
 @router.get("/accounts/{account_id}", response_model=schemas.Account)
@@ -56,25 +64,106 @@ async def create_transaction(transaction: schemas.TransactionCreate, db: Session
     db.add(db_transaction)
     
     # Update account balance
-    if transaction.type == "credit":
-        account.balance += transaction.amount
-    elif transaction.type == "debit":
-        account.balance -= transaction.amount
+    effect = balances.signed_amount(transaction.type, transaction.amount)
+    balances.apply_balance_deltas(db, {account.id: effect})
+    balances.adjust_snapshots(db, account.id, transaction.transaction_date, effect)
     
     db.commit()
     db.refresh(db_transaction)
     return db_transaction
 
-@router.get("/transactions", response_model=List[schemas.Transaction])
+@router.post("/journal-entries", response_model=schemas.JournalEntryResult, status_code=status.HTTP_201_CREATED)
+async def post_journal_entry(entry: schemas.JournalEntryCreate, db: Session = Depends(get_db)):
+    """Post a balanced batch of lines with one insert, one balance update per account and one commit."""
+    if not entry.lines:
+        raise HTTPException(status_code=400, detail="Journal entry has no lines")
+    
+    valid_types = ["debit", "credit"]
+    totals = {"debit": Decimal(0), "credit": Decimal(0)}
+    for line in entry.lines:
+        if line.type not in valid_types:
+            raise HTTPException(status_code=400, detail=f"Invalid type. Must be one of: {', '.join(valid_types)}")
+        if line.amount < 0:
+            raise HTTPException(status_code=400, detail="Line amounts must not be negative")
+        totals[line.type] += line.amount
+    if round(totals["debit"] - totals["credit"], 2) != 0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Journal entry is unbalanced: debits {totals['debit']:.2f}, credits {totals['credit']:.2f}"
+        )
+    
+    # Validate every account with one IN query
+    account_ids = {line.account_id for line in entry.lines}
+    found = {row.id for row in db.query(models.Account.id).filter(models.Account.id.in_(account_ids))}
+    missing = sorted(account_ids - found)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Account with ID {missing[0]} not found")
+    
+    rows = []
+    deltas = defaultdict(Decimal)
+    for line in entry.lines:
+        rows.append({
+            "transaction_date": entry.transaction_date,
+            "amount": line.amount,
+            "description": line.description or entry.description,
+            "type": line.type,
+            "account_id": line.account_id,
+            "order_id": line.order_id,
+            "project_id": line.project_id,
+        })
+        deltas[line.account_id] += balances.signed_amount(line.type, line.amount)
+    
+    db.execute(insert(models.Transaction), rows)
+    balances.apply_balance_deltas(db, deltas)
+    balances.adjust_snapshots_many(db, {(account_id, entry.transaction_date): delta for account_id, delta in deltas.items()})
+    db.commit()
+    
+    return {
+        "transaction_date": entry.transaction_date,
+        "lines_posted": len(rows),
+        "accounts_updated": len(deltas),
+        "total_debits": totals["debit"],
+        "total_credits": totals["credit"],
+    }
+
+@router.get("/transactions", response_model=Union[List[schemas.Transaction], schemas.CursorPage[schemas.Transaction]])
 async def get_transactions(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
+    account_id: Optional[int] = None,
+    order_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    query = _transactions_query(db, account_id, order_id, project_id, start_date, end_date)
+    transactions = pagination.paginate(query, models.Transaction.id, skip, limit, cursor, sort_column=models.Transaction.transaction_date)
+    return transactions
+
+@router.get("/transactions/export")
+async def export_transactions(
+    format: str = "csv",
     account_id: Optional[int] = None,
     order_id: Optional[int] = None,
     project_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     db: Session = Depends(get_db)
+):
+    format = streaming.export_format(format)
+    query = _transactions_query(db, account_id, order_id, project_id, start_date, end_date)
+    query = query.order_by(models.Transaction.transaction_date, models.Transaction.id)
+    return streaming.export_response(db, query, models.Transaction, format, "transactions")
+
+def _transactions_query(
+    db: Session,
+    account_id: Optional[int],
+    order_id: Optional[int],
+    project_id: Optional[int],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
 ):
     query = db.query(models.Transaction)
     
@@ -88,9 +177,7 @@ async def get_transactions(
         query = query.filter(models.Transaction.transaction_date >= start_date)
     if end_date:
         query = query.filter(models.Transaction.transaction_date <= end_date)
-    
-    transactions = query.offset(skip).limit(limit).all()
-    return transactions
+    return query
 
 @router.get("/transactions/{transaction_id}", response_model=schemas.Transaction)
 async def get_transaction_by_id(transaction_id: int, db: Session = Depends(get_db)):
@@ -125,27 +212,23 @@ async def update_transaction(transaction_id: int, transaction: schemas.Transacti
         account = db.query(models.Account).filter(models.Account.id == current_data["account_id"]).first()
         if account is None:
             raise HTTPException(status_code=404, detail="Account not found")
-    else:
-        account = db.query(models.Account).filter(models.Account.id == db_transaction.account_id).first()
+    
+    old_effect = balances.signed_amount(db_transaction.type, db_transaction.amount)
+    new_effect = balances.signed_amount(current_data["type"], current_data["amount"])
+    
+    # Move the transaction's effect on any balance snapshots taken since it was dated
+    balances.adjust_snapshots(db, db_transaction.account_id, db_transaction.transaction_date, -old_effect)
+    balances.adjust_snapshots(db, current_data["account_id"], current_data["transaction_date"], new_effect)
+    
+    # Update account balance: reverse the old effect, then apply the new one
+    deltas = {db_transaction.account_id: -old_effect}
+    deltas[current_data["account_id"]] = deltas.get(current_data["account_id"], 0) + new_effect
+    balances.apply_balance_deltas(db, deltas)
     
     # Update transaction
     for key, value in current_data.items():
         setattr(db_transaction, key, value)
     
-    # Update account balance
-    if "amount" in update_data or "type" in update_data:
-        # Reverse the old transaction effect
-        if db_transaction.type == "credit":
-            account.balance -= db_transaction.amount
-        elif db_transaction.type == "debit":
-            account.balance += db_transaction.amount
-        
-        # Apply the new transaction effect
-        if current_data["type"] == "credit":
-            account.balance += current_data["amount"]
-        elif current_data["type"] == "debit":
-            account.balance -= current_data["amount"]
-    
     db.commit()
     db.refresh(db_transaction)
     return db_transaction
@@ -157,12 +240,9 @@ async def delete_transaction(transaction_id: int, db: Session = Depends(get_db))
         raise HTTPException(status_code=404, detail="Transaction not found")
     
     # Update account balance
-    account = db.query(models.Account).filter(models.Account.id == db_transaction.account_id).first()
-    if account is not None:
-        if db_transaction.type == "credit":
-            account.balance -= db_transaction.amount
-        elif db_transaction.type == "debit":
-            account.balance += db_transaction.amount
+    effect = balances.signed_amount(db_transaction.type, db_transaction.amount)
+    balances.apply_balance_deltas(db, {db_transaction.account_id: -effect})
+    balances.adjust_snapshots(db, db_transaction.account_id, db_transaction.transaction_date, -effect)
     
     db.delete(db_transaction)
     db.commit()
@@ -188,10 +268,11 @@ async def create_invoice(invoice: schemas.InvoiceCreate, db: Session = Depends(g
     db.refresh(db_invoice)
     return db_invoice
 
-@router.get("/invoices", response_model=List[schemas.Invoice])
+@router.get("/invoices", response_model=Union[List[schemas.Invoice], schemas.CursorPage[schemas.Invoice]])
 async def get_invoices(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     customer_id: Optional[int] = None,
     order_id: Optional[int] = None,
     status: Optional[str] = None,
@@ -212,9 +293,18 @@ async def get_invoices(
     if end_date:
         query = query.filter(models.Invoice.issue_date <= end_date)
     
-    invoices = query.offset(skip).limit(limit).all()
+    invoices = pagination.paginate(query, models.Invoice.id, skip, limit, cursor, sort_column=models.Invoice.issue_date)
     return invoices
 
+@router.post("/invoices/mark-overdue")
+async def mark_overdue_invoices(as_of: datetime = None, db: Session = Depends(get_db)):
+    """Flip every sent invoice past its due date to overdue in one bulk update."""
+    if as_of is None:
+        as_of = datetime.now()
+    marked = receivables.mark_overdue(db, as_of)
+    db.commit()
+    return {"as_of": as_of, "invoices_marked": marked}
+
 @router.put("/invoices/{invoice_id}/status", response_model=schemas.Invoice)
 async def update_invoice_status(invoice_id: int, status_update: schemas.StatusUpdate, db: Session = Depends(get_db)):
     db_invoice = db.query(models.Invoice).filter(models.Invoice.id == invoice_id).first()
@@ -226,10 +316,11 @@ async def update_invoice_status(invoice_id: int, status_update: schemas.StatusUp
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
     
+    previous_status = db_invoice.status
     db_invoice.status = status
     
     # If status is paid, create a transaction
-    if status == "paid":
+    if status == "paid" and previous_status != "paid":
         # Create a credit transaction for the invoice amount
         transaction = models.Transaction(
             transaction_date=datetime.now(),
@@ -240,6 +331,9 @@ async def update_invoice_status(invoice_id: int, status_update: schemas.StatusUp
             order_id=db_invoice.order_id
         )
         db.add(transaction)
+        effect = balances.signed_amount(transaction.type, transaction.amount)
+        balances.apply_balance_deltas(db, {transaction.account_id: effect})
+        balances.adjust_snapshots(db, transaction.account_id, transaction.transaction_date, effect)
     
     db.commit()
     db.refresh(db_invoice)
@@ -252,31 +346,18 @@ async def get_income_statement(
     end_date: datetime,
     db: Session = Depends(get_db)
 ):
-    # Get revenue (credit transactions for revenue accounts)
-    revenue_accounts = db.query(models.Account).filter(models.Account.type == "revenue").all()
-    revenue_account_ids = [account.id for account in revenue_accounts]
-    
-    revenue_transactions = db.query(models.Transaction).filter(
-        models.Transaction.account_id.in_(revenue_account_ids),
-        models.Transaction.transaction_date >= start_date,
-        models.Transaction.transaction_date <= end_date,
-        models.Transaction.type == "credit"
-    ).all()
-    
-    total_revenue = sum(transaction.amount for transaction in revenue_transactions)
-    
-    # Get expenses (debit transactions for expense accounts)
-    expense_accounts = db.query(models.Account).filter(models.Account.type == "expense").all()
-    expense_account_ids = [account.id for account in expense_accounts]
-    
-    expense_transactions = db.query(models.Transaction).filter(
-        models.Transaction.account_id.in_(expense_account_ids),
-        models.Transaction.transaction_date >= start_date,
-        models.Transaction.transaction_date <= end_date,
-        models.Transaction.type == "debit"
-    ).all()
-    
-    total_expenses = sum(transaction.amount for transaction in expense_transactions)
+    lines = reporting.income_statement_lines(db, start_date, end_date)
+    revenue_breakdown = [
+        {"account_id": line["account_id"], "account_name": line["account_name"], "amount": line["amount"]}
+        for line in lines if line["account_type"] == "revenue"
+    ]
+    expense_breakdown = [
+        {"account_id": line["account_id"], "account_name": line["account_name"], "amount": line["amount"]}
+        for line in lines if line["account_type"] == "expense"
+    ]
+    
+    total_revenue = sum(line["amount"] for line in revenue_breakdown)
+    total_expenses = sum(line["amount"] for line in expense_breakdown)
     
     # Calculate net income
     net_income = total_revenue - total_expenses
@@ -287,88 +368,109 @@ async def get_income_statement(
         "total_revenue": total_revenue,
         "total_expenses": total_expenses,
         "net_income": net_income,
-        "revenue_breakdown": [
-            {"account_id": account.id, "account_name": account.name, "amount": sum(t.amount for t in revenue_transactions if t.account_id == account.id)}
-            for account in revenue_accounts
-        ],
-        "expense_breakdown": [
-            {"account_id": account.id, "account_name": account.name, "amount": sum(t.amount for t in expense_transactions if t.account_id == account.id)}
-            for account in expense_accounts
-        ]
+        "revenue_breakdown": revenue_breakdown,
+        "expense_breakdown": expense_breakdown
+    }
+
+@router.get("/reports/ar-aging")
+async def get_ar_aging(as_of: datetime = None, db: Session = Depends(get_db)):
+    if as_of is None:
+        as_of = datetime.now()
+    
+    aging = receivables.aging(db, as_of)
+    return {
+        "as_of": as_of,
+        "buckets": [field for field, _, _ in receivables.AGING_BUCKETS],
+        "customers": aging["customers"],
+        "totals": aging["totals"]
     }
 
 @router.get("/reports/balance-sheet")
 async def get_balance_sheet(date: datetime = None, db: Session = Depends(get_db)):
     if date is None:
+        # Live balances
         date = datetime.now()
+        accounts = db.query(models.Account).filter(models.Account.type.in_(["asset", "liability", "equity"])).all()
+        lines = [
+            {"account_id": account.id, "account_name": account.name, "account_type": account.type, "balance": account.balance}
+            for account in accounts
+        ]
+    else:
+        # Nearest balance snapshot plus the transactions dated since
+        lines = balances.balances_as_of(db, date, ["asset", "liability", "equity"])
     
-    # Get assets
-    asset_accounts = db.query(models.Account).filter(models.Account.type == "asset").all()
-    total_assets = sum(account.balance for account in asset_accounts)
-    
-    # Get liabilities
-    liability_accounts = db.query(models.Account).filter(models.Account.type == "liability").all()
-    total_liabilities = sum(account.balance for account in liability_accounts)
-    
-    # Get equity
-    equity_accounts = db.query(models.Account).filter(models.Account.type == "equity").all()
-    total_equity = sum(account.balance for account in equity_accounts)
+    sections = {
+        account_type: [
+            {"account_id": line["account_id"], "account_name": line["account_name"], "balance": line["balance"]}
+            for line in lines if line["account_type"] == account_type
+        ]
+        for account_type in ("asset", "liability", "equity")
+    }
     
     return {
         "date": date,
-        "total_assets": total_assets,
-        "total_liabilities": total_liabilities,
-        "total_equity": total_equity,
-        "assets": [
-            {"account_id": account.id, "account_name": account.name, "balance": account.balance}
-            for account in asset_accounts
-        ],
-        "liabilities": [
-            {"account_id": account.id, "account_name": account.name, "balance": account.balance}
-            for account in liability_accounts
-        ],
-        "equity": [
-            {"account_id": account.id, "account_name": account.name, "balance": account.balance}
-            for account in equity_accounts
-        ]
+        "total_assets": sum(line["balance"] for line in sections["asset"]),
+        "total_liabilities": sum(line["balance"] for line in sections["liability"]),
+        "total_equity": sum(line["balance"] for line in sections["equity"]),
+        "assets": sections["asset"],
+        "liabilities": sections["liability"],
+        "equity": sections["equity"]
     }
 
+@router.post("/balance-snapshots", status_code=status.HTTP_201_CREATED)
+async def create_balance_snapshots(as_of: datetime = None, db: Session = Depends(get_db)):
+    """Snapshot every account balance, e.g. at period close."""
+    if as_of is None:
+        as_of = datetime.now()
+    written = balances.take_snapshots(db, as_of)
+    db.commit()
+    return {"as_of": as_of, "accounts_snapshotted": written}
+
 @router.get("/reports/cash-flow")
 async def get_cash_flow(
     start_date: datetime,
     end_date: datetime,
     db: Session = Depends(get_db)
 ):
-    # Get cash accounts
-    cash_accounts = db.query(models.Account).filter(models.Account.type == "asset", models.Account.name.like("%cash%")).all()
-    cash_account_ids = [account.id for account in cash_accounts]
-    
-    # Get all cash transactions
-    cash_transactions = db.query(models.Transaction).filter(
-        models.Transaction.account_id.in_(cash_account_ids),
-        models.Transaction.transaction_date >= start_date,
-        models.Transaction.transaction_date <= end_date
-    ).all()
-    
-    # Calculate cash inflows and outflows
-    cash_inflows = sum(t.amount for t in cash_transactions if t.type == "credit")
-    cash_outflows = sum(t.amount for t in cash_transactions if t.type == "debit")
-    net_cash_flow = cash_inflows - cash_outflows
+    totals = reporting.cash_flow_totals(db, start_date, end_date)
     
     return {
         "start_date": start_date,
         "end_date": end_date,
-        "cash_inflows": cash_inflows,
-        "cash_outflows": cash_outflows,
-        "net_cash_flow": net_cash_flow,
-        "transactions": [
-            {
-                "id": t.id,
-                "date": t.transaction_date,
-                "amount": t.amount,
-                "type": t.type,
-                "description": t.description
-            }
-            for t in cash_transactions
-        ]
+        "cash_inflows": totals["cash_inflows"],
+        "cash_outflows": totals["cash_outflows"],
+        "net_cash_flow": totals["cash_inflows"] - totals["cash_outflows"],
+        "transaction_count": totals["transaction_count"]
     }
+
+@router.get("/reports/cash-flow/transactions", response_model=Union[List[schemas.Transaction], schemas.CursorPage[schemas.Transaction]])
+async def get_cash_flow_transactions(
+    start_date: datetime,
+    end_date: datetime,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    query = _cash_transactions_query(db, start_date, end_date)
+    transactions = pagination.paginate(query, models.Transaction.id, skip, limit, cursor, sort_column=models.Transaction.transaction_date)
+    return transactions
+
+@router.get("/reports/cash-flow/transactions/export")
+async def export_cash_flow_transactions(
+    start_date: datetime,
+    end_date: datetime,
+    format: str = "csv",
+    db: Session = Depends(get_db)
+):
+    format = streaming.export_format(format)
+    query = _cash_transactions_query(db, start_date, end_date)
+    query = query.order_by(models.Transaction.transaction_date, models.Transaction.id)
+    return streaming.export_response(db, query, models.Transaction, format, "cash_flow_transactions")
+
+def _cash_transactions_query(db: Session, start_date: datetime, end_date: datetime):
+    return (
+        db.query(models.Transaction)
+        .join(models.Account, models.Account.id == models.Transaction.account_id)
+        .filter(*reporting.cash_transaction_criteria(start_date, end_date))
+    )
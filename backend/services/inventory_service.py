@@ -1,28 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime, timedelta
+from decimal import Decimal
 
 from database import get_db
+import alerts
 import models
 import schemas
+import forecasting
+import pagination
+import product_search
+import replenishment
+import reporting
+import stock
+import streaming
 from services import process_service
 
 router = APIRouter()
 
 # Product endpoints
+SEARCH_LIMIT_MAX = 100
+
 @router.post("/products", response_model=schemas.Product, status_code=status.HTTP_201_CREATED)
 async def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
+    _validate_preferred_supplier(db, product.preferred_supplier_id)
     db_product = models.Product(**product.dict())
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
     return db_product
 
-@router.get("/products", response_model=List[schemas.Product])
+@router.get("/products", response_model=Union[List[schemas.Product], schemas.CursorPage[schemas.Product]])
 async def get_products(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     category: Optional[str] = None,
     low_stock: Optional[bool] = None,
     db: Session = Depends(get_db)
@@ -34,9 +49,18 @@ async def get_products(
     if low_stock:
         query = query.filter(models.Product.stock_quantity <= models.Product.reorder_level)
     
-    products = query.offset(skip).limit(limit).all()
+    products = pagination.paginate(query, models.Product.id, skip, limit, cursor)
     return products
 
+@router.get("/products/search", response_model=List[schemas.ProductSearchResult])
+async def search_products(q: str, limit: int = 20, db: Session = Depends(get_db)):
+    """Products whose SKU, name or description match ``q``, best match first."""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query must not be empty")
+    if limit < 1 or limit > SEARCH_LIMIT_MAX:
+        raise HTTPException(status_code=400, detail=f"Invalid limit. Must be between 1 and {SEARCH_LIMIT_MAX}")
+    return [{"score": score, "product": product} for product, score in product_search.search(db, q, limit)]
+
 @router.get("/products/{product_id}", response_model=schemas.Product)
 async def get_product(product_id: int, db: Session = Depends(get_db)):
     product = db.query(models.Product).filter(models.Product.id == product_id).first()
@@ -44,6 +68,16 @@ async def get_product(product_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Product not found")
     return product
 
+@router.get("/products/{product_id}/stock")
+async def get_product_stock(product_id: int, as_of: datetime = None, db: Session = Depends(get_db)):
+    """Stock level at ``as_of`` (default now), read from the stock ledger."""
+    if as_of is None:
+        as_of = datetime.now()
+    stock_quantity = stock.stock_as_of(db, product_id, as_of)
+    if stock_quantity is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return {"product_id": product_id, "as_of": as_of, "stock_quantity": stock_quantity}
+
 @router.put("/products/{product_id}", response_model=schemas.Product)
 async def update_product(product_id: int, product: schemas.ProductUpdate, db: Session = Depends(get_db)):
     db_product = db.query(models.Product).filter(models.Product.id == product_id).first()
@@ -51,6 +85,7 @@ async def update_product(product_id: int, product: schemas.ProductUpdate, db: Se
         raise HTTPException(status_code=404, detail="Product not found")
 
     update_data = product.dict(exclude_unset=True)
+    _validate_preferred_supplier(db, update_data.get("preferred_supplier_id"))
     for key, value in update_data.items():
         setattr(db_product, key, value)
     
@@ -58,61 +93,218 @@ async def update_product(product_id: int, product: schemas.ProductUpdate, db: Se
     db.refresh(db_product)
     return db_product
 
+def _validate_preferred_supplier(db: Session, supplier_id: Optional[int]):
+    if supplier_id is not None and db.query(models.Supplier.id).filter(models.Supplier.id == supplier_id).first() is None:
+        raise HTTPException(status_code=404, detail="Supplier not found")
+
 # Inventory Movement endpoints
 @router.post("/movements", response_model=schemas.InventoryMovement, status_code=status.HTTP_201_CREATED)
 async def create_inventory_movement(movement: schemas.InventoryMovementCreate, db: Session = Depends(get_db)):
-    # Validate product exists
-    product = db.query(models.Product).filter(models.Product.id == movement.product_id).first()
+    # Validate product exists, locking its stock row
+    products = stock.lock_products(db, [movement.product_id])
+    product = products.get(movement.product_id)
     if product is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    # Create inventory movement
-    db_movement = models.InventoryMovement(**movement.dict())
-    db.add(db_movement)
-    
-    # Update product stock
-    if movement.movement_type == "in":
-        product.stock_quantity += movement.quantity
-    elif movement.movement_type == "out":
+    if movement.movement_type == "out":
         if product.stock_quantity < movement.quantity:
-            # Create a low stock alert
-            process_event = models.ProcessEvent(
-                event_type="alert",
-                description=f"Insufficient stock for product {product.name} (ID: {product.id}). Required: {movement.quantity}, Available: {product.stock_quantity}",
-                status="pending",
-                severity="high"
-            )
-            db.add(process_event)
+            # Create or refresh the product's low stock alert; it is kept
+            # even though the movement is rejected
+            alerts.raise_alerts(db, [{
+                "product_id": product.id,
+                "alert_kind": alerts.INSUFFICIENT_STOCK,
+                "description": f"Insufficient stock for product {product.name} (ID: {product.id}). Required: {movement.quantity}, Available: {product.stock_quantity}",
+                "severity": "high"
+            }])
+            db.commit()
             raise HTTPException(status_code=400, detail="Insufficient stock")
-        
-        product.stock_quantity -= movement.quantity
-    elif movement.movement_type == "adjustment":
-        product.stock_quantity = movement.quantity
+    
+    # Create inventory movement and its ledger entry, and update product stock
+    movement_id = stock.post_movements(db, [movement.dict()], products)[0]
     
     # Check if reorder level is reached
     if product.stock_quantity <= product.reorder_level:
-        # Create a reorder alert
-        process_event = models.ProcessEvent(
-            event_type="alert",
-            description=f"Reorder point reached for product {product.name} (ID: {product.id}). Current stock: {product.stock_quantity}, Reorder level: {product.reorder_level}",
-            status="pending",
-            severity="medium"
-        )
-        db.add(process_event)
+        # Create or refresh the product's reorder alert
+        alerts.raise_alerts(db, [alerts.reorder_point_alert(product, product.stock_quantity)])
     
     db.commit()
-    db.refresh(db_movement)
-    return db_movement
+    return db.get(models.InventoryMovement, movement_id)
+
+# Bulk cycle counts
+def _counted_quantity(value) -> Optional[int]:
+    """Parse a counted quantity from NDJSON or CSV; ``None`` if it is not a non-negative integer."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    if isinstance(value, int) and value >= 0:
+        return value
+    return None
+
+@router.post("/cycle-counts")
+async def import_cycle_counts(
+    request: Request,
+    format: Optional[str] = None,
+    counted_at: Optional[datetime] = None,
+    reference: Optional[str] = None,
+    chunk_size: int = 1000,
+    db: Session = Depends(get_db)
+):
+    """
+    Apply a cycle count uploaded as a streamed NDJSON or CSV body.
 
-@router.get("/movements", response_model=List[schemas.InventoryMovement])
+    Each record carries ``sku`` and ``counted_qty``. SKUs are resolved and
+    their products locked once per chunk of ``chunk_size`` lines; counts that
+    differ from the recorded stock become ``adjustment`` movements, written
+    with their ledger entries, stock updates and reorder alerts in bulk and
+    committed per chunk. Rejected lines are listed in ``errors``; variance
+    totals cover the applied adjustments.
+    """
+    upload_format = streaming.upload_format(request, format)
+    chunk_size = max(1, min(chunk_size, 5000))
+    if counted_at is None:
+        counted_at = datetime.now()
+    if reference is None:
+        reference = f"Cycle count {counted_at.date().isoformat()}"
+    
+    report = {
+        "format": upload_format,
+        "lines_received": 0,
+        "lines_adjusted": 0,
+        "lines_unchanged": 0,
+        "lines_failed": 0,
+        "units_over": 0,
+        "units_short": 0,
+        "net_units": 0,
+        "net_value": Decimal(0),
+        "errors": []
+    }
+    seen_skus = set()
+    batch = []
+    
+    def reject(line, sku, error):
+        report["lines_failed"] += 1
+        report["errors"].append({"line": line, "sku": sku, "error": error})
+    
+    def flush():
+        if not batch:
+            return
+        product_ids = dict(
+            db.query(models.Product.sku, models.Product.id)
+            .filter(models.Product.sku.in_([sku for _, sku, _ in batch]))
+            .all()
+        )
+        counts = []
+        for line, sku, counted in batch:
+            if sku in product_ids:
+                counts.append((line, sku, counted))
+            else:
+                reject(line, sku, "Product not found")
+        batch.clear()
+        if not counts:
+            return
+        
+        try:
+            products = stock.lock_products(db, product_ids.values())
+            movements, reorder_alerts, variances = [], [], []
+            for line, sku, counted in counts:
+                product = products[product_ids[sku]]
+                variance = counted - (product.stock_quantity or 0)
+                if variance == 0:
+                    variances.append((0, Decimal(0)))
+                    continue
+                variances.append((variance, variance * reporting.money(product.unit_price)))
+                movements.append({
+                    "product_id": product.id,
+                    "quantity": counted,
+                    "movement_type": "adjustment",
+                    "reference": reference,
+                    "movement_date": counted_at
+                })
+                if counted <= product.reorder_level:
+                    reorder_alerts.append(alerts.reorder_point_alert(product, counted))
+            
+            stock.post_movements(db, movements, products)
+            alerts.raise_alerts(db, reorder_alerts)
+            db.commit()
+        except SQLAlchemyError as exc:
+            db.rollback()
+            for line, sku, _ in counts:
+                reject(line, sku, f"Batch failed: {exc.__class__.__name__}")
+            return
+        
+        for variance, value in variances:
+            if variance == 0:
+                report["lines_unchanged"] += 1
+                continue
+            report["lines_adjusted"] += 1
+            if variance > 0:
+                report["units_over"] += variance
+            else:
+                report["units_short"] -= variance
+            report["net_units"] += variance
+            report["net_value"] += value
+    
+    async for line, record in streaming.iter_records(request, upload_format):
+        report["lines_received"] += 1
+        if isinstance(record, Exception) or not isinstance(record, dict):
+            reject(line, None, f"Invalid JSON: {record}" if isinstance(record, Exception) else "Expected a JSON object")
+            continue
+        sku = record.get("sku")
+        counted = _counted_quantity(record.get("counted_qty"))
+        if not sku:
+            reject(line, None, "Missing sku")
+            continue
+        if counted is None:
+            reject(line, sku, "counted_qty must be a non-negative integer")
+            continue
+        if sku in seen_skus:
+            reject(line, sku, "Duplicate sku in upload")
+            continue
+        
+        seen_skus.add(sku)
+        batch.append((line, sku, counted))
+        if len(batch) >= chunk_size:
+            flush()
+    flush()
+    
+    return report
+
+@router.get("/movements", response_model=Union[List[schemas.InventoryMovement], schemas.CursorPage[schemas.InventoryMovement]])
 async def get_inventory_movements(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     product_id: Optional[int] = None,
     movement_type: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     db: Session = Depends(get_db)
+):
+    query = _movements_query(db, product_id, movement_type, start_date, end_date)
+    movements = pagination.paginate(query, models.InventoryMovement.id, skip, limit, cursor, sort_column=models.InventoryMovement.movement_date)
+    return movements
+
+@router.get("/movements/export")
+async def export_inventory_movements(
+    format: str = "csv",
+    product_id: Optional[int] = None,
+    movement_type: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    format = streaming.export_format(format)
+    query = _movements_query(db, product_id, movement_type, start_date, end_date)
+    query = query.order_by(models.InventoryMovement.movement_date, models.InventoryMovement.id)
+    return streaming.export_response(db, query, models.InventoryMovement, format, "inventory_movements")
+
+def _movements_query(
+    db: Session,
+    product_id: Optional[int],
+    movement_type: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
 ):
     query = db.query(models.InventoryMovement)
     
@@ -124,9 +316,7 @@ async def get_inventory_movements(
         query = query.filter(models.InventoryMovement.movement_date >= start_date)
     if end_date:
         query = query.filter(models.InventoryMovement.movement_date <= end_date)
-    
-    movements = query.offset(skip).limit(limit).all()
-    return movements
+    return query
 
 # Supplier endpoints
 @router.post("/suppliers", response_model=schemas.Supplier, status_code=status.HTTP_201_CREATED)
@@ -137,9 +327,9 @@ async def create_supplier(supplier: schemas.SupplierCreate, db: Session = Depend
     db.refresh(db_supplier)
     return db_supplier
 
-@router.get("/suppliers", response_model=List[schemas.Supplier])
-async def get_suppliers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    suppliers = db.query(models.Supplier).offset(skip).limit(limit).all()
+@router.get("/suppliers", response_model=Union[List[schemas.Supplier], schemas.CursorPage[schemas.Supplier]])
+async def get_suppliers(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    suppliers = pagination.paginate(db.query(models.Supplier), models.Supplier.id, skip, limit, cursor)
     return suppliers
 
 @router.get("/suppliers/{supplier_id}", response_model=schemas.Supplier)
@@ -185,10 +375,11 @@ async def create_purchase_order(purchase_order: schemas.PurchaseOrderCreate, db:
     db.refresh(db_po)
     return db_po
 
-@router.get("/purchase-orders", response_model=List[schemas.PurchaseOrder])
+@router.get("/purchase-orders", response_model=Union[List[schemas.PurchaseOrder], schemas.CursorPage[schemas.PurchaseOrder]])
 async def get_purchase_orders(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     supplier_id: Optional[int] = None,
     status: Optional[str] = None,
     start_date: Optional[datetime] = None,
@@ -206,12 +397,12 @@ async def get_purchase_orders(
     if end_date:
         query = query.filter(models.PurchaseOrder.order_date <= end_date)
     
-    purchase_orders = query.offset(skip).limit(limit).all()
+    purchase_orders = pagination.paginate(query, models.PurchaseOrder.id, skip, limit, cursor, sort_column=models.PurchaseOrder.order_date)
     return purchase_orders
 
 @router.put("/purchase-orders/{po_id}/status", response_model=schemas.PurchaseOrder)
 async def update_purchase_order_status(po_id: int, status_update: schemas.StatusUpdate, db: Session = Depends(get_db)):
-    db_po = db.query(models.PurchaseOrder).filter(models.PurchaseOrder.id == po_id).first()
+    db_po = db.query(models.PurchaseOrder).filter(models.PurchaseOrder.id == po_id).with_for_update().first()
     if db_po is None:
         raise HTTPException(status_code=404, detail="Purchase Order not found")
 
@@ -220,57 +411,228 @@ async def update_purchase_order_status(po_id: int, status_update: schemas.Status
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
     
-    # If receiving a purchase order, update inventory
+    # If receiving a purchase order, receive whatever is still outstanding
     if status == "received" and db_po.status != "received":
         po_items = db.query(models.PurchaseOrderItem).filter(models.PurchaseOrderItem.purchase_order_id == po_id).all()
-        
-        for item in po_items:
-            # Add inventory
-            inventory_movement = models.InventoryMovement(
-                product_id=item.product_id,
-                quantity=item.quantity,
-                movement_type="in",
-                reference=f"PO #{db_po.po_number}",
-                movement_date=datetime.now()
-            )
-            db.add(inventory_movement)
-            
-            # Update product stock
-            product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-            if product:
-                product.stock_quantity += item.quantity
+        _receive_items(db, db_po, {
+            item: item.quantity - (item.received_quantity or 0)
+            for item in po_items
+            if item.quantity > (item.received_quantity or 0)
+        }, datetime.now())
     
     db_po.status = status
     db.commit()
     db.refresh(db_po)
     return db_po
 
-# Inventory reporting endpoints
-@router.get("/reports/inventory-valuation")
-async def get_inventory_valuation(db: Session = Depends(get_db)):
-    products = db.query(models.Product).all()
+RECEIVABLE_PO_STATUSES = ["draft", "sent", "partially_received"]
+
+@router.post("/purchase-orders/{po_id}/receipts", response_model=schemas.PurchaseOrderReceiptResult, status_code=status.HTTP_201_CREATED)
+async def receive_purchase_order(po_id: int, receipt: schemas.PurchaseOrderReceiptCreate, response: Response, db: Session = Depends(get_db)):
+    """
+    Receive some or all of a purchase order's lines.
+
+    Stock for every line goes up in one set-based update alongside bulk
+    inserted movements and ledger entries. ``receipt_id`` makes the call
+    idempotent: the purchase order row is locked while receiving, and a
+    receipt already recorded under the same id is answered from the record
+    with ``duplicate`` set instead of being applied again.
+    """
+    db_po = db.query(models.PurchaseOrder).filter(models.PurchaseOrder.id == po_id).with_for_update().first()
+    if db_po is None:
+        raise HTTPException(status_code=404, detail="Purchase Order not found")
     
-    total_valuation = 0.0
-    product_valuations = []
+    recorded = db.query(models.PurchaseOrderReceipt).filter(
+        models.PurchaseOrderReceipt.purchase_order_id == po_id,
+        models.PurchaseOrderReceipt.receipt_key == receipt.receipt_id
+    ).first()
+    if recorded is not None:
+        response.status_code = status.HTTP_200_OK
+        return _receipt_result(recorded, db_po, duplicate=True)
     
-    for product in products:
-        valuation = product.stock_quantity * product.unit_price
-        total_valuation += valuation
-        
-        product_valuations.append({
-            "product_id": product.id,
-            "product_name": product.name,
-            "sku": product.sku,
-            "stock_quantity": product.stock_quantity,
-            "unit_price": product.unit_price,
-            "valuation": valuation
-        })
+    if db_po.status not in RECEIVABLE_PO_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Purchase order is {db_po.status} and cannot be received")
+    if not receipt.lines:
+        raise HTTPException(status_code=400, detail="Receipt has no lines")
+    
+    quantities = {}
+    for line in receipt.lines:
+        if line.quantity <= 0:
+            raise HTTPException(status_code=400, detail="Received quantities must be positive")
+        quantities[line.item_id] = quantities.get(line.item_id, 0) + line.quantity
+    
+    po_items = {
+        item.id: item for item in
+        db.query(models.PurchaseOrderItem).filter(
+            models.PurchaseOrderItem.purchase_order_id == po_id,
+            models.PurchaseOrderItem.id.in_(quantities)
+        )
+    }
+    missing = sorted(set(quantities) - set(po_items))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Purchase order item {missing[0]} not found")
+    for item_id, quantity in quantities.items():
+        outstanding = po_items[item_id].quantity - (po_items[item_id].received_quantity or 0)
+        if quantity > outstanding:
+            raise HTTPException(status_code=400, detail=f"Item {item_id} has only {outstanding} units outstanding")
+    
+    received_at = receipt.received_at or datetime.now()
+    _receive_items(db, db_po, {po_items[item_id]: quantity for item_id, quantity in quantities.items()}, received_at)
+    
+    fully_received = db.query(models.PurchaseOrderItem.id).filter(
+        models.PurchaseOrderItem.purchase_order_id == po_id,
+        models.PurchaseOrderItem.quantity > func.coalesce(models.PurchaseOrderItem.received_quantity, 0)
+    ).first() is None
+    db_po.status = "received" if fully_received else "partially_received"
+    
+    recorded = models.PurchaseOrderReceipt(
+        purchase_order_id=po_id,
+        receipt_key=receipt.receipt_id,
+        received_at=received_at,
+        lines_received=len(quantities),
+        units_received=sum(quantities.values())
+    )
+    db.add(recorded)
+    db.commit()
+    return _receipt_result(recorded, db_po)
+
+def _receive_items(db: Session, db_po: models.PurchaseOrder, quantities: dict, received_at: datetime):
+    """Book ``{PurchaseOrderItem: quantity}`` into stock and onto the items' received quantities."""
+    if not quantities:
+        return
+    products = stock.lock_products(db, (item.product_id for item in quantities))
+    stock.post_movements(db, [
+        {
+            "product_id": item.product_id,
+            "quantity": quantity,
+            "movement_type": "in",
+            "reference": f"PO #{db_po.po_number}",
+            "movement_date": received_at
+        }
+        for item, quantity in quantities.items()
+        if item.product_id in products
+    ], products)
+    
+    items = models.PurchaseOrderItem.__table__
+    db.execute(
+        update(items)
+        .where(items.c.id == bindparam("b_item_id"))
+        .values(received_quantity=func.coalesce(items.c.received_quantity, 0) + bindparam("b_quantity")),
+        [{"b_item_id": item.id, "b_quantity": quantity} for item, quantity in quantities.items()]
+    )
+    for item in quantities:
+        db.expire(item, ["received_quantity"])
+
+def _receipt_result(recorded: models.PurchaseOrderReceipt, db_po: models.PurchaseOrder, duplicate: bool = False) -> dict:
+    return {
+        "receipt_id": recorded.receipt_key,
+        "purchase_order_id": db_po.id,
+        "status": db_po.status,
+        "received_at": recorded.received_at,
+        "lines_received": recorded.lines_received,
+        "units_received": recorded.units_received,
+        "duplicate": duplicate
+    }
+
+# Replenishment
+@router.get("/replenishment/plan")
+async def get_replenishment_plan(db: Session = Depends(get_db)):
+    """Products a replenishment run would order now, with quantities, ordered by supplier."""
+    lines = replenishment.plan(db)
+    return {"product_count": len(lines), "products": lines}
+
+@router.post("/replenishment/run")
+async def run_replenishment(db: Session = Depends(get_db)):
+    """Draft one purchase order per preferred supplier for every product below its reorder level."""
+    summary = replenishment.run(db)
+    db.commit()
+    return summary
+
+# Demand forecasts
+@router.post("/forecasts/run")
+async def run_forecasts(history_days: int = 730, horizon_days: int = 30, db: Session = Depends(get_db)):
+    """Refit the demand forecast of every product from its outbound movements."""
+    if horizon_days < 1 or history_days <= horizon_days:
+        raise HTTPException(status_code=400, detail="history_days must be greater than horizon_days, which must be positive")
+    summary = forecasting.run(db, history_days, horizon_days)
+    db.commit()
+    return summary
+
+@router.get("/forecasts/{product_id}", response_model=schemas.DemandForecast)
+async def get_forecast(product_id: int, db: Session = Depends(get_db)):
+    forecast = db.query(models.DemandForecast).filter(models.DemandForecast.product_id == product_id).first()
+    if forecast is None:
+        raise HTTPException(status_code=404, detail="Forecast not found")
+    return forecast
+
+# Inventory reporting endpoints
+VALUATION_SORTS = ["value", "id"]
+_valuation_product_id = models.Product.id.label("product_id")
+_valuation = reporting.stock_value().label("valuation")
+
+@router.get("/reports/inventory-valuation")
+async def get_inventory_valuation(category: Optional[str] = None, top: int = 10, db: Session = Depends(get_db)):
+    """Category totals plus the ``top`` most valuable products.
+
+    The full per-product detail is paged by ``/reports/inventory-valuation/products``.
+    """
+    categories = reporting.inventory_valuation_by_category(db, category)
+    valuation = _valuation_query(db, category)
+    top_products = valuation.order_by(_valuation.desc(), _valuation_product_id).limit(top).all()
     
     return {
-        "total_value": total_valuation,
-        "products": product_valuations
+        "total_value": sum((row["total_value"] for row in categories), Decimal(0)),
+        "product_count": sum(row["product_count"] for row in categories),
+        "categories": categories,
+        "products": [_valuation_row(row) for row in top_products]
     }
 
+@router.get("/reports/inventory-valuation/products")
+async def get_inventory_valuation_products(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    sort: str = "value",
+    db: Session = Depends(get_db)
+):
+    if sort not in VALUATION_SORTS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Must be one of: {', '.join(VALUATION_SORTS)}")
+    
+    query = _valuation_query(db, category)
+    if sort == "value":
+        if cursor is None:
+            query = query.order_by(_valuation.desc(), _valuation_product_id.desc())
+        page = pagination.paginate(query, _valuation_product_id, skip, limit, cursor, sort_column=_valuation, descending=True)
+    else:
+        if cursor is None:
+            query = query.order_by(_valuation_product_id)
+        page = pagination.paginate(query, _valuation_product_id, skip, limit, cursor)
+    
+    if cursor is None:
+        return [_valuation_row(row) for row in page]
+    return {"items": [_valuation_row(row) for row in page["items"]], "next_cursor": page["next_cursor"]}
+
+def _valuation_query(db: Session, category: Optional[str]):
+    product = models.Product
+    query = db.query(
+        _valuation_product_id,
+        product.name.label("product_name"),
+        product.sku,
+        product.category,
+        product.stock_quantity,
+        product.unit_price,
+        _valuation,
+    )
+    if category is not None:
+        query = query.filter(product.category == category)
+    return query
+
+def _valuation_row(row) -> dict:
+    data = dict(row._mapping)
+    data["valuation"] = reporting.money(data["valuation"])
+    return data
+
 @router.get("/reports/stock-movements")
 async def get_stock_movements(
     start_date: datetime,
@@ -278,100 +640,70 @@ async def get_stock_movements(
     product_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.InventoryMovement).filter(
-        models.InventoryMovement.movement_date >= start_date,
-        models.InventoryMovement.movement_date <= end_date
-    )
-    
-    if product_id:
-        query = query.filter(models.InventoryMovement.product_id == product_id)
-    
-    movements = query.all()
-    
-    # Group by product
-    product_movements = {}
-    for movement in movements:
-        product_id = movement.product_id
-        if product_id not in product_movements:
-            product = db.query(models.Product).filter(models.Product.id == product_id).first()
-            product_movements[product_id] = {
-                "product_id": product_id,
-                "product_name": product.name if product else "Unknown",
-                "starting_stock": 0,  # Will calculate this
-                "in_quantity": 0,
-                "out_quantity": 0,
-                "adjustment_quantity": 0,
-                "ending_stock": product.stock_quantity if product else 0,
-                "movements": []
-            }
-        
-        # Add to totals
-        if movement.movement_type == "in":
-            product_movements[product_id]["in_quantity"] += movement.quantity
-        elif movement.movement_type == "out":
-            product_movements[product_id]["out_quantity"] += movement.quantity
-        elif movement.movement_type == "adjustment":
-            product_movements[product_id]["adjustment_quantity"] += movement.quantity
-        
-        # Add to movements list
-        product_movements[product_id]["movements"].append({
-            "id": movement.id,
-            "date": movement.movement_date,
-            "type": movement.movement_type,
-            "quantity": movement.quantity,
-            "reference": movement.reference
-        })
-    
-    # Calculate starting stock for each product
-    for product_id, data in product_movements.items():
-        # Starting stock = ending stock - ins + outs - adjustments
-        data["starting_stock"] = (
-            data["ending_stock"] - 
-            data["in_quantity"] + 
-            data["out_quantity"] - 
-            data["adjustment_quantity"]
-        )
+    """Opening/closing stock and movement totals per product.
+
+    The movements themselves, with the stock level after each, are paged by
+    ``/reports/stock-movements/detail``.
+    """
+    product_movements = reporting.stock_movement_summary(db, start_date, end_date, product_id)
     
     return {
         "start_date": start_date,
         "end_date": end_date,
-        "product_movements": list(product_movements.values())
+        "product_movements": product_movements
     }
 
+@router.get("/reports/stock-movements/detail")
+async def get_stock_movement_detail(
+    start_date: datetime,
+    end_date: datetime,
+    product_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    levels = reporting.stock_levels(reporting.moved_products(start_date, end_date, product_id))
+    query = db.query(
+        levels.c.id,
+        levels.c.product_id,
+        levels.c.movement_date.label("date"),
+        levels.c.movement_type.label("type"),
+        levels.c.quantity,
+        levels.c.reference,
+        levels.c.level.label("stock_after"),
+    ).filter(levels.c.movement_date >= start_date, levels.c.movement_date <= end_date)
+    
+    if cursor is None:
+        query = query.order_by(levels.c.movement_date, levels.c.id)
+    movements = pagination.paginate(query, levels.c.id, skip, limit, cursor, sort_column=levels.c.movement_date.label("date"))
+    
+    if cursor is None:
+        return [dict(row._mapping) for row in movements]
+    return {"items": [dict(row._mapping) for row in movements["items"]], "next_cursor": movements["next_cursor"]}
+
 @router.get("/reports/low-stock")
 async def get_low_stock_report(db: Session = Depends(get_db)):
-    low_stock_products = db.query(models.Product).filter(
-        models.Product.stock_quantity <= models.Product.reorder_level
-    ).all()
+    # Daily usage comes from the stored demand forecast, or the average over
+    # the last 30 days for products that have none yet
+    thirty_days_ago = datetime.now() - timedelta(days=30)
     
     result = []
-    for product in low_stock_products:
+    for item in reporting.low_stock_items(db, thirty_days_ago):
         days_to_stockout = None
-        
-        # Calculate average daily usage over the last 30 days
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        outgoing_movements = db.query(models.InventoryMovement).filter(
-            models.InventoryMovement.product_id == product.id,
-            models.InventoryMovement.movement_type == "out",
-            models.InventoryMovement.movement_date >= thirty_days_ago
-        ).all()
-        
-        total_outgoing = sum(movement.quantity for movement in outgoing_movements)
-        avg_daily_usage = total_outgoing / 30 if total_outgoing > 0 else 0
+        total_outgoing = item.pop("outgoing_quantity")
+        forecast_demand = item.pop("forecast_daily_demand")
+        if item["forecast_model"] is not None:
+            avg_daily_usage = forecast_demand
+        else:
+            avg_daily_usage = total_outgoing / 30 if total_outgoing > 0 else 0
         
         if avg_daily_usage > 0:
-            days_to_stockout = product.stock_quantity / avg_daily_usage
+            days_to_stockout = item["stock_quantity"] / avg_daily_usage
         
-        result.append({
-            "product_id": product.id,
-            "product_name": product.name,
-            "sku": product.sku,
-            "stock_quantity": product.stock_quantity,
-            "reorder_level": product.reorder_level,
-            "reorder_quantity": product.reorder_quantity,
-            "days_to_stockout": days_to_stockout,
-            "status": "Out of Stock" if product.stock_quantity == 0 else "Low Stock"
-        })
+        item["days_to_stockout"] = days_to_stockout
+        item["status"] = "Out of Stock" if item["stock_quantity"] == 0 else "Low Stock"
+        result.append(item)
     
     return {
         "low_stock_items": result,
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from database import get_db
 import models
 import schemas
+import pagination
 
 router = APIRouter()
 
@@ -22,9 +23,9 @@ async def create_knowledge_entity(entity: schemas.KnowledgeEntityCreate, db: Ses
     db.refresh(db_entity)
     return db_entity
 
-@router.get("/entities", response_model=List[schemas.KnowledgeEntity])
-async def get_knowledge_entities(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    entities = db.query(models.KnowledgeEntity).offset(skip).limit(limit).all()
+@router.get("/entities", response_model=Union[List[schemas.KnowledgeEntity], schemas.CursorPage[schemas.KnowledgeEntity]])
+async def get_knowledge_entities(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    entities = pagination.paginate(db.query(models.KnowledgeEntity), models.KnowledgeEntity.id, skip, limit, cursor)
     return entities
 
 @router.get("/entities/{entity_id}", response_model=schemas.KnowledgeEntity)
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime, timedelta
 import json
 
 from database import get_db
+import alerts
 import models
 import schemas
+import pagination
 
 router = APIRouter()
 
@@ -19,10 +21,11 @@ async def create_process_event(event: schemas.ProcessEventCreate, db: Session =
     db.refresh(db_event)
     return db_event
 
-@router.get("/events", response_model=List[schemas.ProcessEvent])
+@router.get("/events", response_model=Union[List[schemas.ProcessEvent], schemas.CursorPage[schemas.ProcessEvent]])
 async def get_process_events(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     event_type: Optional[str] = None,
     status: Optional[str] = None,
     severity: Optional[str] = None,
@@ -58,7 +61,7 @@ async def get_process_events(
     if end_date:
         query = query.filter(models.ProcessEvent.created_at <= end_date)
     
-    events = query.offset(skip).limit(limit).all()
+    events = pagination.paginate(query, models.ProcessEvent.id, skip, limit, cursor, sort_column=models.ProcessEvent.created_at)
     return events
 
 @router.get("/events/{event_id}", response_model=schemas.ProcessEvent)
@@ -83,6 +86,16 @@ async def update_process_event_status(
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
     
+    if db_event.alert_kind is not None and status in alerts.OPEN_STATUSES and db_event.status not in alerts.OPEN_STATUSES:
+        # Stock alerts coalesce into one open alert per product and kind
+        already_open = db.query(models.ProcessEvent.id).filter(
+            models.ProcessEvent.product_id == db_event.product_id,
+            models.ProcessEvent.alert_kind == db_event.alert_kind,
+            models.ProcessEvent.status.in_(alerts.OPEN_STATUSES)
+        ).first()
+        if already_open is not None:
+            raise HTTPException(status_code=400, detail=f"Alert {already_open.id} is already open for this product")
+    
     db_event.status = status
     
     if assigned_to:
@@ -115,10 +128,11 @@ async def create_workflow_rule(rule: schemas.WorkflowRuleCreate, db: Session = D
     db.refresh(db_rule)
     return db_rule
 
-@router.get("/workflow-rules", response_model=List[schemas.WorkflowRule])
+@router.get("/workflow-rules", response_model=Union[List[schemas.WorkflowRule], schemas.CursorPage[schemas.WorkflowRule]])
 async def get_workflow_rules(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     entity_type: Optional[str] = None,
     is_active: Optional[bool] = None,
     db: Session = Depends(get_db)
@@ -130,7 +144,7 @@ async def get_workflow_rules(
     if is_active is not None:
         query = query.filter(models.WorkflowRule.is_active == is_active)
     
-    rules = query.offset(skip).limit(limit).all()
+    rules = pagination.paginate(query, models.WorkflowRule.id, skip, limit, cursor)
     return rules
 
 @router.get("/workflow-rules/{rule_id}", response_model=schemas.WorkflowRule)
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime, timedelta
 
 from database import get_db
 import models
 import schemas
+import pagination
 
 router = APIRouter()
 
@@ -45,10 +46,11 @@ async def create_project(project: schemas.ProjectCreate, db: Session = Depends(g
     db.refresh(db_project)
     return db_project
 
-@router.get("/projects", response_model=List[schemas.Project])
+@router.get("/projects", response_model=Union[List[schemas.Project], schemas.CursorPage[schemas.Project]])
 async def get_projects(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     customer_id: Optional[int] = None,
     status: Optional[str] = None,
     start_date: Optional[datetime] = None,
@@ -66,7 +68,7 @@ async def get_projects(
     if end_date:
         query = query.filter(models.Project.end_date <= end_date)
     
-    projects = query.offset(skip).limit(limit).all()
+    projects = pagination.paginate(query, models.Project.id, skip, limit, cursor)
     return projects
 
 @router.get("/projects/{project_id}", response_model=schemas.Project)
@@ -138,10 +140,11 @@ async def create_task(task: schemas.TaskCreate, project_id: int, db: Session = D
     db.refresh(db_task)
     return db_task
 
-@router.get("/tasks", response_model=List[schemas.Task])
+@router.get("/tasks", response_model=Union[List[schemas.Task], schemas.CursorPage[schemas.Task]])
 async def get_tasks(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     project_id: Optional[int] = None,
     assigned_to: Optional[int] = None,
     status: Optional[str] = None,
@@ -162,7 +165,7 @@ async def get_tasks(
     if end_date:
         query = query.filter(models.Task.end_date <= end_date)
     
-    tasks = query.offset(skip).limit(limit).all()
+    tasks = pagination.paginate(query, models.Task.id, skip, limit, cursor)
     return tasks
 
 @router.get("/tasks/{task_id}", response_model=schemas.Task)
@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime, timedelta
 
 from database import get_db
+import alerts
 import models
 import schemas
+import pagination
+import reporting
+import sales_rollup
+import stock
+import streaming
 from services import inventory_service, process_service
 
 router = APIRouter()
@@ -19,9 +28,9 @@ async def create_customer(customer: schemas.CustomerCreate, db: Session = Depend
     db.refresh(db_customer)
     return db_customer
 
-@router.get("/customers", response_model=List[schemas.Customer])
-async def get_customers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    customers = db.query(models.Customer).offset(skip).limit(limit).all()
+@router.get("/customers", response_model=Union[List[schemas.Customer], schemas.CursorPage[schemas.Customer]])
+async def get_customers(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    customers = pagination.paginate(db.query(models.Customer), models.Customer.id, skip, limit, cursor)
     return customers
 
 @router.get("/customers/{customer_id}", response_model=schemas.Customer)
@@ -46,6 +55,72 @@ async def update_customer(customer_id: int, customer: schemas.CustomerUpdate, db
     return db_customer
 
 # Order endpoints
+def _place_orders(db: Session, orders: List[schemas.OrderCreate], products: Dict[int, models.Product]) -> List[int]:
+    """Write validated orders with their items, stock movements, alerts and rollup entries.
+
+    ``products`` must hold every referenced product, locked via
+    ``stock.lock_products``. All rows are written with executemany inserts
+    and one stock update per batch. Returns the new order ids in input order.
+    """
+    order_ids = db.execute(
+        insert(models.Order).returning(models.Order.id, sort_by_parameter_order=True),
+        [order.dict(exclude={"items"}) for order in orders]
+    ).scalars().all()
+    
+    order_items = []
+    movements = []
+    stock_alerts = []
+    remaining = {product_id: product.stock_quantity for product_id, product in products.items()}
+    for order_id, order in zip(order_ids, orders):
+        for item in order.items:
+            product = products[item.product_id]
+            
+            if remaining[product.id] < item.quantity:
+                # Create or refresh the product's low stock alert
+                stock_alerts.append({
+                    "product_id": product.id,
+                    "alert_kind": alerts.INSUFFICIENT_STOCK,
+                    "description": f"Low stock for product {product.name} (ID: {product.id}). Required: {item.quantity}, Available: {remaining[product.id]}",
+                    "severity": "high",
+                    "order_id": order_id
+                })
+            
+            order_items.append({
+                "order_id": order_id,
+                "product_id": item.product_id,
+                "quantity": item.quantity,
+                "unit_price": item.unit_price,
+                "discount": item.discount,
+                "total_price": item.total_price
+            })
+            
+            # Update inventory (reduce stock)
+            movements.append({
+                "product_id": item.product_id,
+                "quantity": -item.quantity,  # Negative for outgoing
+                "movement_type": "out",
+                "reference": f"Order #{order.order_number}",
+                "movement_date": datetime.now()
+            })
+            
+            remaining[product.id] -= item.quantity
+            
+            # Check if reorder level is reached
+            if remaining[product.id] <= product.reorder_level:
+                # Create or refresh the product's reorder alert
+                stock_alerts.append(alerts.reorder_point_alert(product, remaining[product.id]))
+    
+    if order_items:
+        db.execute(insert(models.OrderItem), order_items)
+    alerts.raise_alerts(db, stock_alerts)
+    stock.post_movements(db, movements, products)
+    
+    sales_rollup.record_orders(db, [
+        (order, [(item.product_id, item.quantity, item.total_price) for item in order.items])
+        for order in orders
+    ])
+    return order_ids
+
 @router.post("/orders", response_model=schemas.Order, status_code=status.HTTP_201_CREATED)
 async def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
     # Validate customer exists
@@ -53,79 +128,180 @@ async def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)
     if customer is None:
         raise HTTPException(status_code=404, detail="Customer not found")
     
-    # Create order
-    order_data = order.dict(exclude={"items"})
-    db_order = models.Order(**order_data)
-    db.add(db_order)
-    db.flush()  # Get the order ID without committing
-    
-    # Create order items
+    # Lock every referenced product in one query, in id order
+    products = stock.lock_products(db, (item.product_id for item in order.items))
     for item in order.items:
-        # Validate product exists and has enough stock
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-        if product is None:
+        if item.product_id not in products:
             db.rollback()
             raise HTTPException(status_code=404, detail=f"Product with ID {item.product_id} not found")
+    
+    order_id = _place_orders(db, [order], products)[0]
+    db.commit()
+    return db.get(models.Order, order_id)
+
+# Bulk order import
+ORDER_ITEM_FIELDS = ("product_id", "quantity", "unit_price", "discount", "total_price")
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors())
+
+def _csv_order(rows: List[Dict[str, str]]) -> Dict:
+    """Build an order payload from consecutive CSV rows sharing an order_number."""
+    order = {key: value for key, value in rows[0].items() if key not in ORDER_ITEM_FIELDS and value != ""}
+    order["items"] = [
+        {key: row[key] for key in ORDER_ITEM_FIELDS if row.get(key, "") != ""}
+        for row in rows
+    ]
+    return order
+
+@router.post("/orders/import")
+async def import_orders(
+    request: Request,
+    format: Optional[str] = None,
+    chunk_size: int = 500,
+    db: Session = Depends(get_db)
+):
+    """
+    Import orders from a streamed NDJSON or CSV body.
+
+    NDJSON carries one ``OrderCreate`` object per line. CSV carries one row
+    per order line with the order columns repeated; consecutive rows with
+    the same ``order_number`` form one order. Orders go through the same
+    rules as ``POST /orders`` and are written and committed ``chunk_size``
+    orders at a time. Rejected rows are listed in ``errors``.
+    """
+    upload_format = streaming.upload_format(request, format)
+    chunk_size = max(1, min(chunk_size, 5000))
+    customer_ids = {customer_id for (customer_id,) in db.query(models.Customer.id)}
+    product_ids = {product_id for (product_id,) in db.query(models.Product.id)}
+    
+    report = {"format": upload_format, "orders_received": 0, "orders_imported": 0, "orders_failed": 0, "errors": []}
+    seen_numbers = set()
+    batch = []
+    
+    def reject(line, order_number, error):
+        report["orders_failed"] += 1
+        report["errors"].append({"line": line, "order_number": order_number, "error": error})
+    
+    def flush():
+        if not batch:
+            return
+        numbers = [order.order_number for _, order in batch]
+        existing = {
+            number for (number,) in
+            db.query(models.Order.order_number).filter(models.Order.order_number.in_(numbers))
+        }
+        accepted = []
+        for line, order in batch:
+            if order.order_number in existing:
+                reject(line, order.order_number, "Order number already exists")
+            else:
+                accepted.append((line, order))
+        batch.clear()
+        if not accepted:
+            return
         
-        if product.stock_quantity < item.quantity:
-            # Create a low stock alert
-            process_event = models.ProcessEvent(
-                event_type="alert",
-                description=f"Low stock for product {product.name} (ID: {product.id}). Required: {item.quantity}, Available: {product.stock_quantity}",
-                status="pending",
-                severity="high",
-                order_id=db_order.id
-            )
-            db.add(process_event)
-        
-        # Create order item
-        db_order_item = models.OrderItem(
-            order_id=db_order.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            unit_price=item.unit_price,
-            discount=item.discount,
-            total_price=item.total_price
-        )
-        db.add(db_order_item)
-        
-        # Update inventory (reduce stock)
-        inventory_movement = models.InventoryMovement(
-            product_id=item.product_id,
-            quantity=-item.quantity,  # Negative for outgoing
-            movement_type="out",
-            reference=f"Order #{db_order.order_number}",
-            movement_date=datetime.now()
-        )
-        db.add(inventory_movement)
+        try:
+            products = stock.lock_products(db, (item.product_id for _, order in accepted for item in order.items))
+            # Products deleted since the preload fail their orders like unknown ids
+            placed = []
+            for line, order in accepted:
+                missing = [item.product_id for item in order.items if item.product_id not in products]
+                if missing:
+                    product_ids.difference_update(missing)
+                    reject(line, order.order_number, f"Product with ID {missing[0]} not found")
+                else:
+                    placed.append((line, order))
+            accepted = placed
+            if accepted:
+                _place_orders(db, [order for _, order in accepted], products)
+            db.commit()
+            report["orders_imported"] += len(accepted)
+        except SQLAlchemyError as exc:
+            db.rollback()
+            for line, order in accepted:
+                reject(line, order.order_number, f"Batch failed: {exc.__class__.__name__}")
+    
+    def accept(line, data):
+        report["orders_received"] += 1
+        if isinstance(data, Exception) or not isinstance(data, dict):
+            reject(line, None, f"Invalid JSON: {data}" if isinstance(data, Exception) else "Expected a JSON object")
+            return
+        try:
+            order = schemas.OrderCreate(**data)
+        except ValidationError as exc:
+            reject(line, data.get("order_number"), _validation_message(exc))
+            return
         
-        # Update product stock
-        product.stock_quantity -= item.quantity
+        if order.order_number in seen_numbers:
+            reject(line, order.order_number, "Duplicate order number in upload")
+            return
+        if order.customer_id not in customer_ids:
+            reject(line, order.order_number, f"Customer with ID {order.customer_id} not found")
+            return
+        missing = [item.product_id for item in order.items if item.product_id not in product_ids]
+        if missing:
+            reject(line, order.order_number, f"Product with ID {missing[0]} not found")
+            return
         
-        # Check if reorder level is reached
-        if product.stock_quantity <= product.reorder_level:
-            # Create a reorder alert
-            process_event = models.ProcessEvent(
-                event_type="alert",
-                description=f"Reorder point reached for product {product.name} (ID: {product.id}). Current stock: {product.stock_quantity}, Reorder level: {product.reorder_level}",
-                status="pending",
-                severity="medium"
-            )
-            db.add(process_event)
+        seen_numbers.add(order.order_number)
+        batch.append((line, order))
+        if len(batch) >= chunk_size:
+            flush()
     
-    db.commit()
-    db.refresh(db_order)
-    return db_order
+    if upload_format == "ndjson":
+        async for line, record in streaming.iter_records(request, upload_format):
+            accept(line, record)
+    else:
+        group_line, group_rows = None, []
+        async for line, row in streaming.iter_records(request, upload_format):
+            if group_rows and row.get("order_number") != group_rows[0].get("order_number"):
+                accept(group_line, _csv_order(group_rows))
+                group_rows = []
+            if not group_rows:
+                group_line = line
+            group_rows.append(row)
+        if group_rows:
+            accept(group_line, _csv_order(group_rows))
+    flush()
+    
+    return report
 
-@router.get("/orders", response_model=List[schemas.Order])
+@router.get("/orders", response_model=Union[List[schemas.Order], schemas.CursorPage[schemas.Order]])
 async def get_orders(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    status: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    query = _orders_query(db, customer_id, status, start_date, end_date)
+    orders = pagination.paginate(query, models.Order.id, skip, limit, cursor, sort_column=models.Order.order_date)
+    return orders
+
+@router.get("/orders/export")
+async def export_orders(
+    format: str = "csv",
     customer_id: Optional[int] = None,
     status: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     db: Session = Depends(get_db)
+):
+    format = streaming.export_format(format)
+    query = _orders_query(db, customer_id, status, start_date, end_date)
+    query = query.order_by(models.Order.order_date, models.Order.id)
+    return streaming.export_response(db, query, models.Order, format, "orders")
+
+def _orders_query(
+    db: Session,
+    customer_id: Optional[int],
+    status: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
 ):
     query = db.query(models.Order)
     
@@ -137,9 +313,7 @@ async def get_orders(
         query = query.filter(models.Order.order_date >= start_date)
     if end_date:
         query = query.filter(models.Order.order_date <= end_date)
-    
-    orders = query.offset(skip).limit(limit).all()
-    return orders
+    return query
 
 @router.get("/orders/{order_id}", response_model=schemas.Order)
 async def get_order(order_id: int, db: Session = Depends(get_db)):
@@ -162,22 +336,21 @@ async def update_order_status(order_id: int, status_update: schemas.StatusUpdate
     # If cancelling an order, restore inventory
     if status == "cancelled" and db_order.status != "cancelled":
         order_items = db.query(models.OrderItem).filter(models.OrderItem.order_id == order_id).all()
+        # Lock the affected products before restoring their stock
+        products = stock.lock_products(db, (item.product_id for item in order_items))
         
-        for item in order_items:
-            # Add inventory back
-            inventory_movement = models.InventoryMovement(
-                product_id=item.product_id,
-                quantity=item.quantity,  # Positive for incoming
-                movement_type="in",
-                reference=f"Cancelled Order #{db_order.order_number}",
-                movement_date=datetime.now()
-            )
-            db.add(inventory_movement)
-            
-            # Update product stock
-            product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
-            if product:
-                product.stock_quantity += item.quantity
+        # Add inventory back, with ledger entries and the stock update
+        stock.post_movements(db, [
+            {
+                "product_id": item.product_id,
+                "quantity": item.quantity,  # Positive for incoming
+                "movement_type": "in",
+                "reference": f"Cancelled Order #{db_order.order_number}",
+                "movement_date": datetime.now()
+            }
+            for item in order_items
+            if item.product_id in products
+        ], products)
     
     # If shipping an order, create shipment record
     if status == "shipped" and db_order.status != "shipped":
@@ -192,80 +365,47 @@ async def update_order_status(order_id: int, status_update: schemas.StatusUpdate
         db.add(shipment)
         db_order.shipped_date = datetime.now()
     
+    sales_rollup.record_status_change(db, db_order, db_order.status, status)
     db_order.status = status
     db.commit()
     db.refresh(db_order)
     return db_order
 
 # Sales reporting endpoints
+def _validate_report_source(source: Optional[str], start_date: datetime, end_date: datetime):
+    if source is None:
+        return
+    if source not in reporting.SALES_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Invalid source. Must be one of: {', '.join(reporting.SALES_SOURCES)}")
+    if source == "rollup" and not reporting.whole_days(start_date, end_date):
+        raise HTTPException(status_code=400, detail="The rollup only covers whole days; start at 00:00:00 and end at 23:59:59, or use source=raw")
+
 @router.get("/reports/sales-by-customer")
 async def get_sales_by_customer(
     start_date: datetime,
     end_date: datetime,
+    source: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    # Get all orders in date range
-    orders = db.query(models.Order).filter(
-        models.Order.order_date >= start_date,
-        models.Order.order_date <= end_date,
-        models.Order.status != "cancelled"
-    ).all()
-    
-    # Group by customer
-    customer_sales = {}
-    for order in orders:
-        customer_id = order.customer_id
-        if customer_id not in customer_sales:
-            customer = db.query(models.Customer).filter(models.Customer.id == customer_id).first()
-            customer_sales[customer_id] = {
-                "customer_id": customer_id,
-                "customer_name": customer.name if customer else "Unknown",
-                "order_count": 0,
-                "total_sales": 0.0
-            }
-        
-        customer_sales[customer_id]["order_count"] += 1
-        customer_sales[customer_id]["total_sales"] += order.total_amount
-    
+    _validate_report_source(source, start_date, end_date)
     return {
         "start_date": start_date,
         "end_date": end_date,
-        "sales_by_customer": list(customer_sales.values())
+        "sales_by_customer": reporting.sales_by_customer(db, start_date, end_date, source)
     }
 
 @router.get("/reports/sales-by-product")
 async def get_sales_by_product(
     start_date: datetime,
     end_date: datetime,
+    source: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    # Get all order items in date range
-    order_items = db.query(models.OrderItem).join(models.Order).filter(
-        models.Order.order_date >= start_date,
-        models.Order.order_date <= end_date,
-        models.Order.status != "cancelled"
-    ).all()
-    
-    # Group by product
-    product_sales = {}
-    for item in order_items:
-        product_id = item.product_id
-        if product_id not in product_sales:
-            product = db.query(models.Product).filter(models.Product.id == product_id).first()
-            product_sales[product_id] = {
-                "product_id": product_id,
-                "product_name": product.name if product else "Unknown",
-                "quantity_sold": 0,
-                "total_sales": 0.0
-            }
-        
-        product_sales[product_id]["quantity_sold"] += item.quantity
-        product_sales[product_id]["total_sales"] += item.total_price
-    
+    _validate_report_source(source, start_date, end_date)
     return {
         "start_date": start_date,
         "end_date": end_date,
-        "sales_by_product": list(product_sales.values())
+        "sales_by_product": reporting.sales_by_product(db, start_date, end_date, source)
     }
 
 @router.get("/reports/sales-trend")
@@ -273,49 +413,13 @@ async def get_sales_trend(
     start_date: datetime,
     end_date: datetime,
     interval: str = "month",
+    source: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    # Get all orders in date range
-    orders = db.query(models.Order).filter(
-        models.Order.order_date >= start_date,
-        models.Order.order_date <= end_date,
-        models.Order.status != "cancelled"
-    ).all()
-    
-    # Group by time interval
-    sales_trend = {}
-    
-    for order in orders:
-        if interval == "day":
-            key = order.order_date.strftime("%Y-%m-%d")
-        elif interval == "week":
-            key = f"{order.order_date.year}-W{order.order_date.isocalendar()[1]}"
-        elif interval == "month":
-            key = order.order_date.strftime("%Y-%m")
-        elif interval == "quarter":
-            quarter = (order.order_date.month - 1) // 3 + 1
-            key = f"{order.order_date.year}-Q{quarter}"
-        elif interval == "year":
-            key = str(order.order_date.year)
-        else:
-            key = order.order_date.strftime("%Y-%m")
-        
-        if key not in sales_trend:
-            sales_trend[key] = {
-                "period": key,
-                "order_count": 0,
-                "total_sales": 0.0
-            }
-        
-        sales_trend[key]["order_count"] += 1
-        sales_trend[key]["total_sales"] += order.total_amount
-    
-    # Sort by period
-    sorted_trend = sorted(sales_trend.values(), key=lambda x: x["period"])
-    
+    _validate_report_source(source, start_date, end_date)
     return {
         "start_date": start_date,
         "end_date": end_date,
         "interval": interval,
-        "sales_trend": sorted_trend
+        "sales_trend": reporting.sales_trend(db, start_date, end_date, interval, source)
     }
@@ -0,0 +1,288 @@
+import argparse
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Integer, bindparam, column, func, insert, select, tuple_, update, values
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+import models
+import reporting
+
+# Stock level maintenance shared by the order, movement and receiving paths.
+# Products touched by a write are locked in ascending id order so concurrent
+# writers always acquire row locks in the same sequence, and quantities are
+# changed with ``stock_quantity = stock_quantity + :delta`` in SQL so no
+# update is lost to a read-modify-write race.
+#
+# Every movement also gets a ``stock_ledger`` entry holding the product's
+# running balance after it, so the stock of a product at any moment is one
+# index seek instead of a replay of its movements. Existing databases are
+# backfilled with::
+#
+#     python stock.py --chunk-size 1000
+
+def lock_products(db: Session, product_ids: Iterable[int]) -> Dict[int, models.Product]:
+    """Load the given products in one ``SELECT ... FOR UPDATE``, keyed by id."""
+    ids = sorted(set(product_ids))
+    if not ids:
+        return {}
+    products = (
+        db.query(models.Product)
+        .filter(models.Product.id.in_(ids))
+        .order_by(models.Product.id)
+        .with_for_update()
+        .populate_existing()
+        .all()
+    )
+    return {product.id: product for product in products}
+
+# Rows per VALUES list, well inside PostgreSQL's bind parameter limit.
+VALUES_CHUNK_SIZE = 10000
+
+def apply_stock_deltas(db: Session, deltas: Dict[int, int]) -> None:
+    """Add each ``product_id -> delta`` to ``stock_quantity`` in one set-based update."""
+    params = [
+        {"b_product_id": product_id, "b_delta": delta}
+        for product_id, delta in sorted(deltas.items())
+        if delta
+    ]
+    if not params:
+        return
+    products = models.Product.__table__
+    if db.get_bind().dialect.name == "postgresql":
+        # One UPDATE ... FROM (VALUES ...) per chunk rather than a statement
+        # per product; callers hold the row locks from lock_products already.
+        for start in range(0, len(params), VALUES_CHUNK_SIZE):
+            deltas = values(column("product_id", Integer), column("delta", Integer), name="deltas").data(
+                [(param["b_product_id"], param["b_delta"]) for param in params[start:start + VALUES_CHUNK_SIZE]]
+            )
+            db.execute(
+                update(products)
+                .where(products.c.id == deltas.c.product_id)
+                .values(stock_quantity=products.c.stock_quantity + deltas.c.delta)
+            )
+    else:
+        stmt = (
+            update(products)
+            .where(products.c.id == bindparam("b_product_id"))
+            .values(stock_quantity=products.c.stock_quantity + bindparam("b_delta"))
+        )
+        db.execute(stmt, params)
+
+    # Loaded Product instances now hold stale quantities; reload on next access.
+    for param in params:
+        product = db.identity_map.get(identity_key(models.Product, param["b_product_id"]))
+        if product is not None:
+            db.expire(product, ["stock_quantity"])
+
+def movement_delta(movement_type: str, quantity: int, current: int) -> int:
+    """Effect of one movement on a product's ``stock_quantity``.
+
+    ``out`` movements are recorded with positive quantities by the movement
+    endpoint and negative ones by orders; either way they reduce stock.
+    ``adjustment`` sets the absolute level.
+    """
+    if movement_type == "in":
+        return quantity
+    if movement_type == "out":
+        return -abs(quantity)
+    if movement_type == "adjustment":
+        return quantity - current
+    return 0
+
+def post_movements(db: Session, movements: List[Dict], products: Dict[int, models.Product]) -> List[int]:
+    """Insert movements, their stock ledger entries and the resulting stock changes.
+
+    ``movements`` are ``InventoryMovement`` column dicts, applied in order.
+    ``products`` must hold every referenced product, locked via
+    ``lock_products`` and not yet changed by these movements; the ledger's
+    running balances start from their ``stock_quantity``. A movement dated
+    before a product's latest ledger entry is slotted into the ledger at its
+    date (see ``_post_backdated``). Returns the new movement ids in input
+    order.
+    """
+    if not movements:
+        return []
+    movement_ids = db.execute(
+        insert(models.InventoryMovement).returning(models.InventoryMovement.id, sort_by_parameter_order=True),
+        movements
+    ).scalars().all()
+
+    ledger = models.StockLedgerEntry
+    latest = dict(
+        db.query(ledger.product_id, func.max(ledger.entry_date))
+        .filter(ledger.product_id.in_(list(products)))
+        .group_by(ledger.product_id)
+        .all()
+    )
+    levels = {product_id: product.stock_quantity or 0 for product_id, product in products.items()}
+    deltas: Dict[int, int] = {}
+    entries = []
+    for movement_id, movement in zip(movement_ids, movements):
+        product_id = movement["product_id"]
+        entry_date = movement["movement_date"]
+        last = latest.get(product_id)
+        if entry_date is not None and last is not None and entry_date < last:
+            if entries:
+                db.execute(insert(ledger), entries)
+                entries = []
+            change = _post_backdated(db, product_id, movement_id, movement)
+        else:
+            change = movement_delta(movement["movement_type"], movement["quantity"], levels[product_id])
+            entries.append({
+                "product_id": product_id,
+                "movement_id": movement_id,
+                "entry_date": entry_date,
+                "quantity_change": change,
+                "balance_after": levels[product_id] + change,
+                "created_at": datetime.now(),
+            })
+            if entry_date is not None:
+                latest[product_id] = entry_date
+        levels[product_id] += change
+        deltas[product_id] = deltas.get(product_id, 0) + change
+    if entries:
+        db.execute(insert(ledger), entries)
+    apply_stock_deltas(db, deltas)
+    return movement_ids
+
+def _post_backdated(db: Session, product_id: int, movement_id: int, movement: Dict) -> int:
+    """Slot a movement into the ledger before later-dated entries; returns its effect on current stock.
+
+    The movement's balance starts from the entry before it, and the running
+    balances of the entries after it shift by its change, up to the next
+    adjustment: that one still sets the same absolute level, so only its
+    ``quantity_change`` absorbs the difference and nothing after it (current
+    stock included) moves.
+    """
+    ledger = models.StockLedgerEntry
+    entry_date = movement["movement_date"]
+    before = stock_as_of(db, product_id, entry_date)
+    change = movement_delta(movement["movement_type"], movement["quantity"], before)
+
+    next_adjustment = (
+        db.query(ledger.entry_date, ledger.id)
+        .join(models.InventoryMovement, models.InventoryMovement.id == ledger.movement_id)
+        .filter(
+            ledger.product_id == product_id,
+            ledger.entry_date > entry_date,
+            models.InventoryMovement.movement_type == "adjustment",
+        )
+        .order_by(ledger.entry_date, ledger.id)
+        .first()
+    )
+    later = [ledger.product_id == product_id, ledger.entry_date > entry_date]
+    if next_adjustment is not None:
+        later.append(tuple_(ledger.entry_date, ledger.id) < tuple_(*next_adjustment))
+    if change:
+        db.execute(update(ledger).where(*later).values(balance_after=ledger.balance_after + change))
+        if next_adjustment is not None:
+            db.execute(
+                update(ledger)
+                .where(ledger.id == next_adjustment[1])
+                .values(quantity_change=ledger.quantity_change - change)
+            )
+    db.execute(insert(ledger), [{
+        "product_id": product_id,
+        "movement_id": movement_id,
+        "entry_date": entry_date,
+        "quantity_change": change,
+        "balance_after": before + change,
+        "created_at": datetime.now(),
+    }])
+    return 0 if next_adjustment is not None else change
+
+def stock_as_of(db: Session, product_id: int, as_of: datetime) -> Optional[int]:
+    """A product's stock level at ``as_of`` from the ledger, or ``None`` for an unknown product.
+
+    One index seek on ``(product_id, entry_date, id)`` for the last entry at
+    or before ``as_of``. Before the first entry the level is that entry's
+    opening balance; a product with no entries has only its current stock.
+    """
+    ledger = models.StockLedgerEntry
+    balance = (
+        db.query(ledger.balance_after)
+        .filter(ledger.product_id == product_id, ledger.entry_date <= as_of)
+        .order_by(ledger.entry_date.desc(), ledger.id.desc())
+        .limit(1)
+        .scalar()
+    )
+    if balance is not None:
+        return balance
+    opening = (
+        db.query(ledger.balance_after - ledger.quantity_change)
+        .filter(ledger.product_id == product_id)
+        .order_by(ledger.entry_date, ledger.id)
+        .limit(1)
+        .scalar()
+    )
+    if opening is not None:
+        return opening
+    return db.query(models.Product.stock_quantity).filter(models.Product.id == product_id).scalar()
+
+def rebuild_ledger(db: Session, chunk_size: int = 1000) -> int:
+    """Backfill stock ledger entries for movements that have none, ``chunk_size`` products at a time.
+
+    Entries already in the ledger are kept as written: they are the only
+    record of stock before a product's first adjustment, and
+    ``reporting.stock_levels`` works the missing balances back from them.
+    Each chunk is a single ``INSERT ... SELECT`` and commits, so the
+    backfill holds locks on one slice of the catalog at a time and can be
+    rerun safely. Returns the number of entries written.
+    """
+    ledger = models.StockLedgerEntry
+    movement = models.InventoryMovement
+    missing = ~select(ledger.id).where(ledger.movement_id == movement.id).exists()
+    product_ids = [row[0] for row in db.query(movement.product_id).filter(missing).distinct().order_by(movement.product_id)]
+    written = 0
+    for start in range(0, len(product_ids), chunk_size):
+        chunk = product_ids[start:start + chunk_size]
+        levels = reporting.stock_levels([movement.product_id.in_(chunk)])
+        previous = func.lag(levels.c.level).over(
+            partition_by=levels.c.product_id,
+            order_by=(levels.c.movement_date, levels.c.id),
+        )
+        changes = select(
+            levels.c.product_id,
+            levels.c.id,
+            levels.c.movement_date,
+            (levels.c.level - func.coalesce(previous, levels.c.baseline)).label("quantity_change"),
+            levels.c.level,
+        ).subquery()
+        rows = select(
+            changes.c.product_id,
+            changes.c.id,
+            changes.c.movement_date,
+            changes.c.quantity_change,
+            changes.c.level,
+            func.now(),
+        ).where(~select(ledger.id).where(ledger.movement_id == changes.c.id).exists())
+        result = db.execute(insert(ledger).from_select(
+            ["product_id", "movement_id", "entry_date", "quantity_change", "balance_after", "created_at"],
+            rows,
+        ))
+        written += result.rowcount
+        db.commit()
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the stock ledger from the inventory movements.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="products per transaction")
+    args = parser.parse_args()
+
+    from database import SessionLocal, engine
+
+    models.StockLedgerEntry.__table__.create(bind=engine, checkfirst=True)
+    session = SessionLocal()
+    try:
+        written = rebuild_ledger(session, args.chunk_size)
+        print(f"Wrote {written} stock ledger entries.")
+    except Exception as exc:
+        session.rollback()
+        print("Error while rebuilding the stock ledger:", exc)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
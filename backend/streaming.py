@@ -0,0 +1,155 @@
+import codecs
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query, Session
+
+# Incremental parsing of uploaded request bodies. Bodies are decoded chunk
+# by chunk as they arrive, so an upload is never buffered in full; callers
+# receive one record at a time together with its 1-based record number
+# (the header and blank lines count, so for files without multi-line
+# fields it is the line number).
+
+UPLOAD_FORMATS = ("ndjson", "csv")
+
+def upload_format(request: Request, format: Optional[str] = None) -> str:
+    """Resolve the upload format from ``?format=`` or the Content-Type header."""
+    if format is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type in ("text/csv", "application/csv"):
+            format = "csv"
+        elif content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines"):
+            format = "ndjson"
+    if format not in UPLOAD_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(UPLOAD_FORMATS)}")
+    return format
+
+async def iter_lines(request: Request, keepends: bool = False) -> AsyncIterator[str]:
+    """Yield decoded lines of the request body as the chunks arrive.
+
+    With ``keepends`` each line keeps its ``\n`` or ``\r\n`` terminator;
+    otherwise the terminator is stripped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n" if keepends else line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending if keepends else pending.rstrip("\r")
+
+async def iter_csv_rows(request: Request) -> AsyncIterator[List[str]]:
+    """Yield the CSV rows of the body, one per record.
+
+    A quoted field may span lines, so physical lines are collected until
+    their quotes balance (an escaped ``""`` counts twice and keeps the
+    balance) and the record is then parsed as a whole, line endings inside
+    quotes included. A blank line yields an empty row.
+    """
+    record: List[str] = []
+    quotes = 0
+    async for line in iter_lines(request, keepends=True):
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        yield next(csv.reader(record), [])
+        record, quotes = [], 0
+    if record:
+        # An unterminated quote runs to the end of the body.
+        yield next(csv.reader(record), [])
+
+async def iter_records(request: Request, format: str) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield ``(record_number, record)`` pairs from an NDJSON or CSV body.
+
+    NDJSON lines are decoded with ``json.loads``; a line that fails to
+    decode yields the ``ValueError`` in place of the record so callers can
+    report it per row. CSV rows are returned as dicts keyed by the header.
+    Blank lines are skipped.
+    """
+    record_number = 0
+    if format == "ndjson":
+        async for line in iter_lines(request):
+            record_number += 1
+            if not line.strip():
+                continue
+            try:
+                yield record_number, json.loads(line)
+            except ValueError as exc:
+                yield record_number, exc
+        return
+
+    header = None
+    async for values in iter_csv_rows(request):
+        record_number += 1
+        if len(values) <= 1 and not "".join(values).strip():
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        record: Dict[str, Any] = dict(zip(header, values))
+        yield record_number, record
+
+# Streaming exports. Rows are read through a server-side cursor
+# (``stream_results`` with ``yield_per``) on a connection owned by the
+# response body, and written out one batch at a time, so memory stays flat
+# however many rows match. The connection is taken from the engine rather
+# than the request session because the session is released before the body
+# has finished streaming.
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+def export_format(format: str) -> str:
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(EXPORT_FORMATS)}")
+    return format
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def iter_export(bind: Any, statement: Any, format: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """Yield ``statement``'s rows as CSV (with a header row) or NDJSON, one batch per chunk."""
+    engine = getattr(bind, "engine", bind)
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        columns = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if format == "csv":
+            writer.writerow(columns)
+        for rows in result.partitions():
+            for row in rows:
+                values = [_export_value(value) for value in row]
+                if format == "csv":
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, values))) + "\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+def export_response(db: Session, query: Query, model: Any, format: str, filename: str) -> StreamingResponse:
+    """Stream every column of ``model`` for the rows matched by ``query``."""
+    statement = query.with_entities(*model.__table__.columns).statement
+    return StreamingResponse(
+        iter_export(db.get_bind(), statement, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
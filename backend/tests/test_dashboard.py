@@ -12,3 +12,10 @@ def test_dashboard_summary(client, auth_headers):
     assert "sales_trend" in data
     assert "notifications" in data
 
+
+def test_dashboard_sales_trend_is_monthly(client, auth_headers):
+    response = client.get("/api/dashboard/summary", headers=auth_headers)
+    trend = response.json()["sales_trend"]
+    assert len(trend) in (6, 7)
+    assert [row["month"] for row in trend] == sorted(row["month"] for row in trend)
+    assert all(row["order_count"] == 0 and row["total_sales"] == 0.0 for row in trend)
@@ -1,5 +1,20 @@
+import asyncio
+import csv
+import io
+import json
+import threading
+
 import pytest
+from datetime import datetime
+from decimal import Decimal
 from fastapi import status
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+import models
+import schemas
+from services import finance_service
 
 # Test data
 SAMPLE_TRANSACTION = {
@@ -10,6 +25,33 @@ SAMPLE_TRANSACTION = {
     "account_id": 1
 }
 
+def _legacy_income_statement(db, start_date, end_date):
+    """The per-account rescan the income statement used before it moved to SQL."""
+    def breakdown(account_type, transaction_type):
+        accounts = db.query(models.Account).filter(models.Account.type == account_type).all()
+        transactions = db.query(models.Transaction).filter(
+            models.Transaction.account_id.in_([account.id for account in accounts]),
+            models.Transaction.transaction_date >= start_date,
+            models.Transaction.transaction_date <= end_date,
+            models.Transaction.type == transaction_type
+        ).all()
+        return [
+            {"account_id": account.id, "account_name": account.name, "amount": sum(t.amount for t in transactions if t.account_id == account.id)}
+            for account in accounts
+        ]
+
+    revenue_breakdown = breakdown("revenue", "credit")
+    expense_breakdown = breakdown("expense", "debit")
+    total_revenue = sum(line["amount"] for line in revenue_breakdown)
+    total_expenses = sum(line["amount"] for line in expense_breakdown)
+    return {
+        "total_revenue": total_revenue,
+        "total_expenses": total_expenses,
+        "net_income": total_revenue - total_expenses,
+        "revenue_breakdown": revenue_breakdown,
+        "expense_breakdown": expense_breakdown
+    }
+
 def test_create_transaction(client, auth_headers, test_account):
     """Test creating a new financial transaction."""
     transaction_data = SAMPLE_TRANSACTION.copy()
@@ -121,4 +163,345 @@ def test_delete_transaction(client, auth_headers, test_account):
         f"/api/finance/transactions/{transaction_id}",
         headers=auth_headers
     )
-    assert get_response.status_code == status.HTTP_404_NOT_FOUND 
\ No newline at end of file
+    assert get_response.status_code == status.HTTP_404_NOT_FOUND 
+
+def test_get_transactions_cursor_pagination(client, auth_headers, test_account):
+    """Test walking the transaction list with keyset cursors."""
+    account_id = test_account.id
+    dates = ["2024-03-05T10:00:00", "2024-03-01T10:00:00", "2024-03-03T10:00:00", "2024-03-03T10:00:00", "2024-03-02T10:00:00"]
+    for transaction_date in dates:
+        transaction_data = dict(SAMPLE_TRANSACTION, account_id=account_id, transaction_date=transaction_date)
+        client.post("/api/finance/transactions", json=transaction_data, headers=auth_headers)
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get(
+            "/api/finance/transactions",
+            params={"cursor": cursor, "limit": 2, "account_id": account_id},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen.extend((item["transaction_date"], item["id"]) for item in page["items"])
+        cursor = page["next_cursor"]
+
+    assert len(seen) == len(dates)
+    assert seen == sorted(seen)
+
+    response = client.get("/api/finance/transactions", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_export_transactions(client, auth_headers, test_account):
+    """Test streaming transactions as CSV and NDJSON with list filters."""
+    account_id = test_account.id
+    for transaction_date in ["2024-03-02T10:00:00", "2024-03-01T10:00:00", "2024-04-01T10:00:00"]:
+        transaction_data = dict(SAMPLE_TRANSACTION, account_id=account_id, transaction_date=transaction_date)
+        client.post("/api/finance/transactions", json=transaction_data, headers=auth_headers)
+    params = {"account_id": account_id, "end_date": "2024-03-31T00:00:00"}
+
+    response = client.get("/api/finance/transactions/export", params=params, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["transaction_date"] for row in rows] == ["2024-03-01T10:00:00", "2024-03-02T10:00:00"]
+    assert float(rows[0]["amount"]) == SAMPLE_TRANSACTION["amount"]
+
+    response = client.get("/api/finance/transactions/export", params=dict(params, format="ndjson"), headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["account_id"] for record in records] == [account_id, account_id]
+
+    response = client.get("/api/finance/transactions/export", params={"format": "xml"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_income_statement_matches_per_account_totals(client, auth_headers, db_session):
+    """Test the SQL income statement against the previous per-account computation."""
+    accounts = [
+        models.Account(account_code=f"IS{i:03d}", name=f"Account {i}", type=account_type, balance=0.0)
+        for i, account_type in enumerate(["revenue", "revenue", "expense", "expense", "asset", "revenue"])
+    ]
+    db_session.add_all(accounts)
+    db_session.flush()
+    for i, account in enumerate(accounts[:5]):
+        for day, transaction_type in [(1, "credit"), (10, "debit"), (15, "credit"), (28, "debit")]:
+            db_session.add(models.Transaction(
+                transaction_date=datetime(2024, 2, day, 12),
+                amount=100.25 * (i + 1) + day,
+                type=transaction_type,
+                account_id=account.id
+            ))
+        # Outside the reporting window
+        db_session.add(models.Transaction(transaction_date=datetime(2024, 3, 5), amount=999.0, type="credit", account_id=account.id))
+    db_session.commit()
+
+    start_date, end_date = datetime(2024, 2, 1), datetime(2024, 2, 29, 23, 59, 59)
+    expected = _legacy_income_statement(db_session, start_date, end_date)
+
+    response = client.get(
+        "/api/finance/reports/income-statement",
+        params={"start_date": start_date.isoformat(), "end_date": end_date.isoformat()},
+        headers=auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["revenue_breakdown"] == expected["revenue_breakdown"]
+    assert data["expense_breakdown"] == expected["expense_breakdown"]
+    for key in ("total_revenue", "total_expenses", "net_income"):
+        assert data[key] == pytest.approx(expected[key])
+    assert [line["amount"] for line in data["revenue_breakdown"]] == [216.5, 417.0, 0]
+
+def test_income_statement_totals_are_exact_decimals(client, auth_headers, db_session):
+    """Test that money sums are exact: ten 0.10 credits total 1.00, not 0.9999999999999999."""
+    revenue = models.Account(account_code="DEC001", name="Sales", type="revenue", balance=0)
+    expense = models.Account(account_code="DEC002", name="Fees", type="expense", balance=0)
+    db_session.add_all([revenue, expense])
+    db_session.flush()
+    db_session.add_all(
+        [models.Transaction(transaction_date=datetime(2024, 4, 2), amount=Decimal("0.10"), type="credit", account_id=revenue.id) for _ in range(10)]
+        + [models.Transaction(transaction_date=datetime(2024, 4, 3), amount=Decimal("0.10"), type="debit", account_id=expense.id),
+           models.Transaction(transaction_date=datetime(2024, 4, 3), amount=Decimal("0.20"), type="debit", account_id=expense.id)]
+    )
+    db_session.commit()
+    start_date, end_date = datetime(2024, 4, 1), datetime(2024, 4, 30)
+
+    statement = asyncio.run(finance_service.get_income_statement(start_date=start_date, end_date=end_date, db=db_session))
+    assert statement["total_revenue"] == Decimal("1.00")
+    assert statement["total_expenses"] == Decimal("0.30")
+    assert statement["net_income"] == Decimal("0.70")
+    assert all(isinstance(statement[key], Decimal) for key in ("total_revenue", "total_expenses", "net_income"))
+
+    data = client.get(
+        "/api/finance/reports/income-statement",
+        params={"start_date": start_date.isoformat(), "end_date": end_date.isoformat()},
+        headers=auth_headers
+    ).json()
+    assert (data["total_revenue"], data["total_expenses"], data["net_income"]) == (1.0, 0.3, 0.7)
+
+def test_money_schema_serialization():
+    """Test that Money fields hold Decimals and serialize to plain JSON numbers."""
+    account = schemas.AccountCreate(account_code="M1", name="Cash", type="asset", balance=0.1)
+    assert account.balance == Decimal("0.1")
+    assert isinstance(account.model_dump()["balance"], Decimal)
+    assert account.model_dump(mode="json")["balance"] == 0.1
+    assert json.loads(account.model_dump_json())["balance"] == 0.1
+
+    line = schemas.JournalLine(account_id=1, amount="1234567890123456.78", type="credit")
+    assert line.amount == Decimal("1234567890123456.78")
+    assert isinstance(json.loads(line.model_dump_json())["amount"], float)
+
+def test_balance_sheet_as_of_uses_snapshots(client, auth_headers, test_account):
+    """Test historical balance sheets from snapshots plus later transactions."""
+    account_id = test_account.id
+
+    def post_transaction(transaction_date, amount, transaction_type):
+        transaction_data = dict(
+            SAMPLE_TRANSACTION, account_id=account_id, transaction_date=transaction_date, amount=amount, type=transaction_type
+        )
+        response = client.post("/api/finance/transactions", json=transaction_data, headers=auth_headers)
+        assert response.status_code == status.HTTP_201_CREATED
+        return response.json()["id"]
+
+    def balance_as_of(as_of=None):
+        params = {"date": as_of} if as_of else {}
+        response = client.get("/api/finance/reports/balance-sheet", params=params, headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()["total_assets"]
+
+    post_transaction("2024-01-10T10:00:00", 100.0, "credit")
+    post_transaction("2024-02-10T10:00:00", 30.0, "debit")
+    march_id = post_transaction("2024-03-10T10:00:00", 50.0, "credit")
+
+    response = client.post("/api/finance/balance-snapshots", params={"as_of": "2024-02-29T23:59:59"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["accounts_snapshotted"] == 1
+
+    # Backdated entries after the snapshot was taken are carried into it
+    post_transaction("2024-01-20T10:00:00", 5.0, "credit")
+    client.put(f"/api/finance/transactions/{march_id}", json={"amount": 60.0}, headers=auth_headers)
+
+    assert balance_as_of("2023-12-31T00:00:00") == pytest.approx(0.0)
+    assert balance_as_of("2024-01-31T00:00:00") == pytest.approx(105.0)
+    assert balance_as_of("2024-02-29T23:59:59") == pytest.approx(75.0)
+    assert balance_as_of("2024-03-31T00:00:00") == pytest.approx(135.0)
+    assert balance_as_of() == pytest.approx(135.0)
+
+def test_cash_flow_totals_and_detail(client, auth_headers, db_session):
+    """Test cash-flow totals over flagged cash accounts and the paged detail."""
+    cash = models.Account(account_code="CASH01", name="Operating", type="asset", balance=0.0, is_cash=True)
+    other = models.Account(account_code="BANK01", name="Petty cash (not flagged)", type="asset", balance=0.0)
+    db_session.add_all([cash, other])
+    db_session.commit()
+    cash_id, other_id = cash.id, other.id
+
+    for account_id, day, amount, transaction_type in [
+        (cash_id, 1, 100.0, "credit"),
+        (cash_id, 2, 40.0, "debit"),
+        (cash_id, 3, 25.0, "credit"),
+        (other_id, 2, 500.0, "credit"),
+    ]:
+        transaction_data = dict(
+            SAMPLE_TRANSACTION, account_id=account_id, transaction_date=f"2024-05-0{day}T09:00:00", amount=amount, type=transaction_type
+        )
+        client.post("/api/finance/transactions", json=transaction_data, headers=auth_headers)
+    params = {"start_date": "2024-05-01T00:00:00", "end_date": "2024-05-31T23:59:59"}
+
+    response = client.get("/api/finance/reports/cash-flow", params=params, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["cash_inflows"] == pytest.approx(125.0)
+    assert data["cash_outflows"] == pytest.approx(40.0)
+    assert data["net_cash_flow"] == pytest.approx(85.0)
+    assert data["transaction_count"] == 3
+    assert "transactions" not in data
+
+    response = client.get(
+        "/api/finance/reports/cash-flow/transactions", params=dict(params, cursor="", limit=2), headers=auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    page = response.json()
+    assert [item["amount"] for item in page["items"]] == [100.0, 40.0]
+    next_page = client.get(
+        "/api/finance/reports/cash-flow/transactions", params=dict(params, cursor=page["next_cursor"], limit=2), headers=auth_headers
+    ).json()
+    assert [item["amount"] for item in next_page["items"]] == [25.0]
+    assert next_page["next_cursor"] is None
+
+def test_concurrent_postings_keep_exact_balance(tmp_path):
+    """Test that many threads posting to one account leave the exact final balance."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'concurrency.db'}",
+        connect_args={"check_same_thread": False, "timeout": 60},
+    )
+    tables = [
+        models.Account.__table__,
+        models.AccountBalanceSnapshot.__table__,
+        models.Transaction.__table__,
+    ]
+    Base.metadata.create_all(bind=engine, tables=tables)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with SessionLocal() as db:
+        db.add(models.Account(id=1, account_code="1100", name="Accounts Receivable", type="asset", balance=0.0))
+        db.commit()
+
+    threads, postings_per_thread = 8, 250
+    errors = []
+
+    def post_transactions(worker):
+        db = SessionLocal()
+        try:
+            for n in range(postings_per_thread):
+                transaction = schemas.TransactionCreate(
+                    transaction_date=datetime.now(),
+                    amount=1.25 if n % 2 == 0 else 0.5,
+                    description=f"Posting {worker}-{n}",
+                    type="credit" if n % 2 == 0 else "debit",
+                    account_id=1,
+                )
+                asyncio.run(finance_service.create_transaction(transaction, db=db))
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            db.close()
+
+    workers = [threading.Thread(target=post_transactions, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    with SessionLocal() as db:
+        assert db.query(models.Transaction).count() == threads * postings_per_thread
+        assert db.get(models.Account, 1).balance == threads * (postings_per_thread // 2) * (1.25 - 0.5)
+    engine.dispose()
+
+def test_post_journal_entry(client, auth_headers, db_session):
+    """Test batch journal posting, its balance check and account validation."""
+    cash = models.Account(account_code="J1000", name="Cash", type="asset", balance=10.0)
+    revenue = models.Account(account_code="J4000", name="Revenue", type="revenue", balance=0.0)
+    tax = models.Account(account_code="J2200", name="Sales Tax", type="liability", balance=0.0)
+    db_session.add_all([cash, revenue, tax])
+    db_session.commit()
+    cash_id, revenue_id, tax_id = cash.id, revenue.id, tax.id
+
+    entry = {
+        "transaction_date": "2024-06-30T23:00:00",
+        "description": "June sales",
+        "lines": [
+            {"account_id": cash_id, "type": "debit", "amount": 110.0},
+            {"account_id": revenue_id, "type": "credit", "amount": 60.0},
+            {"account_id": revenue_id, "type": "credit", "amount": 40.0},
+            {"account_id": tax_id, "type": "credit", "amount": 10.0, "description": "Sales tax"},
+        ]
+    }
+    response = client.post("/api/finance/journal-entries", json=entry, headers=auth_headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert data["lines_posted"] == 4
+    assert data["accounts_updated"] == 3
+    assert data["total_debits"] == data["total_credits"] == 110.0
+
+    accounts = {account["id"]: account for account in client.get("/api/finance/accounts", headers=auth_headers).json()}
+    assert accounts[cash_id]["balance"] == -100.0
+    assert accounts[revenue_id]["balance"] == 100.0
+    assert accounts[tax_id]["balance"] == 10.0
+    transactions = client.get("/api/finance/transactions", params={"account_id": tax_id}, headers=auth_headers).json()
+    assert [t["description"] for t in transactions] == ["Sales tax"]
+
+    unbalanced = dict(entry, lines=entry["lines"][:2])
+    response = client.post("/api/finance/journal-entries", json=unbalanced, headers=auth_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    unknown = dict(entry, lines=entry["lines"][:3] + [dict(entry["lines"][3], account_id=999999)])
+    response = client.post("/api/finance/journal-entries", json=unknown, headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert client.get(f"/api/finance/accounts/{cash_id}", headers=auth_headers).json()["balance"] == -100.0
+
+def test_ar_aging_and_mark_overdue(client, auth_headers, db_session):
+    """Test the AR aging buckets and the bulk overdue job."""
+    acme = models.Customer(name="Acme")
+    globex = models.Customer(name="Globex")
+    db_session.add_all([acme, globex])
+    db_session.commit()
+    acme_id, globex_id = acme.id, globex.id
+
+    invoices = [
+        # (customer, due date, status, total)
+        (acme_id, datetime(2024, 7, 15), "sent", 100.0),     # current
+        (acme_id, datetime(2024, 6, 20), "sent", 50.0),      # 1-30
+        (acme_id, datetime(2024, 5, 15), "overdue", 25.0),   # 31-60
+        (globex_id, datetime(2024, 4, 10), "overdue", 40.0), # 61-90
+        (globex_id, datetime(2024, 1, 1), "sent", 10.0),     # 90+
+        (globex_id, datetime(2024, 6, 1), "paid", 999.0),    # settled, excluded
+        (globex_id, datetime(2024, 6, 1), "draft", 999.0),   # not issued, excluded
+    ]
+    db_session.add_all([
+        models.Invoice(invoice_number=f"AR-{i}", customer_id=customer_id, due_date=due_date,
+                       status=invoice_status, amount=total, tax_amount=0, total_amount=total)
+        for i, (customer_id, due_date, invoice_status, total) in enumerate(invoices)
+    ])
+    db_session.commit()
+
+    response = client.get("/api/finance/reports/ar-aging", params={"as_of": "2024-07-01T00:00:00"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    customers = {row["customer_id"]: row for row in data["customers"]}
+    assert customers[acme_id]["customer_name"] == "Acme"
+    assert (customers[acme_id]["current"], customers[acme_id]["days_1_30"], customers[acme_id]["days_31_60"]) == (100.0, 50.0, 25.0)
+    assert customers[acme_id]["total"] == 175.0
+    assert (customers[globex_id]["days_61_90"], customers[globex_id]["days_over_90"]) == (40.0, 10.0)
+    assert customers[globex_id]["invoice_count"] == 2
+    assert data["totals"]["total"] == 225.0
+    assert data["totals"]["invoice_count"] == 5
+
+    response = client.post("/api/finance/invoices/mark-overdue", params={"as_of": "2024-07-01T00:00:00"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["invoices_marked"] == 2
+    statuses = {invoice.invoice_number: invoice.status for invoice in db_session.query(models.Invoice).all()}
+    assert statuses == {"AR-0": "sent", "AR-1": "overdue", "AR-2": "overdue", "AR-3": "overdue",
+                        "AR-4": "overdue", "AR-5": "paid", "AR-6": "draft"}
+    response = client.post("/api/finance/invoices/mark-overdue", params={"as_of": "2024-07-01T00:00:00"}, headers=auth_headers)
+    assert response.json()["invoices_marked"] == 0
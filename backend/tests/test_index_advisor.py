@@ -0,0 +1,48 @@
+import json
+
+import index_advisor
+import models
+
+# EXPLAIN (FORMAT JSON) output for a join where only orders is read by index.
+POSTGRES_PLAN = json.loads("""
+[{"Plan": {
+    "Node Type": "Hash Join",
+    "Plans": [
+        {"Node Type": "Seq Scan", "Relation Name": "order_items", "Alias": "order_items"},
+        {"Node Type": "Hash", "Plans": [
+            {"Node Type": "Bitmap Heap Scan", "Relation Name": "orders", "Plans": [
+                {"Node Type": "Bitmap Index Scan", "Index Name": "ix_orders_status_order_date"}
+            ]}
+        ]},
+        {"Node Type": "Seq Scan", "Relation Name": "customers", "Filter": "(credit_limit > '0'::numeric)"}
+    ]
+}}]
+""")
+
+def test_postgres_plan_scans():
+    """Test that every Seq Scan node in a nested JSON plan is reported with its filter."""
+    assert list(index_advisor._postgres_scans(POSTGRES_PLAN[0]["Plan"])) == [
+        ("order_items", ""),
+        ("customers", "(credit_limit > '0'::numeric)"),
+    ]
+
+def test_sqlite_plan_scans():
+    """Test full scans in EXPLAIN QUERY PLAN rows, ignoring index searches and covering scans."""
+    assert index_advisor._SQLITE_SCAN.match("SCAN orders").group(1) == "orders"
+    assert index_advisor._SQLITE_SCAN.match("SCAN orders AS o").group(1) == "orders"
+    assert index_advisor._SQLITE_SCAN.match("SCAN orders USING INDEX ix_orders_order_date_id") is None
+    assert index_advisor._SQLITE_SCAN.match("SEARCH orders USING INDEX ix_orders_status_order_date (status=?)") is None
+
+def test_sequential_scans_on_sqlite(db_session):
+    """Test the advisor's findings for one scanning and one indexed statement."""
+    scans = index_advisor.sequential_scans(db_session, "SELECT * FROM products WHERE description = ?", ("x",))
+    assert scans == [("products", "SCAN products")]
+    assert index_advisor.sequential_scans(db_session, "SELECT * FROM products WHERE sku = ?", ("x",)) == []
+
+def test_advise_flags_only_large_tables(db_session, capsys):
+    """Test that scans of tables under --min-rows are not flagged."""
+    db_session.add_all([models.Product(sku=f"ADV-{i}", name=f"Product {i}", unit_price=1, stock_quantity=0) for i in range(3)])
+    db_session.commit()
+    assert index_advisor._freeze({"b": 2, "a": 1}) == (("a", 1), ("b", 2))
+    assert index_advisor.advise(db_session, None, None, min_rows=10 ** 9) == 0
+    assert "sequential scans" in capsys.readouterr().out
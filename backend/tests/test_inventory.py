@@ -1,6 +1,14 @@
 import pytest
 from fastapi import status
 from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+import forecasting
+import models
+import product_search
+import stock
 
 # Test data
 SAMPLE_PRODUCT = {
@@ -40,6 +48,24 @@ SAMPLE_PURCHASE_ORDER = {
     ]
 }
 
+def _sell(client, auth_headers, db_session, product_id, quantity, order_number):
+    """Place a sales order, which records its stock outflow as a negative ``out`` movement."""
+    customer = db_session.query(models.Customer).filter_by(name="Stock Report Customer").first()
+    if customer is None:
+        customer = models.Customer(name="Stock Report Customer", credit_limit=1000000)
+        db_session.add(customer)
+        db_session.commit()
+    response = client.post("/api/sales/orders", json={
+        "order_number": order_number,
+        "customer_id": customer.id,
+        "order_date": datetime.now().isoformat(),
+        "required_date": (datetime.now() + timedelta(days=7)).isoformat(),
+        "status": "confirmed",
+        "total_amount": quantity * 1.0,
+        "items": [{"product_id": product_id, "quantity": quantity, "unit_price": 1.0, "discount": 0.0, "total_price": quantity * 1.0}],
+    }, headers=auth_headers)
+    assert response.status_code == status.HTTP_201_CREATED
+
 def test_create_product(client, auth_headers):
     """Test creating a new product."""
     response = client.post(
@@ -288,4 +314,610 @@ def test_low_stock_report(client, auth_headers):
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert "low_stock_items" in data
-    assert len(data["low_stock_items"]) > 0 
\ No newline at end of file
+    assert len(data["low_stock_items"]) > 0 
+
+def test_unit_price_keeps_four_decimal_places(client, auth_headers, db_session):
+    """Test that unit prices round-trip at four decimal places and money at two."""
+    product_data = dict(SAMPLE_PRODUCT, sku="PRC-1", unit_price=12.3456)
+    response = client.post("/api/inventory/products", json=product_data, headers=auth_headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    product_id = response.json()["id"]
+    assert client.get(f"/api/inventory/products/{product_id}", headers=auth_headers).json()["unit_price"] == 12.3456
+
+    db_session.expire_all()
+    product = db_session.get(models.Product, product_id)
+    assert product.unit_price == Decimal("12.3456")
+    assert product.unit_price * 3 == Decimal("37.0368")
+
+    supplier = models.Supplier(name="Precision Supplier")
+    db_session.add(supplier)
+    db_session.commit()
+    po = models.PurchaseOrder(po_number="PO-PRC-1", supplier_id=supplier.id, status="draft", total_amount=Decimal("37.04"))
+    db_session.add(po)
+    db_session.commit()
+    db_session.add(models.PurchaseOrderItem(purchase_order_id=po.id, product_id=product_id, quantity=3, unit_price=Decimal("12.3456"), total_price=Decimal("37.04")))
+    db_session.commit()
+    db_session.expire_all()
+    item = db_session.query(models.PurchaseOrderItem).filter_by(purchase_order_id=po.id).one()
+    assert (item.unit_price, item.total_price) == (Decimal("12.3456"), Decimal("37.04"))
+    assert db_session.get(models.PurchaseOrder, po.id).total_amount == Decimal("37.04")
+
+def test_inventory_valuation_rollups_and_detail(client, auth_headers, db_session):
+    """Test category totals and the value-sorted, paginated product detail."""
+    db_session.add_all([
+        models.Product(sku="VAL-1", name="Bolt", category="hardware", unit_price=0.25, stock_quantity=400),
+        models.Product(sku="VAL-2", name="Nut", category="hardware", unit_price=0.10, stock_quantity=300),
+        models.Product(sku="VAL-3", name="Drill", category="tools", unit_price=80.0, stock_quantity=2),
+        models.Product(sku="VAL-4", name="Saw", category="tools", unit_price=25.0, stock_quantity=1),
+    ])
+    db_session.commit()
+
+    response = client.get("/api/inventory/reports/inventory-valuation", params={"top": 2}, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    categories = {row["category"]: row for row in data["categories"]}
+    assert categories["hardware"]["total_value"] == 130.0
+    assert categories["hardware"]["product_count"] == 2
+    assert categories["tools"]["total_value"] == 185.0
+    assert data["total_value"] == 315.0
+    assert [row["sku"] for row in data["products"]] == ["VAL-3", "VAL-1"]
+
+    skus, cursor = [], ""
+    while cursor is not None:
+        page = client.get(
+            "/api/inventory/reports/inventory-valuation/products",
+            params={"limit": 3, "cursor": cursor},
+            headers=auth_headers
+        ).json()
+        skus += [row["sku"] for row in page["items"]]
+        cursor = page["next_cursor"]
+    assert skus == ["VAL-3", "VAL-1", "VAL-2", "VAL-4"]
+
+    response = client.get(
+        "/api/inventory/reports/inventory-valuation/products",
+        params={"category": "tools", "sort": "id", "skip": 1},
+        headers=auth_headers
+    )
+    assert [row["sku"] for row in response.json()] == ["VAL-4"]
+
+    response = client.get("/api/inventory/reports/inventory-valuation/products", params={"sort": "name"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_low_stock_report_uses_recent_outflow(client, auth_headers, db_session):
+    """Test days to stockout from the last 30 days of outgoing movements."""
+    low = models.Product(sku="LOW-1", name="Low", unit_price=1.0, stock_quantity=30, reorder_level=50, reorder_quantity=100)
+    idle = models.Product(sku="LOW-2", name="Idle", unit_price=1.0, stock_quantity=0, reorder_level=5, reorder_quantity=10)
+    healthy = models.Product(sku="LOW-3", name="Healthy", unit_price=1.0, stock_quantity=500, reorder_level=50)
+    db_session.add_all([low, idle, healthy])
+    db_session.commit()
+    now = datetime.now()
+    db_session.add_all([
+        models.InventoryMovement(product_id=low.id, quantity=40, movement_type="out", movement_date=now - timedelta(days=3)),
+        models.InventoryMovement(product_id=low.id, quantity=20, movement_type="out", movement_date=now - timedelta(days=10)),
+        models.InventoryMovement(product_id=low.id, quantity=500, movement_type="out", movement_date=now - timedelta(days=45)),
+        models.InventoryMovement(product_id=low.id, quantity=70, movement_type="in", movement_date=now - timedelta(days=2)),
+    ])
+    db_session.commit()
+
+    response = client.get("/api/inventory/reports/low-stock", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    items = {item["sku"]: item for item in response.json()["low_stock_items"]}
+    assert set(items) == {"LOW-1", "LOW-2"}
+    assert items["LOW-1"]["days_to_stockout"] == pytest.approx(15.0)
+    assert items["LOW-1"]["status"] == "Low Stock"
+    assert items["LOW-2"]["days_to_stockout"] is None
+    assert items["LOW-2"]["status"] == "Out of Stock"
+
+def test_low_stock_report_counts_order_outflow(client, auth_headers, db_session):
+    """Test days to stockout for a product whose outflow comes from sales orders."""
+    product = models.Product(sku="LOW-4", name="Selling", unit_price=1.0, stock_quantity=20, reorder_level=30, reorder_quantity=50)
+    db_session.add(product)
+    db_session.commit()
+    product_id = product.id
+    _sell(client, auth_headers, db_session, product_id, 6, "ORD-LOW-1")
+
+    response = client.get("/api/inventory/reports/low-stock", headers=auth_headers)
+    item, = [item for item in response.json()["low_stock_items"] if item["product_id"] == product_id]
+    assert item["stock_quantity"] == 14
+    # 6 units over 30 days is 0.2 a day.
+    assert item["days_to_stockout"] == pytest.approx(70.0)
+
+def test_stock_movements_opening_and_closing_balances(client, auth_headers, db_session):
+    """Test opening/closing stock rebuilt from the ledger, ignoring later movements."""
+    plain = models.Product(sku="MOV-1", name="Plain", unit_price=1.0, stock_quantity=10)
+    adjusted = models.Product(sku="MOV-2", name="Adjusted", unit_price=1.0, stock_quantity=22)
+    db_session.add_all([plain, adjusted])
+    db_session.commit()
+    plain_id, adjusted_id = plain.id, adjusted.id
+    movements = [
+        # Plain was created with 10 units: 10 + 5 = 15 before the range, then 12 and 16, then 10.
+        (plain_id, "in", 5, datetime(2024, 5, 20)),
+        (plain_id, "out", 3, datetime(2024, 6, 5)),
+        (plain_id, "in", 4, datetime(2024, 6, 10)),
+        (plain_id, "out", 6, datetime(2024, 7, 2)),
+        # Adjusted: 5, then counted at 20, then 17, then 22 after the range.
+        (adjusted_id, "in", 5, datetime(2024, 5, 1)),
+        (adjusted_id, "adjustment", 20, datetime(2024, 6, 1)),
+        (adjusted_id, "out", 3, datetime(2024, 6, 15)),
+        (adjusted_id, "in", 5, datetime(2024, 7, 5)),
+    ]
+    db_session.add_all([
+        models.InventoryMovement(product_id=product_id, movement_type=movement_type, quantity=quantity, movement_date=moved_at)
+        for product_id, movement_type, quantity, moved_at in movements
+    ])
+    db_session.commit()
+
+    params = {"start_date": "2024-06-01T00:00:00", "end_date": "2024-06-30T23:59:59"}
+    response = client.get("/api/inventory/reports/stock-movements", params=params, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    summary = {row["product_id"]: row for row in response.json()["product_movements"]}
+    assert summary[plain_id]["starting_stock"] == 15
+    assert summary[plain_id]["ending_stock"] == 16
+    assert (summary[plain_id]["in_quantity"], summary[plain_id]["out_quantity"]) == (4, 3)
+    assert summary[adjusted_id]["starting_stock"] == 5
+    assert summary[adjusted_id]["ending_stock"] == 17
+    assert summary[adjusted_id]["movement_count"] == 2
+
+    response = client.get(
+        "/api/inventory/reports/stock-movements/detail",
+        params=dict(params, product_id=plain_id, limit=1, cursor=""),
+        headers=auth_headers
+    )
+    first = response.json()
+    assert [row["stock_after"] for row in first["items"]] == [12]
+    second = client.get(
+        "/api/inventory/reports/stock-movements/detail",
+        params=dict(params, product_id=plain_id, limit=1, cursor=first["next_cursor"]),
+        headers=auth_headers
+    ).json()
+    assert [row["stock_after"] for row in second["items"]] == [16]
+    assert second["next_cursor"] is None
+
+def test_stock_movements_count_order_outflow(client, auth_headers, db_session):
+    """Test that sales order outflow, stored as negative quantities, lowers stock in the report."""
+    product = models.Product(sku="MOV-3", name="Sold", unit_price=1.0, stock_quantity=50)
+    db_session.add(product)
+    db_session.commit()
+    product_id = product.id
+    _sell(client, auth_headers, db_session, product_id, 4, "ORD-MOV-1")
+    _sell(client, auth_headers, db_session, product_id, 6, "ORD-MOV-2")
+
+    params = {"start_date": (datetime.now() - timedelta(days=1)).isoformat(), "end_date": (datetime.now() + timedelta(days=1)).isoformat()}
+    response = client.get("/api/inventory/reports/stock-movements", params=params, headers=auth_headers)
+    row, = [row for row in response.json()["product_movements"] if row["product_id"] == product_id]
+    assert (row["in_quantity"], row["out_quantity"]) == (0, 10)
+    assert (row["starting_stock"], row["ending_stock"]) == (50, 40)
+
+    detail = client.get(
+        "/api/inventory/reports/stock-movements/detail",
+        params=dict(params, product_id=product_id),
+        headers=auth_headers
+    ).json()
+    assert [(row["quantity"], row["stock_after"]) for row in detail] == [(-4, 46), (-6, 40)]
+
+def test_stock_movements_before_an_adjustment(client, auth_headers, db_session):
+    """Test that levels ahead of a cycle count start from the product's initial stock."""
+    product = models.Product(sku="MOV-4", name="Counted", unit_price=1.0, stock_quantity=100, reorder_level=0)
+    db_session.add(product)
+    db_session.commit()
+    product_id = product.id
+    for movement_type, quantity, moved_at in [
+        ("out", 10, "2024-06-05T00:00:00"),
+        ("adjustment", 50, "2024-06-10T00:00:00"),
+        ("in", 5, "2024-06-15T00:00:00"),
+    ]:
+        response = client.post(
+            "/api/inventory/movements",
+            json={"product_id": product_id, "quantity": quantity, "movement_type": movement_type,
+                  "reference": "count test", "movement_date": moved_at},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    params = {"start_date": "2024-06-01T00:00:00", "end_date": "2024-06-30T23:59:59"}
+    response = client.get("/api/inventory/reports/stock-movements", params=params, headers=auth_headers)
+    row, = [row for row in response.json()["product_movements"] if row["product_id"] == product_id]
+    assert (row["starting_stock"], row["ending_stock"]) == (100, 55)
+
+    detail = client.get(
+        "/api/inventory/reports/stock-movements/detail",
+        params=dict(params, product_id=product_id),
+        headers=auth_headers
+    ).json()
+    assert [row["stock_after"] for row in detail] == [90, 50, 55]
+
+    # Opening stock of a range that starts after the first movement.
+    params = {"start_date": "2024-06-08T00:00:00", "end_date": "2024-06-30T23:59:59"}
+    response = client.get("/api/inventory/reports/stock-movements", params=params, headers=auth_headers)
+    row, = [row for row in response.json()["product_movements"] if row["product_id"] == product_id]
+    assert (row["starting_stock"], row["ending_stock"]) == (90, 55)
+
+def test_stock_ledger_and_stock_as_of(client, auth_headers, db_session):
+    """Test ledger entries written by movements and the backfill, and stock-as-of lookups."""
+    product = models.Product(sku="LED-1", name="Ledger", unit_price=1.0, stock_quantity=10, reorder_level=0)
+    db_session.add(product)
+    db_session.commit()
+    product_id = product.id
+
+    for movement_type, quantity, moved_at in [
+        ("in", 5, "2024-06-01T00:00:00"),
+        ("out", 3, "2024-06-10T00:00:00"),
+        ("adjustment", 20, "2024-06-20T00:00:00"),
+    ]:
+        response = client.post(
+            "/api/inventory/movements",
+            json={"product_id": product_id, "quantity": quantity, "movement_type": movement_type,
+                  "reference": "ledger test", "movement_date": moved_at},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def stock_at(as_of):
+        response = client.get(f"/api/inventory/products/{product_id}/stock", params={"as_of": as_of}, headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()["stock_quantity"]
+
+    assert [stock_at(t) for t in ["2024-05-01T00:00:00", "2024-06-05T00:00:00", "2024-06-15T00:00:00", "2024-07-01T00:00:00"]] == [10, 15, 12, 20]
+    ledger = db_session.query(models.StockLedgerEntry).filter_by(product_id=product_id).order_by(models.StockLedgerEntry.id).all()
+    written = [(entry.quantity_change, entry.balance_after) for entry in ledger]
+    assert written == [(5, 15), (-3, 12), (8, 20)]
+
+    # Rebuilding a ledger written live leaves it as it is.
+    assert stock.rebuild_ledger(db_session, chunk_size=1) == 0
+    db_session.expire_all()
+    ledger = db_session.query(models.StockLedgerEntry).filter_by(product_id=product_id).order_by(models.StockLedgerEntry.id).all()
+    assert [(entry.quantity_change, entry.balance_after) for entry in ledger] == written
+    assert [stock_at(t) for t in ["2024-05-01T00:00:00", "2024-06-05T00:00:00", "2024-06-15T00:00:00", "2024-07-01T00:00:00"]] == [10, 15, 12, 20]
+
+    # Movements from before the ledger existed are backfilled. Stock that predates an
+    # adjusted product's first movement cannot be recovered then, so it starts from zero;
+    # balances from the adjustment on match.
+    db_session.query(models.StockLedgerEntry).filter_by(product_id=product_id).delete()
+    db_session.commit()
+    assert stock.rebuild_ledger(db_session, chunk_size=1) == 3
+    db_session.expire_all()
+    ledger = db_session.query(models.StockLedgerEntry).filter_by(product_id=product_id).order_by(models.StockLedgerEntry.entry_date).all()
+    assert [(entry.quantity_change, entry.balance_after) for entry in ledger] == [(5, 5), (-3, 2), (18, 20)]
+
+    response = client.get("/api/inventory/products/999999/stock", headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_rebuild_ledger_backfills_from_live_entries(client, auth_headers, db_session):
+    """Test that the backfill only adds missing entries, working back from the live ones."""
+    # Stock was 100, then 90 and 95 after two movements recorded before the ledger existed.
+    product = models.Product(sku="LED-3", name="Partly ledgered", unit_price=1.0, stock_quantity=95, reorder_level=0)
+    db_session.add(product)
+    db_session.commit()
+    product_id = product.id
+    db_session.add_all([
+        models.InventoryMovement(product_id=product_id, movement_type="out", quantity=10, movement_date=datetime(2024, 5, 1)),
+        models.InventoryMovement(product_id=product_id, movement_type="in", quantity=5, movement_date=datetime(2024, 5, 10)),
+    ])
+    db_session.commit()
+    for movement_type, quantity, moved_at in [("out", 20, "2024-06-01T00:00:00"), ("adjustment", 60, "2024-06-10T00:00:00")]:
+        response = client.post(
+            "/api/inventory/movements",
+            json={"product_id": product_id, "quantity": quantity, "movement_type": movement_type,
+                  "reference": "rebuild test", "movement_date": moved_at},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def entries():
+        db_session.expire_all()
+        return [
+            (entry.entry_date, entry.quantity_change, entry.balance_after)
+            for entry in db_session.query(models.StockLedgerEntry).filter_by(product_id=product_id).order_by(
+                models.StockLedgerEntry.entry_date, models.StockLedgerEntry.id
+            )
+        ]
+
+    live = entries()
+    assert [(change, balance) for _, change, balance in live] == [(-20, 75), (-15, 60)]
+    assert stock.rebuild_ledger(db_session) == 2
+    assert entries()[2:] == live
+    assert [(change, balance) for _, change, balance in entries()[:2]] == [(-10, 90), (5, 95)]
+    assert stock.rebuild_ledger(db_session) == 0
+    assert stock.stock_as_of(db_session, product_id, datetime(2024, 4, 1)) == 100
+
+def test_backdated_movements_rebase_stock_ledger(client, auth_headers, db_session):
+    """Test that movements posted out of date order keep the ledger's history consistent."""
+    product = models.Product(sku="LED-2", name="Backdated", unit_price=1.0, stock_quantity=10, reorder_level=0)
+    db_session.add(product)
+    db_session.commit()
+    product_id = product.id
+
+    def move(movement_type, quantity, moved_at):
+        response = client.post(
+            "/api/inventory/movements",
+            json={"product_id": product_id, "quantity": quantity, "movement_type": movement_type,
+                  "reference": "backdated test", "movement_date": moved_at},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def stock_at(*times):
+        return [
+            client.get(f"/api/inventory/products/{product_id}/stock", params={"as_of": t}, headers=auth_headers).json()["stock_quantity"]
+            for t in times
+        ]
+
+    def current():
+        db_session.expire_all()
+        return db_session.get(models.Product, product_id).stock_quantity
+
+    move("in", 5, "2024-06-01T00:00:00")
+    move("in", 100, "2024-01-01T00:00:00")
+    assert stock_at("2023-12-01T00:00:00", "2024-03-01T00:00:00", "2024-07-01T00:00:00") == [10, 110, 115]
+    assert current() == 115
+
+    # A backdated movement before a later count shifts balances up to the
+    # count only; the count still sets the level it recorded.
+    move("adjustment", 50, "2024-08-01T00:00:00")
+    move("out", 30, "2024-07-15T00:00:00")
+    move("out", 10, "2024-06-15T00:00:00")
+    assert stock_at("2024-06-20T00:00:00", "2024-07-20T00:00:00", "2024-08-02T00:00:00") == [105, 75, 50]
+    assert current() == 50
+
+    ledger = db_session.query(models.StockLedgerEntry).filter_by(product_id=product_id).order_by(
+        models.StockLedgerEntry.entry_date, models.StockLedgerEntry.id
+    ).all()
+    assert [(entry.quantity_change, entry.balance_after) for entry in ledger] == [
+        (100, 110), (5, 115), (-10, 105), (-30, 75), (-25, 50),
+    ]
+
+def test_import_cycle_counts(client, auth_headers, db_session):
+    """Test a streamed cycle count: batched SKU lookups, adjustments, alerts and variance totals."""
+    db_session.add_all([
+        models.Product(sku="CC-1", name="Counted Over", unit_price=2.0, stock_quantity=10, reorder_level=0),
+        models.Product(sku="CC-2", name="Counted Short", unit_price=5.0, stock_quantity=50, reorder_level=20),
+        models.Product(sku="CC-3", name="Counted Exact", unit_price=1.0, stock_quantity=7, reorder_level=0),
+    ])
+    db_session.commit()
+
+    body = "\n".join([
+        "sku,counted_qty",
+        "CC-1,14",
+        "CC-2,15",
+        "CC-3,7",
+        "CC-404,3",
+        "CC-1,99",
+        "CC-3,-1",
+    ])
+    response = client.post(
+        "/api/inventory/cycle-counts?chunk_size=2&counted_at=2024-06-30T18:00:00",
+        content=body.encode(),
+        headers=dict(auth_headers, **{"Content-Type": "text/csv"})
+    )
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()
+    assert (report["lines_received"], report["lines_adjusted"], report["lines_unchanged"], report["lines_failed"]) == (6, 2, 1, 3)
+    assert (report["units_over"], report["units_short"], report["net_units"]) == (4, 35, -31)
+    assert report["net_value"] == 4 * 2.0 - 35 * 5.0
+    assert [(error["line"], error["sku"]) for error in report["errors"]] == [(5, "CC-404"), (6, "CC-1"), (7, "CC-3")]
+
+    db_session.expire_all()
+    stock_levels = {product.sku: product.stock_quantity for product in db_session.query(models.Product).all()}
+    assert stock_levels == {"CC-1": 14, "CC-2": 15, "CC-3": 7}
+    adjustments = db_session.query(models.InventoryMovement).filter_by(movement_type="adjustment").count()
+    assert adjustments == 2
+    assert db_session.query(models.StockLedgerEntry).count() == 2
+    alerts = db_session.query(models.ProcessEvent).filter(models.ProcessEvent.description.like("%Counted Short%")).count()
+    assert alerts == 1
+
+def test_reorder_alerts_coalesce_per_product(client, auth_headers, db_session):
+    """Test that repeated reorder alerts update one open alert until it is resolved."""
+    product = models.Product(sku="ALR-1", name="Busy", unit_price=1.0, stock_quantity=100, reorder_level=95)
+    db_session.add(product)
+    db_session.commit()
+    product_id = product.id
+
+    def take(quantity):
+        response = client.post(
+            "/api/inventory/movements",
+            json={"product_id": product_id, "quantity": quantity, "movement_type": "out",
+                  "reference": "pick", "movement_date": datetime.now().isoformat()},
+            headers=auth_headers
+        )
+        return response.status_code
+
+    def open_alerts():
+        db_session.expire_all()
+        return db_session.query(models.ProcessEvent).filter(
+            models.ProcessEvent.product_id == product_id,
+            models.ProcessEvent.status.in_(["pending", "in-progress"])
+        ).all()
+
+    assert [take(2) for _ in range(4)] == [status.HTTP_201_CREATED] * 4
+    alerts = open_alerts()
+    assert [(alert.alert_kind, alert.occurrences) for alert in alerts] == [("reorder_point", 2)]
+    assert "Current stock: 92" in alerts[0].description
+    first_id = alerts[0].id
+
+    assert take(500) == status.HTTP_400_BAD_REQUEST
+    assert sorted(alert.alert_kind for alert in open_alerts()) == ["insufficient_stock", "reorder_point"]
+
+    response = client.put(f"/api/processes/events/{first_id}/status", params={"status": "resolved"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert take(1) == status.HTTP_201_CREATED
+    reopened = [alert for alert in open_alerts() if alert.alert_kind == "reorder_point"]
+    assert len(reopened) == 1 and reopened[0].id != first_id and reopened[0].occurrences == 1
+
+    response = client.put(f"/api/processes/events/{first_id}/status", params={"status": "pending"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_replenishment_run_drafts_purchase_orders(client, auth_headers, db_session):
+    """Test that a replenishment run drafts one PO per supplier and skips covered products."""
+    acme = models.Supplier(name="Acme Supply")
+    bolt = models.Supplier(name="Bolt Co")
+    db_session.add_all([acme, bolt])
+    db_session.commit()
+    acme_id, bolt_id = acme.id, bolt.id
+    products = [
+        models.Product(sku="REP-1", name="Low A", unit_price=2.0, stock_quantity=5, reorder_level=10, reorder_quantity=50, lead_time_days=7, preferred_supplier_id=acme_id),
+        models.Product(sku="REP-2", name="Empty A", unit_price=3.0, stock_quantity=0, reorder_level=5, reorder_quantity=0, lead_time_days=14, preferred_supplier_id=acme_id),
+        models.Product(sku="REP-3", name="Covered B", unit_price=1.0, stock_quantity=2, reorder_level=10, reorder_quantity=20, preferred_supplier_id=bolt_id),
+        models.Product(sku="REP-4", name="No supplier", unit_price=1.0, stock_quantity=0, reorder_level=10, reorder_quantity=20),
+        models.Product(sku="REP-5", name="Healthy A", unit_price=1.0, stock_quantity=100, reorder_level=10, reorder_quantity=20, preferred_supplier_id=acme_id),
+    ]
+    db_session.add_all(products)
+    db_session.commit()
+    covered_id = products[2].id
+    open_po = models.PurchaseOrder(po_number="PO-OPEN-1", supplier_id=bolt_id, status="sent", total_amount=10.0)
+    db_session.add(open_po)
+    db_session.commit()
+    db_session.add(models.PurchaseOrderItem(purchase_order_id=open_po.id, product_id=covered_id, quantity=10, unit_price=1.0, total_price=10.0))
+    db_session.commit()
+
+    plan = client.get("/api/inventory/replenishment/plan", headers=auth_headers).json()
+    assert [(line["supplier_id"], line["quantity"]) for line in plan["products"]] == [(acme_id, 50), (acme_id, 6)]
+
+    response = client.post("/api/inventory/replenishment/run", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    summary = response.json()
+    assert summary["purchase_orders_created"] == 1
+    assert summary["items_created"] == 2
+    drafted = summary["purchase_orders"][0]
+    assert drafted["supplier_id"] == acme_id
+    assert drafted["total_amount"] == 50 * 2.0 + 6 * 3.0
+
+    po, = client.get("/api/inventory/purchase-orders", params={"supplier_id": acme_id}, headers=auth_headers).json()
+    assert po["id"] == drafted["id"]
+    assert po["status"] == "draft"
+    assert sorted(item["quantity"] for item in po["po_items"]) == [6, 50]
+
+    # Drafted quantities count as on order, so a second run has nothing to add.
+    response = client.post("/api/inventory/replenishment/run", headers=auth_headers)
+    assert response.json()["purchase_orders_created"] == 0
+
+    response = client.put(f"/api/inventory/products/{covered_id}", json={"preferred_supplier_id": 999999}, headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_partial_purchase_order_receipts_are_idempotent(client, auth_headers, db_session):
+    """Test partial receipts, retries of the same receipt and over-receipt checks."""
+    supplier = models.Supplier(name="Dock Supplier")
+    first = models.Product(sku="RCV-1", name="Crate", unit_price=1.0, stock_quantity=0)
+    second = models.Product(sku="RCV-2", name="Pallet", unit_price=1.0, stock_quantity=5)
+    db_session.add_all([supplier, first, second])
+    db_session.commit()
+    po = models.PurchaseOrder(po_number="PO-RCV-1", supplier_id=supplier.id, status="sent", total_amount=0)
+    db_session.add(po)
+    db_session.commit()
+    po_id, first_id, second_id = po.id, first.id, second.id
+    crate = models.PurchaseOrderItem(purchase_order_id=po_id, product_id=first_id, quantity=10, unit_price=1.0, total_price=10.0)
+    pallet = models.PurchaseOrderItem(purchase_order_id=po_id, product_id=second_id, quantity=4, unit_price=1.0, total_price=4.0)
+    db_session.add_all([crate, pallet])
+    db_session.commit()
+    crate_id, pallet_id = crate.id, pallet.id
+
+    def receive(receipt_id, lines):
+        return client.post(
+            f"/api/inventory/purchase-orders/{po_id}/receipts",
+            json={"receipt_id": receipt_id, "lines": [{"item_id": item_id, "quantity": quantity} for item_id, quantity in lines]},
+            headers=auth_headers
+        )
+
+    def stock_levels():
+        db_session.expire_all()
+        return (db_session.get(models.Product, first_id).stock_quantity, db_session.get(models.Product, second_id).stock_quantity)
+
+    response = receive("scan-1", [(crate_id, 6), (pallet_id, 4)])
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["status"] == "partially_received"
+    assert stock_levels() == (6, 9)
+
+    # A resent receipt is answered from the record and changes nothing.
+    response = receive("scan-1", [(crate_id, 6), (pallet_id, 4)])
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["duplicate"] is True
+    assert stock_levels() == (6, 9)
+
+    assert receive("scan-2", [(crate_id, 5)]).status_code == status.HTTP_400_BAD_REQUEST
+    assert receive("scan-2", [(999999, 1)]).status_code == status.HTTP_404_NOT_FOUND
+
+    response = receive("scan-2", [(crate_id, 4)])
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["status"] == "received"
+    assert stock_levels() == (10, 9)
+    assert receive("scan-3", [(crate_id, 1)]).status_code == status.HTTP_400_BAD_REQUEST
+
+    movements = db_session.query(models.InventoryMovement).filter_by(reference="PO #PO-RCV-1").count()
+    assert movements == 3
+
+def test_forecast_fit_picks_best_model_per_product():
+    """Test that each row of the demand matrix gets the model that backtests best."""
+    days = np.arange(84)
+    history = np.stack([
+        np.full(84, 3.0),                                # flat demand
+        np.where(days % 7 == 0, 14.0, 0.0),              # one weekly delivery
+        np.concatenate([np.zeros(70), np.full(14, 5.0)]),  # demand that just started
+    ]).astype(np.float32)
+    result = forecasting.fit(history, horizon=10)
+    assert result["horizon_demand"][0] == pytest.approx(30.0)
+    assert forecasting.FORECAST_MODELS[result["model"][1]] == "seasonal_naive"
+    assert result["horizon_demand"][1] == pytest.approx(28.0)
+    assert forecasting.FORECAST_MODELS[result["model"][2]] == "exponential_smoothing"
+    with pytest.raises(ValueError):
+        forecasting.fit(history, horizon=84)
+
+def test_forecasts_feed_low_stock_and_replenishment(client, auth_headers, db_session):
+    """Test that stored forecasts drive days to stockout and lead-time order quantities."""
+    supplier = models.Supplier(name="Forecast Supplier")
+    db_session.add(supplier)
+    db_session.commit()
+    product = models.Product(sku="FC-1", name="Steady seller", unit_price=1.0, stock_quantity=10, reorder_level=20, reorder_quantity=5, lead_time_days=30, preferred_supplier_id=supplier.id)
+    db_session.add(product)
+    db_session.commit()
+    product_id = product.id
+    now = datetime.now()
+    db_session.add_all([
+        models.InventoryMovement(product_id=product_id, quantity=-2, movement_type="out", movement_date=now - timedelta(days=day))
+        for day in range(1, 61)
+    ])
+    db_session.commit()
+
+    assert client.post("/api/inventory/forecasts/run", params={"history_days": 14, "horizon_days": 14}, headers=auth_headers).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get(f"/api/inventory/forecasts/{product_id}", headers=auth_headers).status_code == status.HTTP_404_NOT_FOUND
+
+    response = client.post("/api/inventory/forecasts/run", params={"history_days": 56, "horizon_days": 14}, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["products_forecast"] == 1
+
+    forecast = client.get(f"/api/inventory/forecasts/{product_id}", headers=auth_headers).json()
+    assert forecast["daily_demand"] == pytest.approx(2.0)
+    assert forecast["horizon_demand"] == pytest.approx(28.0)
+
+    item, = client.get("/api/inventory/reports/low-stock", headers=auth_headers).json()["low_stock_items"]
+    assert item["forecast_model"] == forecast["model"]
+    assert item["days_to_stockout"] == pytest.approx(5.0)
+
+    # 30 days of lead time at 2 a day outweighs the reorder level of 20.
+    line, = client.get("/api/inventory/replenishment/plan", headers=auth_headers).json()["products"]
+    assert line["quantity"] == 60 - 10 + 1
+
+def test_product_search_ranks_matches(client, auth_headers, db_session):
+    """Test substring, word and SKU search with exact SKU matches ranked first."""
+    db_session.add_all([
+        models.Product(sku="DRL-100", name="Cordless drill", description="18V drill with two batteries", category="tools", unit_price=99.0),
+        models.Product(sku="DRL-100-KIT", name="Drill bit kit", description="Titanium bits", category="tools", unit_price=19.0),
+        models.Product(sku="HAM-200", name="Claw hammer", description="Steel shaft, fits any drill case", category="tools", unit_price=25.0),
+        models.Product(sku="SAW-300", name="Hand saw", description="Fine teeth", category="tools", unit_price=30.0),
+    ])
+    db_session.commit()
+
+    def search(q, **params):
+        response = client.get("/api/inventory/products/search", params={"q": q, **params}, headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        return [result["product"]["sku"] for result in response.json()]
+
+    assert search("drl-100") == ["DRL-100", "DRL-100-KIT"]
+    assert search("drill")[:2] == ["DRL-100-KIT", "DRL-100"]
+    assert set(search("drill")) == {"DRL-100", "DRL-100-KIT", "HAM-200"}
+    assert search("steel hammer") == ["HAM-200"]
+    assert search("ordless") == ["DRL-100"]
+    assert search("drill", limit=1) == ["DRL-100-KIT"]
+    assert search("100%") == []
+
+    assert client.get("/api/inventory/products/search", params={"q": "  "}, headers=auth_headers).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get("/api/inventory/products/search", params={"q": "drill", "limit": 0}, headers=auth_headers).status_code == status.HTTP_400_BAD_REQUEST
+    assert product_search.similarity("Drill", "drill") == 1.0
@@ -1,6 +1,20 @@
+import asyncio
+import json
+import threading
+
 import pytest
-from fastapi import status
+from fastapi import Request, status
 from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+import models
+import schemas
+import sales_rollup
+import streaming
+from services import sales_service
 
 # Test data
 SAMPLE_CUSTOMER = {
@@ -30,6 +44,17 @@ SAMPLE_ORDER = {
     ]
 }
 
+def _create_orders(client, auth_headers, customer_id, product_id, numbers):
+    order_ids = []
+    for number in numbers:
+        order_data = SAMPLE_ORDER.copy()
+        order_data["order_number"] = number
+        order_data["customer_id"] = customer_id
+        order_data["items"] = [dict(SAMPLE_ORDER["items"][0], product_id=product_id)]
+        response = client.post("/api/sales/orders", json=order_data, headers=auth_headers)
+        order_ids.append(response.json()["id"])
+    return order_ids
+
 def test_create_customer(client, auth_headers):
     """Test creating a new customer."""
     response = client.post(
@@ -243,4 +268,356 @@ def test_sales_by_product_report(client, auth_headers, test_customer, test_produ
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert "sales_by_product" in data
-    assert len(data["sales_by_product"]) > 0 
\ No newline at end of file
+    assert len(data["sales_by_product"]) > 0 
+
+def test_sales_reports_aggregate_and_skip_cancelled(client, auth_headers, test_customer, test_product):
+    """Test that the sales reports group totals per key and ignore cancelled orders."""
+    customer = {"id": test_customer.id, "name": test_customer.name}
+    product = {"id": test_product.id, "name": test_product.name}
+    order_ids = _create_orders(
+        client, auth_headers, customer["id"], product["id"], ["ORD-101", "ORD-102", "ORD-103"]
+    )
+    client.put(
+        f"/api/sales/orders/{order_ids[-1]}/status",
+        json={"status": "cancelled"},
+        headers=auth_headers
+    )
+
+    # Whole days, so the reports read the rollup unless asked for raw.
+    params = {
+        "start_date": f"{(datetime.now() - timedelta(days=30)).date()}T00:00:00",
+        "end_date": f"{(datetime.now() + timedelta(days=1)).date()}T23:59:59",
+    }
+    response = client.get("/api/sales/reports/sales-by-customer", params=params, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    raw = client.get(
+        "/api/sales/reports/sales-by-customer", params=dict(params, source="raw"), headers=auth_headers
+    )
+    assert raw.json()["sales_by_customer"] == response.json()["sales_by_customer"]
+    assert response.json()["sales_by_customer"] == [
+        {
+            "customer_id": customer["id"],
+            "customer_name": customer["name"],
+            "order_count": 2,
+            "total_sales": 2000.0
+        }
+    ]
+
+    response = client.get("/api/sales/reports/sales-by-product", params=params, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    raw = client.get(
+        "/api/sales/reports/sales-by-product", params=dict(params, source="raw"), headers=auth_headers
+    )
+    assert raw.json()["sales_by_product"] == response.json()["sales_by_product"]
+    assert response.json()["sales_by_product"] == [
+        {
+            "product_id": product["id"],
+            "product_name": product["name"],
+            "quantity_sold": 4,
+            "total_sales": 2000.0
+        }
+    ]
+
+def test_sales_trend_fills_empty_periods(client, auth_headers, test_customer, test_product):
+    """Test that the sales trend returns one row per period, including empty ones."""
+    customer_id, product_id = test_customer.id, test_product.id
+    for number, order_date in [("ORD-201", "2024-01-15T10:00:00"), ("ORD-202", "2024-03-10T09:30:00")]:
+        order_data = SAMPLE_ORDER.copy()
+        order_data.update(order_number=number, order_date=order_date, customer_id=customer_id)
+        order_data["items"] = [dict(SAMPLE_ORDER["items"][0], product_id=product_id)]
+        client.post("/api/sales/orders", json=order_data, headers=auth_headers)
+
+    response = client.get(
+        "/api/sales/reports/sales-trend",
+        params={"start_date": "2024-01-01T00:00:00", "end_date": "2024-03-31T23:59:59", "interval": "month"},
+        headers=auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["sales_trend"] == [
+        {"period": "2024-01", "order_count": 1, "total_sales": 1000.0},
+        {"period": "2024-02", "order_count": 0, "total_sales": 0.0},
+        {"period": "2024-03", "order_count": 1, "total_sales": 1000.0},
+    ]
+
+    response = client.get(
+        "/api/sales/reports/sales-trend",
+        params={"start_date": "2024-01-01T00:00:00", "end_date": "2024-12-31T23:59:59", "interval": "quarter"},
+        headers=auth_headers
+    )
+    periods = [row["period"] for row in response.json()["sales_trend"]]
+    assert periods == ["2024-Q1", "2024-Q2", "2024-Q3", "2024-Q4"]
+    assert response.json()["sales_trend"][0]["order_count"] == 2
+
+def test_sales_rollup_rebuild_matches_raw(client, auth_headers, db_session, test_customer, test_product):
+    """Test that rebuilding the rollup from history reproduces the raw report."""
+    order_ids = _create_orders(
+        client, auth_headers, test_customer.id, test_product.id, ["ORD-301", "ORD-302", "ORD-303"]
+    )
+    client.put(f"/api/sales/orders/{order_ids[0]}/status", json={"status": "cancelled"}, headers=auth_headers)
+
+    assert sales_rollup.rebuild(db_session, chunk_size=2) == 3
+
+    params = {
+        "start_date": f"{(datetime.now() - timedelta(days=30)).date()}T00:00:00",
+        "end_date": f"{(datetime.now() + timedelta(days=1)).date()}T23:59:59",
+        "interval": "day",
+    }
+    for report, key in [("sales-by-customer", "sales_by_customer"), ("sales-trend", "sales_trend")]:
+        rollup = client.get(f"/api/sales/reports/{report}", params=params, headers=auth_headers).json()
+        raw = client.get(f"/api/sales/reports/{report}", params=dict(params, source="raw"), headers=auth_headers).json()
+        assert rollup[key] == raw[key]
+    assert sum(row["order_count"] for row in rollup["sales_trend"]) == 2
+
+    response = client.get(
+        "/api/sales/reports/sales-trend", params=dict(params, source="orders"), headers=auth_headers
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_sales_reports_keep_time_of_day_bounds(client, auth_headers, test_customer, test_product):
+    """Test that bounds inside a day filter raw orders, as the rollup cannot split a day."""
+    order_data = SAMPLE_ORDER.copy()
+    order_data.update(order_number="ORD-401", order_date="2024-05-10T10:00:00", customer_id=test_customer.id)
+    order_data["items"] = [dict(SAMPLE_ORDER["items"][0], product_id=test_product.id)]
+    client.post("/api/sales/orders", json=order_data, headers=auth_headers)
+
+    def order_count(start_date, end_date, **params):
+        response = client.get(
+            "/api/sales/reports/sales-by-customer",
+            params=dict(params, start_date=start_date, end_date=end_date),
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        return sum(row["order_count"] for row in response.json()["sales_by_customer"])
+
+    assert order_count("2024-05-10T00:00:00", "2024-05-10T23:59:59") == 1
+    assert order_count("2024-05-10T12:00:00", "2024-05-10T23:59:59") == 0
+    assert order_count("2024-05-09T00:00:00", "2024-05-10T09:00:00") == 0
+    assert order_count("2024-05-10T12:00:00", "2024-05-10T23:59:59", source="raw") == 0
+
+    response = client.get(
+        "/api/sales/reports/sales-trend",
+        params={"start_date": "2024-05-10T12:00:00", "end_date": "2024-05-10T23:59:59", "source": "rollup"},
+        headers=auth_headers
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_sales_rollup_generic_upsert(db_session):
+    """Test the update-then-insert upsert used on dialects without ON CONFLICT."""
+    row = {
+        "rollup_date": datetime(2024, 3, 1).date(), "customer_id": 1, "product_id": 2, "status_class": "active",
+        "revenue": Decimal("10.10"), "quantity": 3, "order_count": 1, "updated_at": datetime.now(),
+    }
+    sales_rollup._update_then_insert(db_session, [row])
+    sales_rollup._update_then_insert(db_session, [row, dict(row, product_id=3)])
+    db_session.commit()
+
+    rows = db_session.query(models.SalesDailyRollup).order_by(models.SalesDailyRollup.product_id).all()
+    assert [(r.product_id, r.revenue, r.quantity, r.order_count) for r in rows] == [
+        (2, Decimal("20.20"), 6, 2),
+        (3, Decimal("10.10"), 3, 1),
+    ]
+
+def test_concurrent_orders_do_not_lose_stock_updates(tmp_path):
+    """Test that many threads ordering the same SKU leave the exact final stock."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'concurrency.db'}",
+        connect_args={"check_same_thread": False, "timeout": 60},
+    )
+    tables = [
+        models.Customer.__table__,
+        models.Product.__table__,
+        models.Order.__table__,
+        models.OrderItem.__table__,
+        models.InventoryMovement.__table__,
+        models.StockLedgerEntry.__table__,
+        models.ProcessEvent.__table__,
+        models.SalesDailyRollup.__table__,
+    ]
+    Base.metadata.create_all(bind=engine, tables=tables)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with SessionLocal() as db:
+        db.add(models.Customer(id=1, name="Load Customer"))
+        db.add(models.Product(id=1, sku="HOT-SKU", name="Hot Product", unit_price=10.0, stock_quantity=1000, reorder_level=0))
+        db.commit()
+
+    threads, orders_per_thread = 10, 5
+    errors = []
+
+    def place_orders(worker):
+        db = SessionLocal()
+        try:
+            for n in range(orders_per_thread):
+                order = schemas.OrderCreate(
+                    order_number=f"ORD-{worker}-{n}",
+                    customer_id=1,
+                    order_date=datetime.now(),
+                    required_date=datetime.now() + timedelta(days=7),
+                    status="confirmed",
+                    total_amount=30.0,
+                    items=[{"product_id": 1, "quantity": 3, "unit_price": 10.0, "total_price": 30.0}],
+                )
+                asyncio.run(sales_service.create_order(order, db=db))
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            db.close()
+
+    workers = [threading.Thread(target=place_orders, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    with SessionLocal() as db:
+        assert db.get(models.Product, 1).stock_quantity == 1000 - threads * orders_per_thread * 3
+        assert db.query(models.InventoryMovement).count() == threads * orders_per_thread
+    engine.dispose()
+
+def test_import_orders_ndjson(client, auth_headers, test_customer, test_product):
+    """Test streaming NDJSON order import with a per-row error report."""
+    customer_id, product_id = test_customer.id, test_product.id
+
+    def order_line(number, customer=customer_id, product=product_id):
+        order_data = SAMPLE_ORDER.copy()
+        order_data.update(order_number=number, customer_id=customer)
+        order_data["items"] = [dict(SAMPLE_ORDER["items"][0], product_id=product)]
+        return json.dumps(order_data)
+
+    body = "\n".join([
+        order_line("IMP-001"),
+        order_line("IMP-002", customer=9999),
+        "{not json",
+        order_line("IMP-003"),
+        order_line("IMP-003"),
+        order_line("IMP-004", product=9999),
+    ]) + "\n"
+    response = client.post(
+        "/api/sales/orders/import?chunk_size=1",
+        content=body.encode(),
+        headers=dict(auth_headers, **{"Content-Type": "application/x-ndjson"})
+    )
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()
+    assert report["orders_received"] == 6
+    assert report["orders_imported"] == 2
+    assert [(error["line"], error["order_number"]) for error in report["errors"]] == [
+        (2, "IMP-002"), (3, None), (5, "IMP-003"), (6, "IMP-004")
+    ]
+
+    orders = client.get("/api/sales/orders", headers=auth_headers).json()
+    assert sorted(order["order_number"] for order in orders) == ["IMP-001", "IMP-003"]
+    product = client.get(f"/api/inventory/products/{product_id}", headers=auth_headers).json()
+    assert product["stock_quantity"] == 100 - 2 * 2
+
+def test_import_orders_product_deleted_during_upload(db_session, test_customer, test_product):
+    """Test that a product deleted after the upload started fails its orders row by row."""
+    removed = models.Product(sku="IMP-GONE", name="Discontinued", unit_price=1.0, stock_quantity=10)
+    db_session.add(removed)
+    db_session.commit()
+    removed_id = removed.id
+
+    def order_line(number, product):
+        order_data = SAMPLE_ORDER.copy()
+        order_data.update(order_number=number, customer_id=test_customer.id)
+        order_data["items"] = [dict(SAMPLE_ORDER["items"][0], product_id=product)]
+        return json.dumps(order_data) + "\n"
+
+    chunks = [line.encode() for line in [
+        order_line("IMP-101", test_product.id),
+        order_line("IMP-102", removed_id),
+        order_line("IMP-103", removed_id),
+    ]]
+
+    async def receive():
+        # The product ids are loaded before the body is read.
+        db_session.query(models.Product).filter_by(id=removed_id).delete()
+        db_session.commit()
+        if chunks:
+            return {"type": "http.request", "body": chunks.pop(0), "more_body": bool(chunks)}
+        return {"type": "http.disconnect"}
+
+    request = Request({"type": "http", "method": "POST", "headers": []}, receive)
+    report = asyncio.run(sales_service.import_orders(request, "ndjson", 1, db_session))
+    assert report["orders_imported"] == 1
+    assert [(error["line"], error["error"]) for error in report["errors"]] == [
+        (2, f"Product with ID {removed_id} not found"),
+        (3, f"Product with ID {removed_id} not found"),
+    ]
+    assert [order.order_number for order in db_session.query(models.Order)] == ["IMP-101"]
+
+def test_import_orders_csv(client, auth_headers, test_customer, test_product):
+    """Test CSV order import where consecutive rows form one order."""
+    customer_id, product_id = test_customer.id, test_product.id
+    header = "order_number,customer_id,order_date,required_date,status,total_amount,product_id,quantity,unit_price,discount,total_price"
+    rows = [
+        f"CSV-001,{customer_id},2024-05-01T10:00:00,2024-05-08T10:00:00,confirmed,150.0,{product_id},1,100.0,,100.0",
+        f"CSV-001,{customer_id},2024-05-01T10:00:00,2024-05-08T10:00:00,confirmed,150.0,{product_id},1,50.0,0,50.0",
+        f"CSV-002,{customer_id},2024-05-02T10:00:00,2024-05-09T10:00:00,confirmed,100.0,{product_id},abc,100.0,0,100.0",
+    ]
+    response = client.post(
+        "/api/sales/orders/import?format=csv",
+        content=("\n".join([header] + rows)).encode(),
+        headers=auth_headers
+    )
+    report = response.json()
+    assert report["orders_received"] == 2
+    assert report["orders_imported"] == 1
+    assert report["errors"][0]["line"] == 4
+    assert "quantity" in report["errors"][0]["error"]
+
+    orders = client.get("/api/sales/orders", headers=auth_headers).json()
+    assert len(orders) == 1
+    assert len(orders[0]["order_items"]) == 2
+
+def test_import_orders_csv_multiline_fields(client, auth_headers, test_customer, test_product):
+    """Test that quoted CSV fields may span lines and errors report record numbers."""
+    customer_id, product_id = test_customer.id, test_product.id
+    header = "order_number,customer_id,order_date,required_date,status,total_amount,product_id,quantity,unit_price,discount,total_price,notes"
+    body = "\r\n".join([
+        header,
+        f'CSV-101,{customer_id},2024-05-01T10:00:00,2024-05-08T10:00:00,confirmed,100.0,{product_id},1,100.0,0,100.0,"Leave at dock 4\r\nring the ""night"" bell"',
+        f'CSV-102,{customer_id},2024-05-02T10:00:00,2024-05-09T10:00:00,confirmed,100.0,{product_id},abc,100.0,0,100.0,"two\nlines"',
+    ])
+    response = client.post("/api/sales/orders/import?format=csv", content=body.encode(), headers=auth_headers)
+    report = response.json()
+    assert report["orders_received"] == 2
+    assert report["orders_imported"] == 1
+    assert report["errors"][0]["line"] == 3
+
+def test_iter_records_csv_across_chunks():
+    """Test CSV records whose quoted fields span lines and request chunks."""
+    body = 'sku,note\r\nA-1,"first\r\nsecond, with comma"\r\n\r\nB-2,"say ""hi"""\nC-3,"never closed\nrest'.encode()
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+
+    async def receive():
+        if chunks:
+            return {"type": "http.request", "body": chunks.pop(0), "more_body": bool(chunks)}
+        return {"type": "http.disconnect"}
+
+    async def collect():
+        request = Request({"type": "http", "method": "POST", "headers": []}, receive)
+        return [pair async for pair in streaming.iter_records(request, "csv")]
+
+    assert asyncio.run(collect()) == [
+        (2, {"sku": "A-1", "note": "first\r\nsecond, with comma"}),
+        (4, {"sku": "B-2", "note": 'say "hi"'}),
+        (5, {"sku": "C-3", "note": "never closed\nrest"}),
+    ]
+
+def test_export_orders(client, auth_headers, test_customer, test_product):
+    """Test streaming orders as NDJSON with the list filters applied."""
+    customer_id, product_id = test_customer.id, test_product.id
+    order_ids = _create_orders(client, auth_headers, customer_id, product_id, ["EXP-001", "EXP-002"])
+    client.put(f"/api/sales/orders/{order_ids[1]}/status", json={"status": "cancelled"}, headers=auth_headers)
+
+    response = client.get(
+        "/api/sales/orders/export",
+        params={"format": "ndjson", "customer_id": customer_id, "status": "draft"},
+        headers=auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["order_number"] for record in records] == ["EXP-001"]